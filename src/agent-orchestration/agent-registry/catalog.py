@@ -0,0 +1,57 @@
+import json
+from typing import List
+
+from kybra import ic
+
+from changes import METADATA, record_change
+from model import ToolCatalogLookup
+from search import index_document, metadata_terms
+from storage import tool_catalog
+
+# ==================================== TOOL CATALOG ====================================
+# Tool metadata pushed by agents (or pulled at registration), so orchestrators can
+# fetch every schema they need from the registry in a single call.
+
+
+def publish(agent_name: str, metadata_json: str) -> int:
+    """
+    Store an agent's metadata, bumping its version only when the content changed. The
+    search document is rebuilt either way, so one that fell back to the agent's name
+    (metadata unavailable at registration) is repaired by the next publish.
+    """
+
+    metadata = json.loads(metadata_json)
+    entry = tool_catalog.get(agent_name)
+
+    index_document(agent_name, metadata_terms(agent_name, metadata))
+
+    if entry is not None and entry["metadata"] == metadata_json:
+        return entry["version"]
+
+    version = entry["version"] + 1 if entry is not None else 1
+    tool_catalog.insert(
+        agent_name,
+        {"metadata": metadata_json, "version": version, "updated_at": ic.time()},
+    )
+    record_change(agent_name, METADATA)
+
+    return version
+
+
+def lookup(agent_names: List[str]) -> List[ToolCatalogLookup]:
+    lookups = []
+
+    for agent_name in agent_names:
+        entry = tool_catalog.get(agent_name)
+        lookups.append(
+            ToolCatalogLookup(
+                agent_name=agent_name,
+                found=entry is not None,
+                version=entry["version"] if entry is not None else None,
+                metadata=entry["metadata"] if entry is not None else None,
+            )
+        )
+
+    return lookups
+
+# ==================================== TOOL CATALOG ====================================
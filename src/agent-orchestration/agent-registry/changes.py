@@ -0,0 +1,66 @@
+from typing import List
+
+from kybra import ic, nat64
+
+from constants import CHANGE_LOG_CAPACITY
+from model import ChangeFeed
+from storage import agent_registry, change_log, registry_counters
+
+# ===================================== CHANGE FEED ====================================
+# Every mutation bumps a monotonically increasing registry version, stamps it on the
+# affected agent and appends it to a bounded log. Consumers keep the last version they
+# have seen and replay `changes_since` to revalidate their caches.
+
+REGISTERED = "registered"
+UPDATED = "updated"
+METADATA = "metadata"
+REPLICAS = "replicas"
+
+
+def current_version() -> nat64:
+    return registry_counters.get("registry.version") or 0
+
+
+def record_change(agent_name: str, kind: str) -> nat64:
+    version = current_version() + 1
+    registry_counters.insert("registry.version", version)
+
+    change_log.insert(
+        version,
+        {"version": version, "agent_name": agent_name, "kind": kind, "changed_at": ic.time()},
+    )
+
+    if version > CHANGE_LOG_CAPACITY:
+        change_log.remove(version - CHANGE_LOG_CAPACITY)
+
+    agent = agent_registry.get(agent_name)
+    if agent is not None:
+        agent["version"] = version
+        agent_registry.insert(agent_name, agent)
+
+    return version
+
+
+def changes_since(since: nat64, limit: int) -> ChangeFeed:
+    """Changes with a version above `since`; `truncated` means the log no longer reaches back that far."""
+
+    latest = current_version()
+    oldest_retained = max(latest - CHANGE_LOG_CAPACITY + 1, 1)
+
+    start = max(since + 1, oldest_retained)
+    end = min(latest, start + limit - 1)
+
+    changes: List = []
+    for version in range(start, end + 1):
+        change = change_log.get(version)
+        if change is not None:
+            changes.append(change)
+
+    return {
+        "current_version": latest,
+        "changes": changes,
+        "truncated": since + 1 < oldest_retained,
+        "has_more": end < latest,
+    }
+
+# ===================================== CHANGE FEED ====================================
@@ -0,0 +1,26 @@
+# Backend canister that deploys agents and registers them; legacy agents without a
+# recorded owner are handed to it on upgrade so its deploy flow can still redeploy them
+REGISTRAR_CANISTER_ID = "hnltm-maaaa-aaaac-a4aqa-cai"
+
+# Agent listing
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STALE_SCAN_FACTOR = 4  # postings scanned per requested item before a page is cut short
+
+# Capability search (BM25)
+BM25_K1 = 1.2
+BM25_B = 0.75
+NAME_TERM_WEIGHT = 3  # a term in the agent name counts as this many occurrences
+DEFAULT_SEARCH_K = 5
+MAX_SEARCH_K = 50
+
+# Change feed
+CHANGE_LOG_CAPACITY = 1_000  # most recent changes kept for `changes_since`
+
+# Replicas
+REPLICA_REPORT_TTL_SECONDS = 120  # older load reports count as a stale replica
+STALE_REPLICA_LOAD = 10  # in-flight tasks assumed for a stale replica, so it gets little traffic
+REPLICA_DOWN_AFTER_SECONDS = 900  # replicas silent this long get no traffic (the primary always does)
+DEFAULT_REPLICA_LATENCY_MS = 1_000
+LATENCY_SCALE_MS = 1_000
+MAX_REPLICAS = 32
@@ -0,0 +1,170 @@
+from typing import List, Optional, Tuple
+
+from kybra import Opt, nat64
+
+from constants import STALE_SCAN_FACTOR
+from model import AgentMetadata
+from storage import (
+    agent_registry, agent_sequence, index_postings, index_lengths, index_members
+)
+
+# ====================================== INDEXES =======================================
+# StableBTreeMap has no range scans, so every index is an append-only postings list
+# addressed by position ("<index>:<value>#<position>"). Listing a page is then a run of
+# point lookups from the cursor. Removing an agent from an index swaps its member marker
+# for a retired one; the orphaned posting is skipped when scanned and its slot is reused
+# when the same agent is added back, so a list never holds more than one posting per
+# agent however often it is reindexed.
+
+OWNER_INDEX = "owner"
+TAG_INDEX = "tag"
+
+
+def index_agent(previous: Opt[AgentMetadata], agent: AgentMetadata):
+    """Bring the sequence and the owner / tag indexes in line with a (re)registration."""
+
+    if previous is None:
+        agent_sequence.insert(agent_sequence.len(), agent["agent_name"])
+
+    old_owner = previous.get("owner") if previous is not None else None
+    if old_owner != agent.get("owner"):
+        if old_owner is not None:
+            remove_posting(OWNER_INDEX, old_owner, agent["agent_name"])
+        if agent.get("owner") is not None:
+            add_posting(OWNER_INDEX, agent["owner"], agent["agent_name"])
+
+    old_tags = set(previous.get("tags") or []) if previous is not None else set()
+    new_tags = set(agent.get("tags") or [])
+
+    for tag in old_tags - new_tags:
+        remove_posting(TAG_INDEX, tag, agent["agent_name"])
+    for tag in new_tags - old_tags:
+        add_posting(TAG_INDEX, tag, agent["agent_name"])
+
+
+def scan_sequence(cursor: int, limit: int) -> Tuple[List[str], Optional[nat64]]:
+    """Agent names in registration order starting at ordinal `cursor`."""
+
+    length = agent_sequence.len()
+    end = min(cursor + limit, length)
+    names = [agent_sequence.get(ordinal) for ordinal in range(cursor, end)]
+
+    return [name for name in names if name is not None], (end if end < length else None)
+
+
+def scan_index(index: str, value: str, cursor: int, limit: int) -> Tuple[List[str], Optional[nat64]]:
+    """Live agent names of one postings list starting at position `cursor`."""
+
+    key = _index_key(index, value)
+    length = index_lengths.get(key) or 0
+
+    names = []
+    position = cursor
+    budget = limit * STALE_SCAN_FACTOR
+
+    while position < length and len(names) < limit and budget > 0:
+        agent_name = index_postings.get(_posting_key(key, position))
+
+        if agent_name is not None and index_members.get(f"{key}@{agent_name}") == position:
+            names.append(agent_name)
+
+        position += 1
+        budget -= 1
+
+    return names, (position if position < length else None)
+
+
+def live_postings(index: str, value: str) -> List[str]:
+    """Every live agent name of one postings list."""
+
+    length = index_lengths.get(_index_key(index, value)) or 0
+    names, _ = scan_index(index, value, 0, length)
+
+    return names
+
+
+def first_ordinal_registered_since(since: nat64) -> nat64:
+    """Binary search the registration sequence, which is ordered by `registered_at`."""
+
+    low = 0
+    high = agent_sequence.len()
+
+    while low < high:
+        middle = (low + high) // 2
+        agent = agent_registry.get(agent_sequence.get(middle))
+        registered_at = (agent.get("registered_at") if agent is not None else None) or 0
+
+        if registered_at < since:
+            low = middle + 1
+        else:
+            high = middle
+
+    return low
+
+
+def backfill_sequence() -> int:
+    """Index agents registered before the sequence existed (runs after an upgrade)."""
+
+    if agent_sequence.len() >= agent_registry.len():
+        return 0
+
+    sequenced = set(agent_sequence.values())
+    added = 0
+
+    for agent_name, agent in agent_registry.items():
+        if agent_name not in sequenced:
+            index_agent(None, agent)
+            added += 1
+
+    return added
+
+
+def backfill_owners(owner: str) -> int:
+    """Give agents registered before owners existed an owner (runs after an upgrade)."""
+
+    claimed = 0
+
+    for agent_name, previous in agent_registry.items():
+        if previous.get("owner") is not None:
+            continue
+
+        agent = { **previous, "owner": owner }
+        agent_registry.insert(agent_name, agent)
+        index_agent(previous, agent)
+        claimed += 1
+
+    return claimed
+
+
+def add_posting(index: str, value: str, agent_name: str):
+    key = _index_key(index, value)
+
+    if index_members.contains_key(f"{key}@{agent_name}"):
+        return
+
+    position = index_members.remove(f"{key}!{agent_name}")
+
+    if position is None:
+        position = index_lengths.get(key) or 0
+        index_postings.insert(_posting_key(key, position), agent_name)
+        index_lengths.insert(key, position + 1)
+
+    index_members.insert(f"{key}@{agent_name}", position)
+
+
+def remove_posting(index: str, value: str, agent_name: str):
+    key = _index_key(index, value)
+    position = index_members.remove(f"{key}@{agent_name}")
+
+    if position is not None:
+        index_members.insert(f"{key}!{agent_name}", position)
+
+
+def _index_key(index: str, value: str) -> str:
+    return f"{index}:{value}"
+
+
+def _posting_key(key: str, position: int) -> str:
+    return f"{key}#{position:012d}"
+
+# ====================================== INDEXES =======================================
@@ -1,15 +1,29 @@
 from kybra import (
-    update, query, ic, StableBTreeMap, Principal
+    update, query, post_upgrade, ic, match, Async, Principal, Opt, Vec, nat64
 )
 
 import json
 
 from model import *
+from constants import *
+from storage import agent_registry, search_documents
+from indexes import *
+from search import index_document, metadata_terms, search
+import catalog
+import changes
+import replicas
 
-# Storage for chunks and deployments
-agent_registry = StableBTreeMap[str, AgentMetadata](
-    memory_id=1, max_key_size=128, max_value_size=2_000_000  # ~2MB chunks
-)
+@post_upgrade
+def post_upgrade_():
+    added = backfill_sequence()
+    if added > 0:
+        ic.print(f"[AgentRegistry] Backfilled {added} agents into the listing indexes")
+
+    claimed = backfill_owners(REGISTRAR_CANISTER_ID)
+    if claimed > 0:
+        ic.print(f"[AgentRegistry] Assigned {claimed} ownerless agents to the registrar")
+
+    ic.set_timer(0, __index_unsearchable_agents)
 
 @query
 def get_owner() -> Principal:
@@ -20,10 +34,69 @@ def get_price() -> int:
     return 1_000_000
 
 @update
-def register_agent(agent_name: str, canister_id: str) -> ReturnType:
-    agent_registry.insert(agent_name, AgentMetadata(agent_name=agent_name, canister_id=canister_id))
+def register_agent(agent_name: str, canister_id: str, tags: Opt[Vec[str]], owner: Opt[str]) -> Async[ReturnType]:
+    """
+    Register (or update) an agent. `owner` defaults to the caller; `tags` and `owner`
+    are kept from the previous registration when omitted. An existing agent can only be
+    re-registered (or handed to a new owner) by its current owner.
+    """
+
+    previous = agent_registry.get(agent_name)
+
+    if previous is not None and not __is_owner(previous):
+        return { "Err": f"Only the owner of agent {agent_name} can re-register it" }
+
+    if owner is None:
+        owner = previous.get("owner") if previous is not None else None
+    if owner is None:
+        owner = ic.caller().to_str()
+
+    if tags is None:
+        tags = previous.get("tags") if previous is not None else None
+    else:
+        tags = sorted({ tag.strip().lower() for tag in tags if tag.strip() != "" })
+
+    registered_at = previous.get("registered_at") if previous is not None else None
+
+    agent = AgentMetadata(
+        agent_name=agent_name,
+        canister_id=canister_id,
+        owner=owner,
+        tags=tags,
+        registered_at=registered_at if registered_at is not None else ic.time(),
+        version=previous.get("version") if previous is not None else None
+    )
+    agent_registry.insert(agent_name, agent)
+    index_agent(previous, agent)
+    changes.record_change(agent_name, changes.REGISTERED if previous is None else changes.UPDATED)
+
+    if previous is not None and previous["canister_id"] != canister_id:
+        # A redeploy replaces the primary: forget the old canister's load reports
+        if replicas.remove_replica(agent_name, previous["canister_id"]):
+            changes.record_change(agent_name, changes.REPLICAS)
+
+    yield __index_agent_metadata(agent_name, canister_id)
+
     return { "Ok": f"Agent {agent_name} registered successfully" }
 
+@update
+def reindex_agent(agent_name: str) -> Async[ReturnType]:
+    """
+    Refresh the search index of an agent from its current `get_metadata`.
+    """
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return { "Err": f"Agent {agent_name} not found" }
+
+    indexed = yield __index_agent_metadata(agent_name, agent["canister_id"])
+
+    if not indexed:
+        return { "Err": f"Agent {agent_name} metadata unavailable, indexed by name only" }
+
+    return { "Ok": f"Agent {agent_name} reindexed" }
+
 @query
 def get_agent_by_name(agent_name: str) -> ReturnType:
 
@@ -34,8 +107,226 @@ def get_agent_by_name(agent_name: str) -> ReturnType:
     
     return { "Ok": json.dumps(agent) }
 
+@query
+def get_agents_by_names(agent_names: Vec[str]) -> Vec[AgentLookup]:
+    """
+    Resolve several agents in one call, each with its weighted replicas; unknown names
+    come back with `found = false`.
+    """
+
+    lookups = []
+
+    for agent_name in agent_names:
+        agent = agent_registry.get(agent_name)
+        lookups.append(AgentLookup(
+            agent_name=agent_name,
+            found=agent is not None,
+            agent=agent,
+            replicas=replicas.weighted_replicas(agent) if agent is not None else None
+        ))
+
+    return lookups
+
+@query
+def list_agents(agent_filter: Opt[AgentFilter], cursor: Opt[nat64], limit: Opt[nat64]) -> AgentPage:
+    """
+    Page through agents in registration order, optionally filtered by owner, tag or
+    registration time. Pass the returned `next_cursor` back to get the next page.
+    """
+
+    page_size = min(limit if limit is not None and limit > 0 else DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+
+    if agent_filter is not None and agent_filter.get("owner") is not None:
+        names, next_cursor = scan_index(OWNER_INDEX, agent_filter["owner"], cursor or 0, page_size)
+    elif agent_filter is not None and agent_filter.get("tag") is not None:
+        names, next_cursor = scan_index(TAG_INDEX, agent_filter["tag"].strip().lower(), cursor or 0, page_size)
+    elif agent_filter is not None and agent_filter.get("registered_since") is not None:
+        start = cursor if cursor is not None else first_ordinal_registered_since(agent_filter["registered_since"])
+        names, next_cursor = scan_sequence(start, page_size)
+    else:
+        names, next_cursor = scan_sequence(cursor or 0, page_size)
+
+    agents = [ agent_registry.get(name) for name in names ]
+
+    return AgentPage(agents=[ agent for agent in agents if agent is not None ], next_cursor=next_cursor)
+
+@update
+def publish_tool_metadata(agent_name: str, metadata: str) -> ReturnType:
+    """
+    Called by a registered agent (from its init / post_upgrade) to push its METADATA.
+    """
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return { "Err": f"Agent {agent_name} not found" }
+
+    if ic.caller().to_str() != agent["canister_id"]:
+        return { "Err": f"Only agent {agent_name} can publish its metadata" }
+
+    try:
+        version = catalog.publish(agent_name, metadata)
+    except Exception as e:
+        return { "Err": json.dumps({ "error": str(e) }) }
+
+    return { "Ok": f"Agent {agent_name} metadata published at version {version}" }
+
+@query
+def get_tool_catalog(agent_names: Vec[str]) -> Vec[ToolCatalogLookup]:
+    """
+    Tool metadata of every requested agent in one call, with per-name `found` markers.
+    """
+
+    return catalog.lookup(agent_names)
+
+@update
+def add_replica(agent_name: str, canister_id: str) -> ReturnType:
+    """
+    Add a canister running the same agent. Only the agent owner may add replicas.
+    """
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return { "Err": f"Agent {agent_name} not found" }
+
+    if not __is_owner(agent):
+        return { "Err": f"Only the owner of {agent_name} can manage its replicas" }
+
+    try:
+        added = replicas.add_replica(agent_name, canister_id)
+    except Exception as e:
+        return { "Err": json.dumps({ "error": str(e) }) }
+
+    if added:
+        changes.record_change(agent_name, changes.REPLICAS)
+
+    return { "Ok": f"Replica {canister_id} of agent {agent_name} registered" }
+
+@update
+def remove_replica(agent_name: str, canister_id: str) -> ReturnType:
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return { "Err": f"Agent {agent_name} not found" }
+
+    if not __is_owner(agent):
+        return { "Err": f"Only the owner of {agent_name} can manage its replicas" }
+
+    if agent["canister_id"] == canister_id:
+        return { "Err": "The primary canister cannot be removed, register a new one instead" }
+
+    if not replicas.remove_replica(agent_name, canister_id):
+        return { "Err": f"Replica {canister_id} of agent {agent_name} not found" }
+
+    changes.record_change(agent_name, changes.REPLICAS)
+
+    return { "Ok": f"Replica {canister_id} of agent {agent_name} removed" }
+
+@update
+def report_replica_load(agent_name: str, load: nat64, latency_ms: nat64) -> ReturnType:
+    """
+    Called periodically by each replica (including the primary) with its in-flight
+    task count and recent average latency.
+    """
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return { "Err": f"Agent {agent_name} not found" }
+
+    canister_id = ic.caller().to_str()
+
+    if not replicas.is_member(agent, canister_id):
+        return { "Err": f"{canister_id} is not a replica of agent {agent_name}" }
+
+    replicas.report_load(agent, canister_id, load, latency_ms)
+
+    return { "Ok": None }
+
+@query
+def get_agent_replicas(agent_name: str) -> Vec[WeightedReplica]:
+
+    agent = agent_registry.get(agent_name)
+
+    if agent is None:
+        return []
+
+    return replicas.weighted_replicas(agent)
+
+@query
+def get_registry_version() -> nat64:
+    return changes.current_version()
+
+@query
+def changes_since(version: nat64, limit: Opt[nat64]) -> ChangeFeed:
+    """
+    Registry changes after `version`, oldest first. When `truncated` is true the log no
+    longer covers that version and consumers should drop everything they cached.
+    """
+
+    page_size = min(limit if limit is not None and limit > 0 else MAX_PAGE_SIZE, MAX_PAGE_SIZE)
+
+    return changes.changes_since(version, page_size)
+
+@query
+def search_agents(search_query: str, k: Opt[nat64], candidates: Opt[Vec[str]]) -> Vec[AgentSearchHit]:
+    """
+    BM25 search over agent names, descriptions and parameter descriptions. Pass
+    `candidates` to rank only those agents (e.g. an orchestrator's connected agents).
+    """
+
+    top_k = min(k if k is not None and k > 0 else DEFAULT_SEARCH_K, MAX_SEARCH_K)
+
+    return search(search_query, top_k, candidates)
+
 @query
 def get_list_agents() -> ReturnType:
+    """
+    Dump every agent at once. Prefer `list_agents`, which stays O(page).
+    """
     agents = agent_registry.values()
     data = [ agent for agent in agents ]
-    return { "Ok": json.dumps(data) }
\ No newline at end of file
+    return { "Ok": json.dumps(data) }
+
+
+def __is_owner(agent: AgentMetadata) -> bool:
+    """
+    Whether the caller may manage an agent: its recorded owner, or the agent canister
+    itself when no owner is recorded (upgrades assign legacy agents to the registrar).
+    """
+
+    owner = agent.get("owner")
+    caller = ic.caller().to_str()
+
+    return caller == (owner if owner is not None else agent["canister_id"])
+
+
+def __index_agent_metadata(agent_name: str, canister_id: str) -> Async[bool]:
+    """Pull an agent's metadata into the catalog and search index; falls back to its name alone."""
+
+    agent = AgentInterface(Principal.from_str(canister_id))
+    resp_stream = yield agent.get_metadata()
+    resp = match(resp_stream, { "Ok": lambda ok: ok, "Err": lambda err: { "Err": err } })
+
+    if resp.get("Ok") is not None:
+        try:
+            catalog.publish(agent_name, resp.get("Ok"))
+            return True
+        except Exception as e:
+            ic.print(f"[AgentRegistry] Invalid metadata for '{agent_name}': {e}")
+    else:
+        ic.print(f"[AgentRegistry] Metadata unavailable for '{agent_name}': {resp.get('Err')}")
+
+    index_document(agent_name, metadata_terms(agent_name, None))
+
+    return False
+
+
+def __index_unsearchable_agents() -> Async[None]:
+    """Index agents registered before capability search existed."""
+
+    for agent_name, agent in agent_registry.items():
+        if not search_documents.contains_key(agent_name):
+            yield __index_agent_metadata(agent_name, agent["canister_id"])
@@ -1,22 +1,85 @@
 
 from kybra import (
-    Service, service_update, service_query, Record, Variant, Opt
+    Service, service_update, service_query, Record, Variant, Opt, Vec, nat64, float64
 )
 
 class AgentMetadata(Record):
     agent_name: str
     canister_id: str
+    owner: Opt[str]
+    tags: Opt[Vec[str]]
+    registered_at: Opt[nat64]
+    version: Opt[nat64]
+
+class ReplicaState(Record):
+    canister_id: str
+    load: nat64
+    latency_ms: nat64
+    reported_at: nat64
+
+class ReplicaSet(Record):
+    replicas: Vec[ReplicaState]
+
+class WeightedReplica(Record):
+    canister_id: str
+    weight: float64
+
+class AgentLookup(Record):
+    agent_name: str
+    found: bool
+    agent: Opt[AgentMetadata]
+    replicas: Opt[Vec[WeightedReplica]]
+
+class AgentFilter(Variant, total=False):
+    owner: str
+    tag: str
+    registered_since: nat64
+
+class AgentPage(Record):
+    agents: Vec[AgentMetadata]
+    next_cursor: Opt[nat64]
 
 class ReturnType(Variant, total=False):
     Ok: Opt[str]
     Err: Opt[str]
 
+class ToolCatalogEntry(Record):
+    metadata: str
+    version: nat64
+    updated_at: nat64
+
+class ToolCatalogLookup(Record):
+    agent_name: str
+    found: bool
+    version: Opt[nat64]
+    metadata: Opt[str]
+
+class ChangeRecord(Record):
+    version: nat64
+    agent_name: str
+    kind: str
+    changed_at: nat64
+
+class ChangeFeed(Record):
+    current_version: nat64
+    changes: Vec[ChangeRecord]
+    truncated: bool
+    has_more: bool
+
+class SearchDocument(Record):
+    terms: Vec[str]
+    length: nat64
+
+class AgentSearchHit(Record):
+    agent: AgentMetadata
+    score: float64
+
 # Management Canister Service
 class AgentInterface(Service):
     @service_query
-    def get_metadata(self) -> str:
+    def get_metadata(self) -> ReturnType:
         ...
     
     @service_update
     def execute_task(self, args: str) -> str:
-        ...
\ No newline at end of file
+        ...
@@ -0,0 +1,135 @@
+from typing import List, Optional
+
+from kybra import ic, nat64
+
+from constants import (
+    DEFAULT_REPLICA_LATENCY_MS,
+    LATENCY_SCALE_MS,
+    MAX_REPLICAS,
+    REPLICA_DOWN_AFTER_SECONDS,
+    REPLICA_REPORT_TTL_SECONDS,
+    STALE_REPLICA_LOAD,
+)
+from model import AgentMetadata, ReplicaState, WeightedReplica
+from storage import agent_replicas
+
+# ====================================== REPLICAS ======================================
+# An agent name maps to its registered (primary) canister plus any number of replica
+# canisters running the same agent. Replicas report their load and latency; lookups
+# return every live replica with a weight so callers can spread traffic across them. A
+# replica whose last report is older than `REPLICA_REPORT_TTL_SECONDS` is treated as
+# heavily loaded, and one silent for `REPLICA_DOWN_AFTER_SECONDS` as down.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+
+def add_replica(agent_name: str, canister_id: str) -> bool:
+    replica_set = agent_replicas.get(agent_name) or {"replicas": []}
+
+    if _find(replica_set, canister_id) is not None:
+        return False
+
+    if len(replica_set["replicas"]) >= MAX_REPLICAS:
+        raise ValueError(f"Agent {agent_name} already has {MAX_REPLICAS} replicas")
+
+    # Counted as a fresh, idle report so a new replica gets traffic before it reports
+    replica_set["replicas"].append(
+        {"canister_id": canister_id, "load": 0, "latency_ms": 0, "reported_at": ic.time()}
+    )
+    agent_replicas.insert(agent_name, replica_set)
+
+    return True
+
+
+def remove_replica(agent_name: str, canister_id: str) -> bool:
+    replica_set = agent_replicas.get(agent_name)
+
+    if replica_set is None or _find(replica_set, canister_id) is None:
+        return False
+
+    replica_set["replicas"] = [
+        replica for replica in replica_set["replicas"] if replica["canister_id"] != canister_id
+    ]
+    agent_replicas.insert(agent_name, replica_set)
+
+    return True
+
+
+def is_member(agent: AgentMetadata, canister_id: str) -> bool:
+    if agent["canister_id"] == canister_id:
+        return True
+
+    replica_set = agent_replicas.get(agent["agent_name"])
+
+    return replica_set is not None and _find(replica_set, canister_id) is not None
+
+
+def report_load(agent: AgentMetadata, canister_id: str, load: nat64, latency_ms: nat64):
+    replica_set = agent_replicas.get(agent["agent_name"]) or {"replicas": []}
+    state = _find(replica_set, canister_id)
+
+    if state is None:
+        # The primary canister is tracked here only once it starts reporting
+        state = {"canister_id": canister_id, "load": 0, "latency_ms": 0, "reported_at": 0}
+        replica_set["replicas"].append(state)
+
+    state["load"] = load
+    state["latency_ms"] = latency_ms
+    state["reported_at"] = ic.time()
+
+    agent_replicas.insert(agent["agent_name"], replica_set)
+
+
+def weighted_replicas(agent: AgentMetadata) -> List[WeightedReplica]:
+    """Primary plus replicas, weighted by 1 / ((1 + load) * (1 + latency / scale)), heaviest first."""
+
+    replica_set = agent_replicas.get(agent["agent_name"]) or {"replicas": []}
+
+    canister_ids = [agent["canister_id"]] + [
+        replica["canister_id"]
+        for replica in replica_set["replicas"]
+        if replica["canister_id"] != agent["canister_id"] and not _is_down(replica)
+    ]
+
+    scores = []
+    for canister_id in canister_ids:
+        load, latency_ms = _effective_load(_find(replica_set, canister_id))
+        scores.append(1.0 / ((1 + load) * (1 + latency_ms / LATENCY_SCALE_MS)))
+
+    total = sum(scores)
+
+    weighted = [
+        WeightedReplica(canister_id=canister_id, weight=score / total)
+        for canister_id, score in zip(canister_ids, scores)
+    ]
+
+    return sorted(weighted, key=lambda replica: -replica["weight"])
+
+
+def _effective_load(state: Optional[ReplicaState]):
+    if state is None:
+        # A primary that never reported
+        return 0, DEFAULT_REPLICA_LATENCY_MS
+
+    if _silent_for(state) > REPLICA_REPORT_TTL_SECONDS * _NANOS_PER_SECOND:
+        return STALE_REPLICA_LOAD, DEFAULT_REPLICA_LATENCY_MS
+
+    return state["load"], state["latency_ms"]
+
+
+def _is_down(state: ReplicaState) -> bool:
+    return _silent_for(state) > REPLICA_DOWN_AFTER_SECONDS * _NANOS_PER_SECOND
+
+
+def _silent_for(state: ReplicaState) -> int:
+    return ic.time() - state["reported_at"]
+
+
+def _find(replica_set, canister_id: str) -> Optional[ReplicaState]:
+    for replica in replica_set["replicas"]:
+        if replica["canister_id"] == canister_id:
+            return replica
+
+    return None
+
+# ====================================== REPLICAS ======================================
@@ -0,0 +1,147 @@
+import math
+import re
+from typing import List, Optional
+
+from kybra import Opt, Vec
+
+from constants import BM25_B, BM25_K1, NAME_TERM_WEIGHT
+from indexes import add_posting, live_postings, remove_posting
+from model import AgentSearchHit
+from storage import agent_registry, registry_counters, search_documents, term_frequencies
+
+# ======================================= SEARCH =======================================
+# Inverted index over agent names, descriptions and parameter descriptions, scored
+# with BM25. Postings lists reuse the "term" index of `indexes.py`; term frequencies,
+# per-agent documents and corpus totals live in their own stable maps.
+
+TERM_INDEX = "term"
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9.]*")
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "from", "how", "i", "in",
+    "is", "it", "of", "on", "or", "the", "this", "to", "was", "what", "with", "you",
+    "agent", "agentic", "ai", "related", "task", "tasks", "user",
+}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower().replace("-", " ").replace("_", " ")):
+        token = token.strip(".")
+        if len(token) < 2 or token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+
+    return tokens
+
+
+def metadata_terms(agent_name: str, metadata: Optional[dict]) -> dict:
+    """Term frequencies of an agent document built from its tool metadata."""
+
+    frequencies = {}
+
+    def add(tokens: List[str], weight: int = 1):
+        for token in tokens:
+            frequencies[token] = frequencies.get(token, 0) + weight
+
+    add(tokenize(agent_name), NAME_TERM_WEIGHT)
+
+    function = (metadata or {}).get("function") or {}
+    add(tokenize(function.get("description")))
+    add(tokenize(" ".join((metadata or {}).get("keywords") or [])))
+
+    for prop in ((function.get("parameters") or {}).get("properties") or []):
+        if prop.get("name") == "connected_agent_list":
+            continue
+        add(tokenize(prop.get("name")))
+        add(tokenize(prop.get("description")))
+
+    return frequencies
+
+
+def index_document(agent_name: str, frequencies: dict):
+    """Replace the indexed document of an agent."""
+
+    remove_document(agent_name)
+
+    for term, frequency in frequencies.items():
+        add_posting(TERM_INDEX, term, agent_name)
+        term_frequencies.insert(f"{term}@{agent_name}", frequency)
+        _add_counter(f"df:{term}", 1)
+
+    length = sum(frequencies.values())
+    search_documents.insert(agent_name, {"terms": list(frequencies.keys()), "length": length})
+    _add_counter("search.documents", 1)
+    _add_counter("search.total_length", length)
+
+
+def remove_document(agent_name: str):
+    document = search_documents.remove(agent_name)
+
+    if document is None:
+        return
+
+    for term in document["terms"]:
+        remove_posting(TERM_INDEX, term, agent_name)
+        term_frequencies.remove(f"{term}@{agent_name}")
+        _add_counter(f"df:{term}", -1)
+
+    _add_counter("search.documents", -1)
+    _add_counter("search.total_length", -document["length"])
+
+
+def search(query: str, k: int, candidates: Opt[Vec[str]] = None) -> List[AgentSearchHit]:
+    """Top-k agents for a free-text query, optionally restricted to `candidates`."""
+
+    documents = registry_counters.get("search.documents") or 0
+    if documents == 0:
+        return []
+
+    average_length = (registry_counters.get("search.total_length") or 0) / documents
+    allowed = set(candidates) if candidates is not None else None
+
+    scores = {}
+
+    for term in set(tokenize(query)):
+        document_frequency = registry_counters.get(f"df:{term}") or 0
+        if document_frequency == 0:
+            continue
+
+        idf = math.log(1 + (documents - document_frequency + 0.5) / (document_frequency + 0.5))
+
+        for agent_name in live_postings(TERM_INDEX, term):
+            if allowed is not None and agent_name not in allowed:
+                continue
+
+            frequency = term_frequencies.get(f"{term}@{agent_name}") or 0
+            document = search_documents.get(agent_name)
+            length = document["length"] if document is not None else average_length
+
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * length / max(average_length, 1))
+            scores[agent_name] = scores.get(agent_name, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:k]
+
+    hits = []
+    for agent_name, score in ranked:
+        agent = agent_registry.get(agent_name)
+        if agent is not None:
+            hits.append(AgentSearchHit(agent=agent, score=score))
+
+    return hits
+
+
+def _add_counter(name: str, amount: int):
+    value = max((registry_counters.get(name) or 0) + amount, 0)
+
+    if value == 0:
+        registry_counters.remove(name)
+    else:
+        registry_counters.insert(name, value)
+
+# ======================================= SEARCH =======================================
@@ -0,0 +1,64 @@
+from kybra import StableBTreeMap, nat64
+
+from model import *
+
+# ====================================== STORAGE =======================================
+# Every stable structure of the agent registry lives here so memory ids stay unique.
+
+# agent name -> agent record
+agent_registry = StableBTreeMap[str, AgentMetadata](
+    memory_id=1, max_key_size=128, max_value_size=2_000_000  # ~2MB chunks
+)
+
+# registration ordinal -> agent name (registration-time order)
+agent_sequence = StableBTreeMap[nat64, str](
+    memory_id=2, max_key_size=16, max_value_size=128
+)
+
+# "<index>:<value>#<position>" -> agent name (owner / tag postings lists)
+index_postings = StableBTreeMap[str, str](
+    memory_id=3, max_key_size=256, max_value_size=128
+)
+
+# "<index>:<value>" -> postings list length
+index_lengths = StableBTreeMap[str, nat64](
+    memory_id=4, max_key_size=256, max_value_size=16
+)
+
+# "<index>:<value>@<agent name>" -> position of the agent's live posting
+# "<index>:<value>!<agent name>" -> position of the agent's retired posting (reused on re-add)
+index_members = StableBTreeMap[str, nat64](
+    memory_id=5, max_key_size=384, max_value_size=16
+)
+
+# agent name -> indexed search terms and document length
+search_documents = StableBTreeMap[str, SearchDocument](
+    memory_id=6, max_key_size=128, max_value_size=16_384
+)
+
+# "<term>@<agent name>" -> term frequency within the agent's document
+term_frequencies = StableBTreeMap[str, nat64](
+    memory_id=7, max_key_size=256, max_value_size=16
+)
+
+# counter name -> value (search totals, document frequencies, ...)
+registry_counters = StableBTreeMap[str, nat64](
+    memory_id=8, max_key_size=256, max_value_size=16
+)
+
+# agent name -> published tool metadata (METADATA json) and its version
+tool_catalog = StableBTreeMap[str, ToolCatalogEntry](
+    memory_id=9, max_key_size=128, max_value_size=32_768
+)
+
+# registry version -> change (bounded append-only log)
+change_log = StableBTreeMap[nat64, ChangeRecord](
+    memory_id=10, max_key_size=16, max_value_size=512
+)
+
+# agent name -> additional replica canisters and their reported load
+agent_replicas = StableBTreeMap[str, ReplicaSet](
+    memory_id=11, max_key_size=128, max_value_size=8_192
+)
+
+# ====================================== STORAGE =======================================
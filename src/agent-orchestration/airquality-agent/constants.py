@@ -1,2 +1,8 @@
 
-LLM_CANISTER_ID = "w36hm-eqaaa-aaaal-qr76a-cai"
\ No newline at end of file
+LLM_CANISTER_ID = "w36hm-eqaaa-aaaal-qr76a-cai"
+AGENT_REGISTRY_CANISTER_ID = "cwrp5-kqaaa-aaaac-a4apa-cai"
+
+# Replica load reporting
+LOAD_REPORT_INTERVAL_SECONDS = 30
+LATENCY_EWMA_ALPHA = 0.2
+TASK_MAX_AGE_SECONDS = 600  # unfinished tasks older than this (trapped calls) stop counting as load
@@ -0,0 +1,66 @@
+from kybra import Async, Principal, ic, match
+
+from constants import AGENT_REGISTRY_CANISTER_ID, LATENCY_EWMA_ALPHA, TASK_MAX_AGE_SECONDS
+from model import AgentRegistryInterface
+
+# ==================================== LOAD REPORT =====================================
+# In-flight task count and moving-average latency of this canister, reported to the
+# agent registry so callers can weight it against the agent's other replicas. Running
+# tasks are tracked by start time; a task that never finished (its call trapped after
+# an await) stops counting once it is older than `TASK_MAX_AGE_SECONDS`.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+# task id -> start time
+_in_flight: dict = {}
+_task_seq = 0
+_latency_ms = 0.0
+
+
+def task_started() -> int:
+    global _task_seq
+    _task_seq += 1
+    _in_flight[_task_seq] = ic.time()
+    return _task_seq
+
+
+def task_finished(task_id: int):
+    global _latency_ms
+
+    started_at = _in_flight.pop(task_id, None)
+    if started_at is None:
+        return
+
+    latency_ms = (ic.time() - started_at) / 1_000_000
+    if _latency_ms == 0:
+        _latency_ms = latency_ms
+    else:
+        _latency_ms = (1 - LATENCY_EWMA_ALPHA) * _latency_ms + LATENCY_EWMA_ALPHA * latency_ms
+
+
+def in_flight() -> int:
+    oldest = ic.time() - TASK_MAX_AGE_SECONDS * _NANOS_PER_SECOND
+
+    for task_id in [task_id for task_id, started_at in _in_flight.items() if started_at < oldest]:
+        del _in_flight[task_id]
+
+    return len(_in_flight)
+
+
+def report_load(agent_name: str) -> Async[None]:
+
+    agent_registry = AgentRegistryInterface(Principal.from_str(AGENT_REGISTRY_CANISTER_ID))
+    resp_stream = yield agent_registry.report_replica_load(agent_name, in_flight(), int(_latency_ms))
+
+    response = match(
+        resp_stream,
+        {
+            "Ok": lambda ok: ok,
+            "Err": lambda err: { "Err": err }
+        }
+    )
+
+    if response.get("Err") is not None:
+        ic.print(f"[AirQualityAgent] Report Load - {response.get('Err')}")
+
+# ==================================== LOAD REPORT =====================================
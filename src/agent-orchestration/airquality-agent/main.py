@@ -5,6 +5,8 @@ import json
 from kybra import (
     Principal, 
     Async, 
+    init,
+    post_upgrade,
     update, 
     query, 
     match, 
@@ -16,10 +18,19 @@ from llm import *
 from model import *
 from tools_metadata import *
 from constants import *
+from load_report import report_load, task_started, task_finished
 # -====================================== IMPORT =======================================
 
 # ===================================== ROUTER MAIN ====================================
 
+@init
+def init_():
+    __start_timers()
+
+@post_upgrade
+def post_upgrade_():
+    __start_timers()
+
 @query
 def get_owner() -> Principal:
     return ic.id()
@@ -42,6 +53,20 @@ def execute_task(args: str) -> Async[ReturnType]:
     Example args : `[{"name": "prompt", "value": "How is the air quality in Jakarta ?"}]`
     """
 
+    task_id = task_started()
+    try:
+        response = yield __execute_task(args)
+    finally:
+        task_finished(task_id)
+
+    return response
+
+# ===================================== ROUTER MAIN ====================================
+
+# ===================================== HELPER FUNC ====================================
+
+def __execute_task(args: str) -> Async[ReturnType]:
+
     ic.print(f"[AirQualityAgent] Execute Task - {args}")
 
     try:
@@ -72,9 +97,28 @@ def execute_task(args: str) -> Async[ReturnType]:
     except Exception as e:
         return { "Err": json.dumps({"error": str(e)}) }
 
-# ===================================== ROUTER MAIN ====================================
+def __start_timers():
+    ic.set_timer(0, __publish_metadata)
+    ic.set_timer_interval(
+        LOAD_REPORT_INTERVAL_SECONDS,
+        lambda: report_load(METADATA["function"]["name"])
+    )
 
-# ===================================== HELPER FUNC ====================================
+def __publish_metadata() -> Async[None]:
+    """Push METADATA to the agent registry's tool catalog."""
+
+    agent_registry = AgentRegistryInterface(Principal.from_str(AGENT_REGISTRY_CANISTER_ID))
+    resp_stream = yield agent_registry.publish_tool_metadata(METADATA["function"]["name"], json.dumps(METADATA))
+
+    response = match(
+        resp_stream,
+        {
+            "Ok": lambda ok: ok,
+            "Err": lambda err: { "Err": err }
+        }
+    )
+
+    ic.print(f"[AirQualityAgent] Publish Metadata - {response}")
 
 def __transform_params(params: List[dict]) -> dict:
     return { p["name"]: p["value"] for p in params if p.get("value") is not None }
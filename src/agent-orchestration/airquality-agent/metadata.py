@@ -26,6 +26,10 @@ METADATA = create_function_tool(
     }
 )
 
+# Phrases the client agent's keyword router matches in prompts to pick this agent
+METADATA["keywords"] = ["air quality", "aqi", "pollution", "smog", "pm2.5", "pm10"]
+
+
 def is_all_required_params_present(params: List[dict]) -> bool:
 
     for param in METADATA['function']['parameters']['required'] or []:
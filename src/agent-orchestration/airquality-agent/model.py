@@ -1,6 +1,6 @@
 
 from kybra import (
-    Service, service_update, service_query, Opt, Variant
+    Service, service_update, service_query, Opt, Variant, nat64
 )
 
 from typing import List, Optional
@@ -18,3 +18,12 @@ class AgentInterface(Service):
     @service_update
     def execute_task(self, args: str) -> str:
         ...
+
+class AgentRegistryInterface(Service):
+    @service_update
+    def publish_tool_metadata(self, agent_name: str, metadata: str) -> ReturnType:
+        ...
+
+    @service_update
+    def report_replica_load(self, agent_name: str, load: nat64, latency_ms: nat64) -> ReturnType:
+        ...
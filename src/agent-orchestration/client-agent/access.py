@@ -0,0 +1,17 @@
+from kybra import GuardResult, ic
+
+# ======================================= ACCESS =======================================
+# Guard for admin methods. Controllers are checked against the canister's current
+# settings on every call, so added and removed controllers take effect right away. The
+# canister itself (timers, self-calls) is always allowed.
+
+
+def controller_only() -> GuardResult:
+    caller = ic.caller()
+
+    if caller == ic.id() or ic.is_controller(caller):
+        return {"Ok": None}
+
+    return {"Err": "Only controllers can call this method"}
+
+# ======================================= ACCESS =======================================
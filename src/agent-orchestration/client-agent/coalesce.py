@@ -0,0 +1,67 @@
+from typing import Callable, Optional
+
+from kybra import Async, ic
+from kybra.canisters.management import management_canister
+
+from constants import FANOUT_MAX_WAIT_TICKS
+from metrics import incr_counter
+
+# ====================================== COALESCE ======================================
+# Share one execution between identical calls. `flights` maps a call key to its entry;
+# the first caller runs the task and every later caller with the same key waits on
+# cheap `raw_rand` ticks for that result instead of running the task again.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+
+def call(
+    flights: dict,
+    key: str,
+    task: Callable,
+    forget: bool = False,
+    max_age_seconds: Optional[int] = None,
+    name: Optional[str] = None,
+) -> Async[dict]:
+    """Run `task` once per key in `flights`.
+
+    With `forget` the entry is dropped when the task completes, so only callers that
+    arrived while it ran share the result. A flight older than `max_age_seconds` that
+    never completed (its runner trapped) is replaced. With a `name`, `{name}.runs` and
+    `{name}.joined` count executions and attached callers.
+    """
+
+    flight = flights.get(key)
+
+    if flight is not None and flight["result"] is None and max_age_seconds is not None:
+        if ic.time() - flight["started_at"] > max_age_seconds * _NANOS_PER_SECOND:
+            flight = None
+
+    if flight is not None:
+        if name is not None:
+            incr_counter(f"{name}.joined")
+
+        ticks = 0
+        while flight["result"] is None and ticks < FANOUT_MAX_WAIT_TICKS:
+            yield management_canister.raw_rand()
+            ticks += 1
+
+        if flight["result"] is None:
+            return {"Err": "Timed out waiting for task"}
+
+        return flight["result"]
+
+    if name is not None:
+        incr_counter(f"{name}.runs")
+
+    flight = {"result": None, "started_at": ic.time()}
+    flights[key] = flight
+
+    result = yield task()
+    flight["result"] = result if result is not None else {"Err": "No result"}
+
+    if forget and flights.get(key) is flight:
+        flights.pop(key)
+
+    return flight["result"]
+
+# ====================================== COALESCE ======================================
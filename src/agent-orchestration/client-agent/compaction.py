@@ -0,0 +1,102 @@
+import math
+import re
+from typing import List, Tuple
+
+from constants import CHARS_PER_TOKEN
+
+# ===================================== COMPACTION =====================================
+# Shrinks agent answers before they are combined by the refinement LLM. A total token
+# budget is split across agents (short answers keep what they need, the rest is shared
+# by the longer ones), then every answer keeps its most salient sentences, in their
+# original order, until its share is used up. Tokens are estimated from characters.
+
+_SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+")
+_TERM_PATTERN = re.compile(r"[a-z0-9]+")
+_NUMBER_PATTERN = re.compile(r"\d")
+
+_STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "for", "how", "in", "is", "it",
+    "of", "on", "or", "the", "to", "was", "what", "with",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def compact(answers: List[Tuple[str, str]], prompt: str, budget: int) -> List[Tuple[str, str]]:
+    """Fit `(agent_name, answer)` pairs into `budget` tokens overall."""
+
+    allowances = _allocate([estimate_tokens(answer) for _, answer in answers], budget)
+    prompt_terms = _terms(prompt)
+
+    return [
+        (agent_name, _trim(answer, allowance, prompt_terms))
+        for (agent_name, answer), allowance in zip(answers, allowances)
+    ]
+
+
+def _allocate(needs: List[int], budget: int) -> List[int]:
+    """Max-min fair split of `budget` over `needs`."""
+
+    allowances = [0] * len(needs)
+    pending = sorted(range(len(needs)), key=lambda index: needs[index])
+
+    while len(pending) > 0:
+        share = budget // len(pending)
+        index = pending.pop(0)
+        allowances[index] = min(needs[index], share)
+        budget -= allowances[index]
+
+    return allowances
+
+
+def _trim(answer: str, allowance: int, prompt_terms: set) -> str:
+    answer = answer.strip()
+
+    if estimate_tokens(answer) <= allowance:
+        return answer
+
+    sentences = [sentence for sentence in _SENTENCE_PATTERN.split(answer) if sentence]
+    ranked = sorted(
+        range(len(sentences)),
+        key=lambda index: _salience(sentences[index], index, prompt_terms),
+        reverse=True,
+    )
+
+    kept = set()
+    used = 0
+
+    for index in ranked:
+        cost = estimate_tokens(sentences[index]) + 1
+        if used + cost <= allowance:
+            kept.add(index)
+            used += cost
+
+    if len(kept) == 0:
+        # Not even one sentence fits, cut the most salient one at a word boundary
+        best = sentences[ranked[0]]
+        return best[: allowance * CHARS_PER_TOKEN].rsplit(" ", 1)[0]
+
+    return " ".join(sentences[index] for index in sorted(kept))
+
+
+def _salience(sentence: str, position: int, prompt_terms: set) -> float:
+    """Prompt term overlap, plus a bonus for figures and for the leading sentence."""
+
+    terms = _terms(sentence)
+    score = len(terms & prompt_terms)
+
+    if _NUMBER_PATTERN.search(sentence) is not None:
+        score += 1
+    if position == 0:
+        score += 0.5
+
+    # Prefer denser sentences among equals
+    return score - len(sentence) / 10_000
+
+
+def _terms(text: str) -> set:
+    return {term for term in _TERM_PATTERN.findall(text.lower()) if term not in _STOPWORDS}
+
+# ===================================== COMPACTION =====================================
@@ -6,3 +6,86 @@ LEDGER_CANISTER_ID = "ryjl3-tyaaa-aaaaa-aaaba-cai"  # ICP Ledger
 FEE_NUM = 10  # 10%
 FEE_DEN = 100
 APP_WALLET_TEXT = "5xui2-5tscz-g5fwh-fjoqc-w5dxz-llyxy-kxfmy-duqxk-nys4p-ondip-dae"
+PAYMENTS_ENABLED = False  # debit callers' prepaid balances for every agent call
+TRUSTED_PROXY_CANISTER_ID = "hnltm-maaaa-aaaac-a4aqa-cai"  # backend; its `user` param names the account billed
+PRICING_CACHE_TTL_SECONDS = 120
+PRICING_REFRESH_INTERVAL_SECONDS = 60  # cached prices are re-quoted in the background
+SETTLEMENT_INTERVAL_SECONDS = 3_600  # owner and fee payouts are flushed once per window
+LEDGER_TRANSFER_FEE = 10_000  # e8s charged by the ledger per icrc1_transfer, paid out of the amount sent
+SETTLEMENT_MIN_PAYOUT = 10 * LEDGER_TRANSFER_FEE  # smaller accruals wait for a later window
+LEDGER_DEDUP_WINDOW_SECONDS = 86_400  # ICRC-1 transaction window for memo deduplication
+
+# Agent fan-out
+AGENT_FANOUT_ENABLED = True  # invoke independent downstream agents concurrently
+FANOUT_MAX_WAIT_TICKS = 600  # barrier ticks (~1 round each) before a batch times out
+FANOUT_BATCH_MAX_AGE_SECONDS = 900  # batches nobody collected (their waiter trapped) are dropped after this
+DISCOVERY_ALLOW_PARTIAL = True  # plan with the agents that answered when some discovery calls fail
+
+# Registry resolution cache
+REGISTRY_CACHE_TTL_SECONDS = 300
+REPLICA_CACHE_TTL_SECONDS = 30  # replicated agents are re-read sooner to follow load reports
+
+# Tool schema cache
+SCHEMA_CACHE_TTL_SECONDS = 600
+
+# Tool shortlisting
+TOOL_SHORTLIST_SIZE = 4  # above this many connected agents, only the registry's top-k are offered to the planner
+
+# Registry change feed
+REGISTRY_SYNC_INTERVAL_SECONDS = 30
+
+# Orchestration response cache
+RESPONSE_CACHE_TTL_SECONDS = 600
+RESPONSE_CACHE_CAPACITY = 256
+
+# Forward the prompt directly when only one agent is connected
+SINGLE_AGENT_FAST_PATH = True
+
+# Routing plan cache
+PLAN_CACHE_TTL_SECONDS = 3_600
+PLAN_CACHE_CAPACITY = 512
+
+# Keyword router ahead of the planner LLM (keywords come from each agent's METADATA)
+ROUTER_ENABLED = True
+
+# Speculative agent calls overlapping the planner (opt-in)
+SPECULATIVE_EXECUTION_ENABLED = False
+
+# Background jobs (submit_task / get_job)
+JOB_RETENTION_SECONDS = 3_600  # finished jobs are kept this long for polling
+JOB_MAX_RUNTIME_SECONDS = 900  # running jobs older than this are marked failed
+JOB_GC_INTERVAL_SECONDS = 300
+JOB_SECTION_MAX_BYTES = 4_096  # per-agent partial results are truncated to this (UTF-8)
+JOB_MAX_SECTIONS = 8  # keeps a job within its stable map value size
+JOB_RESULT_MAX_BYTES = 16_384
+
+# Batch execution (execute_tasks)
+BATCH_MAX_ITEMS = 256
+BATCH_MAX_CONCURRENCY = 8  # orchestrations running at once within a batch
+
+# Single-flight coalescing of identical in-flight orchestrations
+IN_FLIGHT_MAX_AGE_SECONDS = 600  # older unfinished flights are treated as dead runners
+
+# Result compaction ahead of the refinement LLM
+REFINEMENT_TOKEN_BUDGET = 512  # total tokens of agent answers passed to refinement
+CHARS_PER_TOKEN = 4  # rough estimate for llama-family tokenizers on English text
+
+# Idempotency keys for execute_task retries
+IDEMPOTENCY_TTL_SECONDS = 86_400
+IDEMPOTENCY_CAPACITY = 1_024
+
+# Per-stage histograms (get_metrics)
+METRIC_STAGES = [
+    "execute_task",
+    "registry_lookup",
+    "metadata_fetch",
+    "planner_llm",
+    "payment",
+    "agent_call",
+    "refinement",
+]
+LATENCY_BUCKETS_MS = [10, 25, 50, 100, 250, 500, 1_000, 2_500, 5_000, 10_000, 25_000, 60_000]
+INSTRUCTION_BUCKETS = [
+    100_000, 1_000_000, 5_000_000, 20_000_000, 100_000_000, 500_000_000, 2_000_000_000,
+    10_000_000_000, 40_000_000_000,
+]
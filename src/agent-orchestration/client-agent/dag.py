@@ -0,0 +1,156 @@
+import re
+from typing import Callable, List, Optional
+
+from kybra import Async
+from kybra.canisters.management import management_canister
+
+from constants import AGENT_FANOUT_ENABLED, FANOUT_MAX_WAIT_TICKS
+from fanout import discard_batch, poll_batch, start_batch
+
+# ======================================== DAG =========================================
+# Multi-step plans. A tool call depends on another one when it lists it in a
+# `depends_on` argument (comma separated) or references its output as `{{ref}}` in an
+# argument value, where `ref` is the other call's id or agent name. Calls run as soon
+# as all of their dependencies have finished (ready-set scheduling), so independent
+# branches never wait on each other; the referenced outputs are substituted in first.
+
+DEPENDS_ON_ARGUMENT = "depends_on"
+
+_REFERENCE_PATTERN = re.compile(r"\{\{\s*([\w.-]+)\s*\}\}")
+
+
+def has_dependencies(agent_call_list: List[dict]) -> bool:
+    dependencies = _dependencies(agent_call_list)
+    return dependencies is None or any(len(deps) > 0 for deps in dependencies)
+
+
+def execute(agent_call_list: List[dict], make_task: Callable) -> Async[list]:
+    """Run the plan respecting its dependencies; returns `(agent_name, result)` pairs in
+    plan order. `make_task(agent_name, arguments)` returns a no-arg task as used by
+    fan-out. A call whose dependency failed is not run and fails as well."""
+
+    dependencies = _dependencies(agent_call_list)
+    names = [agent["function"]["name"] for agent in agent_call_list]
+
+    if dependencies is None:
+        return [(name, {"Err": "Plan has cyclic dependencies"}) for name in names]
+
+    results: List[Optional[dict]] = [None] * len(agent_call_list)
+    running = {}
+    # Ticks since a call last finished, so deep plans are not limited in total duration
+    idle_ticks = 0
+
+    try:
+        while any(result is None for result in results):
+            for index in _ready(dependencies, results, running):
+                failed = [dep for dep in dependencies[index] if results[dep].get("Err") is not None]
+                if len(failed) > 0:
+                    results[index] = {"Err": f"Dependency '{names[failed[0]]}' failed"}
+                    continue
+
+                task = make_task(names[index], _arguments(agent_call_list, index, results))
+
+                if not AGENT_FANOUT_ENABLED:
+                    results[index] = yield task()
+                    continue
+
+                running[index] = start_batch([task])
+
+            if len(running) == 0:
+                continue
+
+            if idle_ticks >= FANOUT_MAX_WAIT_TICKS:
+                for index, batch_id in running.items():
+                    discard_batch(batch_id)
+                    results[index] = {"Err": "Timed out waiting for task"}
+                running.clear()
+                idle_ticks = 0
+                continue
+
+            yield management_canister.raw_rand()
+            idle_ticks += 1
+
+            for index, batch_id in list(running.items()):
+                finished = poll_batch(batch_id)
+                if finished is not None:
+                    results[index] = finished[0]
+                    del running[index]
+                    idle_ticks = 0
+    finally:
+        for batch_id in running.values():
+            discard_batch(batch_id)
+
+    return list(zip(names, results))
+
+
+def _ready(dependencies: List[List[int]], results: list, running: dict) -> List[int]:
+    return [
+        index
+        for index, deps in enumerate(dependencies)
+        if results[index] is None
+        and index not in running
+        and all(results[dep] is not None for dep in deps)
+    ]
+
+
+def _dependencies(agent_call_list: List[dict]) -> Optional[List[List[int]]]:
+    """Dependency indices per call, or None when they are cyclic. References to unknown
+    calls are left as plain text."""
+
+    refs = {}
+    for index, agent in enumerate(agent_call_list):
+        for ref in (agent.get("id"), agent["function"]["name"]):
+            if ref and ref not in refs:
+                refs[ref] = index
+
+    dependencies = []
+
+    for index, agent in enumerate(agent_call_list):
+        deps = set()
+
+        for arg in agent["function"]["arguments"]:
+            if arg["name"] == DEPENDS_ON_ARGUMENT:
+                targets = [ref.strip() for ref in arg["value"].split(",") if ref.strip()]
+            else:
+                targets = _REFERENCE_PATTERN.findall(arg["value"])
+
+            deps.update(refs[ref] for ref in targets if refs.get(ref, index) != index)
+
+        dependencies.append(sorted(deps))
+
+    # Kahn's algorithm, only to reject cycles
+    remaining = {index: set(deps) for index, deps in enumerate(dependencies)}
+    while len(remaining) > 0:
+        roots = [index for index, deps in remaining.items() if len(deps) == 0]
+        if len(roots) == 0:
+            return None
+        for root in roots:
+            del remaining[root]
+        for deps in remaining.values():
+            deps.difference_update(roots)
+
+    return dependencies
+
+
+def _arguments(agent_call_list: List[dict], index: int, results: list) -> List[dict]:
+    """The call's arguments with `{{ref}}` replaced by the referenced call's output."""
+
+    outputs = {}
+    for position, agent in enumerate(agent_call_list):
+        if results[position] is not None and results[position].get("Ok") is not None:
+            for ref in (agent.get("id"), agent["function"]["name"]):
+                if ref and ref not in outputs:
+                    outputs[ref] = results[position].get("Ok")
+
+    return [
+        {
+            "name": arg["name"],
+            "value": _REFERENCE_PATTERN.sub(
+                lambda match: outputs.get(match.group(1), match.group(0)), arg["value"]
+            ),
+        }
+        for arg in agent_call_list[index]["function"]["arguments"]
+        if arg["name"] != DEPENDS_ON_ARGUMENT
+    ]
+
+# ======================================== DAG =========================================
@@ -0,0 +1,41 @@
+from kybra import nat64
+
+from storage import balances
+
+# ======================================= ESCROW =======================================
+# Prepaid balances. Callers deposit once through the ledger (`deposit`), and paid agent
+# calls are then debited here with a single map update instead of a ledger transfer
+# on the request path.
+
+
+def balance_of(account: str) -> nat64:
+    return balances.get(account) or 0
+
+
+def credit(account: str, amount: int) -> nat64:
+    """Add `amount` to the balance; a zero amount (a free call's refund) writes nothing."""
+
+    if amount == 0:
+        return balance_of(account)
+
+    balance = balance_of(account) + amount
+    balances.insert(account, balance)
+    return balance
+
+
+def debit(account: str, amount: int) -> bool:
+    """Take `amount` from the balance; False (and nothing taken) when it is short."""
+
+    balance = balance_of(account)
+
+    if balance < amount:
+        return False
+
+    if balance == amount:
+        balances.remove(account)
+    else:
+        balances.insert(account, balance - amount)
+
+    return True
+
+# ======================================= ESCROW =======================================
@@ -0,0 +1,157 @@
+from typing import Callable, List, Optional
+
+from kybra import Async, ic
+from kybra.canisters.management import management_canister
+
+from constants import FANOUT_BATCH_MAX_AGE_SECONDS, FANOUT_MAX_WAIT_TICKS
+
+# ====================================== FAN-OUT =======================================
+# Kybra drives one `yield` at a time per message, so concurrent cross-canister calls
+# are issued from zero-delay timers: every task runs in its own execution context and
+# writes its result back here, while the caller parks on cheap `raw_rand` calls until
+# the whole batch has finished. Batches live on the heap only; a waiter always collects
+# its batch, and batches left behind by a waiter that trapped are dropped once they are
+# older than `FANOUT_BATCH_MAX_AGE_SECONDS`.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+_batches: dict = {}
+_batch_seq = 0
+
+
+def start_batch(tasks: List[Callable]) -> str:
+    """Schedule every task (a no-arg callable returning a generator) concurrently."""
+
+    global _batch_seq
+    _batch_seq += 1
+
+    _drop_abandoned_batches()
+
+    batch_id = f"{ic.time()}-{_batch_seq}"
+    _batches[batch_id] = {"results": [None] * len(tasks), "started_at": ic.time()}
+
+    for index, task in enumerate(tasks):
+        ic.set_timer(0, _make_runner(batch_id, index, task))
+
+    return batch_id
+
+
+def wait_batch(batch_id: str, indices: Optional[List[int]] = None) -> Async[list]:
+    """Wait until the tasks at `indices` (default: all) are done and return their
+    results in that order. The batch is collected afterwards, so the results of any
+    task not waited for are dropped.
+
+    Tasks that have not finished after `FANOUT_MAX_WAIT_TICKS` ticks (including tasks
+    that trapped) are reported as `{"Err": ...}`.
+    """
+
+    results = _batches[batch_id]["results"]
+    indices = indices if indices is not None else list(range(len(results)))
+
+    ticks = 0
+
+    try:
+        while any(results[index] is None for index in indices) and ticks < FANOUT_MAX_WAIT_TICKS:
+            yield management_canister.raw_rand()
+            ticks += 1
+    finally:
+        discard_batch(batch_id)
+
+    return [
+        results[index] if results[index] is not None else {"Err": "Timed out waiting for task"}
+        for index in indices
+    ]
+
+
+def poll_batch(batch_id: str) -> Optional[list]:
+    """Results of a finished batch (collecting it), or None while tasks are running."""
+
+    results = _batches[batch_id]["results"]
+
+    if any(result is None for result in results):
+        return None
+
+    _batches.pop(batch_id)
+
+    return results
+
+
+def discard_batch(batch_id: str):
+    """Drop a batch without waiting; its tasks still run but their results are ignored."""
+
+    _batches.pop(batch_id, None)
+
+
+def gather(tasks: List[Callable]) -> Async[list]:
+    """Run tasks concurrently and return their results in task order."""
+
+    if len(tasks) == 0:
+        return []
+
+    batch_id = start_batch(tasks)
+    results = yield wait_batch(batch_id)
+
+    return results
+
+
+def gather_bounded(tasks: List[Callable], limit: int) -> Async[list]:
+    """Like `gather`, but keeps at most `limit` tasks running at a time. A task is
+    started as soon as another finishes; the batch times out only when no task has
+    finished for `FANOUT_MAX_WAIT_TICKS` ticks."""
+
+    results = [None] * len(tasks)
+    running = {}
+    next_index = 0
+    idle_ticks = 0
+
+    try:
+        while next_index < len(tasks) or len(running) > 0:
+            while next_index < len(tasks) and len(running) < limit:
+                running[next_index] = start_batch([tasks[next_index]])
+                next_index += 1
+
+            if idle_ticks >= FANOUT_MAX_WAIT_TICKS:
+                for index in running:
+                    results[index] = {"Err": "Timed out waiting for task"}
+                for index in range(next_index, len(tasks)):
+                    results[index] = {"Err": "Timed out waiting for task"}
+                break
+
+            yield management_canister.raw_rand()
+            idle_ticks += 1
+
+            for index, batch_id in list(running.items()):
+                finished = poll_batch(batch_id)
+                if finished is not None:
+                    results[index] = finished[0]
+                    del running[index]
+                    idle_ticks = 0
+    finally:
+        for batch_id in running.values():
+            discard_batch(batch_id)
+
+    return results
+
+
+def _drop_abandoned_batches():
+    oldest = ic.time() - FANOUT_BATCH_MAX_AGE_SECONDS * _NANOS_PER_SECOND
+
+    for batch_id in [key for key, batch in _batches.items() if batch["started_at"] < oldest]:
+        discard_batch(batch_id)
+
+
+def _make_runner(batch_id: str, index: int, task: Callable) -> Callable:
+
+    def runner() -> Async[None]:
+        result = yield task()
+
+        batch = _batches.get(batch_id)
+        if batch is None:
+            # Batch already timed out and was collected
+            return
+
+        batch["results"][index] = result if result is not None else {"Err": "No result"}
+
+    return runner
+
+# ====================================== FAN-OUT =======================================
@@ -0,0 +1,106 @@
+import hashlib
+
+from kybra import Async, ic
+from kybra.canisters.management import management_canister
+
+from constants import (
+    FANOUT_MAX_WAIT_TICKS,
+    IDEMPOTENCY_CAPACITY,
+    IDEMPOTENCY_TTL_SECONDS,
+    IN_FLIGHT_MAX_AGE_SECONDS,
+)
+from lru import LruIndex
+from stable import checked_insert
+from storage import idempotency_order, idempotency_records
+
+# ==================================== IDEMPOTENCY =====================================
+# Optional per-caller idempotency keys. The first request with a key leaves an
+# in-progress marker, and on success its result replaces the marker. A retry with the
+# same key returns that result, or waits for the first execution to finish. Failures
+# clear the marker so a retry runs again. Records expire after
+# `IDEMPOTENCY_TTL_SECONDS`; beyond `IDEMPOTENCY_CAPACITY` the oldest ones are dropped.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+_order = LruIndex("idempotency", idempotency_order)
+
+
+def record_key(caller: str, idempotency_key: str) -> str:
+    return hashlib.sha256(f"{caller}|{idempotency_key}".encode()).hexdigest()
+
+
+def claim(key: str) -> bool:
+    """True when this request owns the execution for `key` (no live record existed)."""
+
+    record = idempotency_records.get(key)
+
+    if record is not None and not _is_abandoned(record):
+        return False
+
+    if record is not None:
+        _order.forget(record["order_tick"])
+
+    idempotency_records.insert(
+        key,
+        {"result": None, "created_at": ic.time(), "order_tick": _order.touch(key)},
+    )
+
+    while idempotency_records.len() > IDEMPOTENCY_CAPACITY:
+        oldest = _order.pop_oldest()
+        if oldest is None:
+            break
+        idempotency_records.remove(oldest)
+
+    return True
+
+
+def complete(key: str, result: dict):
+    record = idempotency_records.get(key)
+
+    if record is None:
+        return
+
+    if result.get("Ok") is None:
+        # Let a retry run again instead of replaying a failure
+        idempotency_records.remove(key)
+        _order.forget(record["order_tick"])
+        return
+
+    record["result"] = result.get("Ok")
+
+    if not checked_insert(idempotency_records, key, record):
+        # A result too large to keep cannot be replayed; free the key instead of
+        # leaving retries waiting on the in-progress marker
+        idempotency_records.remove(key)
+        _order.forget(record["order_tick"])
+
+
+def wait_result(key: str) -> Async[dict]:
+    """Outcome of the execution that claimed `key`, waiting while it is still running."""
+
+    ticks = 0
+
+    while ticks < FANOUT_MAX_WAIT_TICKS:
+        record = idempotency_records.get(key)
+
+        if record is None:
+            return {"Err": "Previous request with this idempotency key failed, retry it"}
+        if record["result"] is not None:
+            return {"Ok": record["result"]}
+
+        yield management_canister.raw_rand()
+        ticks += 1
+
+    return {"Err": "Request with this idempotency key is still in progress"}
+
+
+def _is_abandoned(record: dict) -> bool:
+    age = ic.time() - record["created_at"]
+
+    if record["result"] is None:
+        # In-progress marker of an execution that trapped
+        return age > IN_FLIGHT_MAX_AGE_SECONDS * _NANOS_PER_SECOND
+
+    return age > IDEMPOTENCY_TTL_SECONDS * _NANOS_PER_SECOND
+
+# ==================================== IDEMPOTENCY =====================================
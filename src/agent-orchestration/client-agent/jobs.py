@@ -0,0 +1,120 @@
+from typing import Optional
+
+from kybra import ic
+
+from constants import (
+    JOB_MAX_RUNTIME_SECONDS,
+    JOB_MAX_SECTIONS,
+    JOB_RESULT_MAX_BYTES,
+    JOB_RETENTION_SECONDS,
+    JOB_SECTION_MAX_BYTES,
+)
+from metrics import incr_counter
+from model import Job
+from stable import checked_insert, truncate_utf8
+from storage import jobs
+
+# ======================================== JOBS ========================================
+# Background orchestrations started by `submit_task`. Each job records its plan size
+# and a section per finished agent call as they arrive, so `get_job` can report
+# progress before the final answer exists. A periodic sweep drops finished jobs after
+# `JOB_RETENTION_SECONDS` and fails jobs that never finished (e.g. trapped runners).
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+
+def create(caller: str) -> str:
+    """Start a job owned by `caller`, the account billed for it."""
+    job_id = f"job-{incr_counter('jobs.seq')}"
+
+    jobs.insert(
+        job_id,
+        {
+            "job_id": job_id,
+            "status": RUNNING,
+            "caller": caller,
+            "created_at": ic.time(),
+            "finished_at": None,
+            "planned_calls": None,
+            "sections": [],
+            "result": None,
+            "error": None,
+        },
+    )
+
+    return job_id
+
+
+def get(job_id: str) -> Optional[Job]:
+    return jobs.get(job_id)
+
+
+def set_planned_calls(job_id: str, planned_calls: int):
+    job = jobs.get(job_id)
+    if job is None:
+        return
+
+    job["planned_calls"] = planned_calls
+    jobs.insert(job_id, job)
+
+
+def record_section(job_id: str, agent_name: str, result: dict):
+    """Store one agent's result as soon as it arrives."""
+
+    job = jobs.get(job_id)
+    if job is None or job["status"] != RUNNING or len(job["sections"]) >= JOB_MAX_SECTIONS:
+        return
+
+    ok = result.get("Err") is None
+    content = result.get("Ok") if ok else result.get("Err")
+
+    job["sections"].append(
+        {
+            "agent_name": agent_name,
+            "ok": ok,
+            "content": truncate_utf8(str(content), JOB_SECTION_MAX_BYTES),
+            "finished_at": ic.time(),
+        }
+    )
+    checked_insert(jobs, job_id, job)
+
+
+def finish(job_id: str, result: dict):
+    job = jobs.get(job_id)
+    if job is None or job["status"] != RUNNING:
+        return
+
+    job["finished_at"] = ic.time()
+
+    if result.get("Err") is not None:
+        job["status"] = FAILED
+        job["error"] = truncate_utf8(result.get("Err"), JOB_RESULT_MAX_BYTES)
+    else:
+        job["status"] = DONE
+        job["result"] = truncate_utf8(result.get("Ok"), JOB_RESULT_MAX_BYTES)
+
+    checked_insert(jobs, job_id, job)
+
+
+def collect_garbage():
+    now = ic.time()
+    removed = 0
+
+    for job_id, job in jobs.items():
+        if job["status"] == RUNNING:
+            if now - job["created_at"] > JOB_MAX_RUNTIME_SECONDS * _NANOS_PER_SECOND:
+                finish(job_id, {"Err": "Job did not finish in time"})
+            continue
+
+        if now - job["finished_at"] > JOB_RETENTION_SECONDS * _NANOS_PER_SECOND:
+            jobs.remove(job_id)
+            removed += 1
+
+    if removed > 0:
+        ic.print(f"[ClientAgent] Collected {removed} finished jobs")
+
+# ======================================== JOBS ========================================
@@ -0,0 +1,51 @@
+from typing import Optional
+
+from kybra import StableBTreeMap
+
+from metrics import get_counter, incr_counter, set_counter
+
+# ======================================== LRU =========================================
+# Recency order for a stable-memory cache. StableBTreeMap has no ordered scans, so each
+# access gets a fresh tick from a counter, `ticks` maps tick -> cache key, and the
+# oldest live tick is found by walking up from a persisted floor (amortised O(1)).
+
+
+class LruIndex:
+
+    def __init__(self, name: str, ticks: StableBTreeMap):
+        self.ticks = ticks
+        self.tick_counter = f"{name}.tick"
+        self.floor_counter = f"{name}.lru_floor"
+
+    def touch(self, key: str, previous_tick: Optional[int] = None) -> int:
+        """Mark `key` as most recently used and return its new tick."""
+
+        if previous_tick is not None:
+            self.ticks.remove(previous_tick)
+
+        tick = incr_counter(self.tick_counter)
+        self.ticks.insert(tick, key)
+
+        return tick
+
+    def forget(self, tick: int):
+        self.ticks.remove(tick)
+
+    def pop_oldest(self) -> Optional[str]:
+        """Remove and return the least recently used key."""
+
+        tick = get_counter(self.floor_counter)
+        last_tick = get_counter(self.tick_counter)
+
+        while tick <= last_tick:
+            key = self.ticks.remove(tick)
+            if key is not None:
+                set_counter(self.floor_counter, tick + 1)
+                return key
+            tick += 1
+
+        set_counter(self.floor_counter, tick)
+
+        return None
+
+# ======================================== LRU =========================================
@@ -1,22 +1,55 @@
 # -====================================== IMPORT =======================================
-from kybra import Principal, Async, update, query, match, ic
+from kybra import Principal, Async, Opt, Vec, nat64, init, post_upgrade, update, query, match, ic
 
 from llm import *
-from typing import List
+from typing import List, Optional
 import json
 
 from model import *
 from metadata import *
 from constants import *
+from fanout import gather, gather_bounded
+import registry_cache
+from registry_cache import resolve_canister_id, resolve_canister_ids
+import schema_cache
+import pricing_cache
+from registry_sync import sync_registry_changes
+import response_cache
+import plan_cache
+import router
+import speculation
+import dag
+import jobs
+import coalesce
+import compaction
+import escrow
+import settlement
+import idempotency
+from metrics import get_counter, incr_counter, list_counters, observe_stage, stage_summary, start_stage
 
 # Payment / ledger related imports moved from function scope
-from model import Ledger, TransferFromArgs, Account, TransferArg
+from model import Ledger
+
+from access import controller_only
 
 # -====================================== IMPORT =======================================
 
+# request key -> running orchestration, for single-flight coalescing
+_in_flight: dict = {}
+
 # ===================================== ROUTER MAIN ====================================
 
 
+@init
+def init_():
+    __start_timers()
+
+
+@post_upgrade
+def post_upgrade_():
+    __start_timers()
+
+
 @query
 def get_owner() -> Principal:
     return ic.id()
@@ -37,16 +70,393 @@ def get_metadata() -> ReturnType:
     return {"Ok": json.dumps(METADATA)}
 
 
+@query
+def get_registry_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters of the agent name -> canister id cache.
+    """
+    return registry_cache.get_stats()
+
+
+@update(guard=controller_only)
+def invalidate_registry_cache(agent_name: Opt[str]) -> ReturnType:
+    """
+    Drop a cached agent resolution, or the whole cache when no name is given.
+    """
+    removed = registry_cache.invalidate(agent_name)
+    return {"Ok": f"Invalidated {removed} registry cache entries"}
+
+
+@query
+def get_tool_schema_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters of the processed agent tool schema cache.
+    """
+    return schema_cache.get_stats()
+
+
+@update(guard=controller_only)
+def invalidate_tool_schema_cache(agent_name: Opt[str]) -> ReturnType:
+    """
+    Drop a cached agent tool schema, or every schema when no name is given.
+    """
+    removed = schema_cache.invalidate(agent_name)
+    return {"Ok": f"Invalidated {removed} tool schema cache entries"}
+
+
+@query
+def get_pricing_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters of the agent price and owner cache.
+    """
+    return pricing_cache.get_stats()
+
+
+@update(guard=controller_only)
+def invalidate_pricing_cache(agent_name: Opt[str]) -> ReturnType:
+    """
+    Drop a cached agent price quote, or every quote when no name is given.
+    """
+    removed = pricing_cache.invalidate(agent_name)
+    return {"Ok": f"Invalidated {removed} pricing cache entries"}
+
+
+@query
+def get_response_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters of the orchestration response cache.
+    """
+    return response_cache.get_stats()
+
+
+@update(guard=controller_only)
+def invalidate_response_cache() -> ReturnType:
+    """
+    Drop every cached orchestration response.
+    """
+    removed = response_cache.invalidate()
+    return {"Ok": f"Invalidated {removed} response cache entries"}
+
+
+@query
+def get_plan_cache_stats() -> CacheStats:
+    """
+    Hit/miss counters of the prompt template plan cache.
+    """
+    return plan_cache.get_stats()
+
+
+@update(guard=controller_only)
+def invalidate_plan_cache() -> ReturnType:
+    """
+    Drop every cached routing plan.
+    """
+    removed = plan_cache.invalidate()
+    return {"Ok": f"Invalidated {removed} plan cache entries"}
+
+
+@query
+def get_router_stats() -> RouterStats:
+    """
+    How often the keyword router planned a request without the planner LLM.
+    """
+    return router.get_stats()
+
+
+@query
+def get_speculation_stats() -> SpeculationStats:
+    """
+    Speculative agent calls launched alongside planning, and how many were wasted.
+    """
+    return speculation.get_stats()
+
+
+@query
+def get_single_flight_stats() -> SingleFlightStats:
+    """
+    Orchestrations actually run vs identical requests that joined a running one.
+    """
+    return {
+        "runs": get_counter("single_flight.runs"),
+        "joined": get_counter("single_flight.joined"),
+        "in_flight": len(_in_flight),
+    }
+
+
+@update
+def deposit(amount: nat64) -> Async[ReturnType]:
+    """
+    Move `amount` from the caller's ledger account into their prepaid balance. The
+    caller must have approved client-agent for `amount` (plus the ledger fee) first.
+    """
+
+    if amount == 0:
+        return {"Err": "Deposit amount must be positive"}
+
+    ledger = Ledger(Principal.from_str(LEDGER_CANISTER_ID))
+    caller = ic.caller()
+
+    charge_stream = yield ledger.icrc2_transfer_from(
+        {
+            "spender_subaccount": None,
+            "from_": {"owner": caller, "subaccount": None},
+            "to": {"owner": ic.id(), "subaccount": None},
+            "amount": amount,
+            "fee": None,
+            "memo": None,
+            "created_at_time": None,
+        }
+    )
+    charge = match(charge_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
+
+    if charge.get("Err") is not None:
+        ic.print(f"[ClientAgent] Deposit failed: {charge.get('Err')}")
+        err = charge.get("Err")
+        if isinstance(err, dict) and "InsufficientAllowance" in err:
+            return {"Err": "ICP allowance insufficient"}
+        if isinstance(err, dict) and "InsufficientFunds" in err:
+            return {"Err": "ICP balance insufficient"}
+        return {"Err": "error: deposit failed"}
+
+    balance = escrow.credit(caller.to_str(), amount)
+
+    ic.print(f"[ClientAgent] Deposit of {amount} by {caller.to_str()}, balance {balance}")
+
+    return {"Ok": str(balance)}
+
+
+@update
+def withdraw(amount: nat64) -> Async[ReturnType]:
+    """
+    Return `amount` of the caller's prepaid balance to their ledger account; the
+    ledger fee (`LEDGER_TRANSFER_FEE`) comes out of it, so `amount - fee` arrives.
+    """
+
+    caller = ic.caller()
+
+    if amount <= LEDGER_TRANSFER_FEE:
+        return {"Err": f"Withdrawal must exceed the ledger fee of {LEDGER_TRANSFER_FEE}"}
+
+    if not escrow.debit(caller.to_str(), amount):
+        return {"Err": "Insufficient prepaid balance"}
+
+    ledger = Ledger(Principal.from_str(LEDGER_CANISTER_ID))
+
+    payout_stream = yield ledger.icrc1_transfer(
+        {
+            "from_subaccount": None,
+            "to": {"owner": caller, "subaccount": None},
+            "amount": amount - LEDGER_TRANSFER_FEE,
+            "fee": LEDGER_TRANSFER_FEE,
+            "memo": None,
+            "created_at_time": None,
+        }
+    )
+    payout = match(payout_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
+
+    if payout.get("Err") is not None:
+        ic.print(f"[ClientAgent] Withdrawal failed: {payout.get('Err')}")
+        escrow.credit(caller.to_str(), amount)
+        return {"Err": "error: withdrawal failed"}
+
+    return {"Ok": str(escrow.balance_of(caller.to_str()))}
+
+
+@query
+def get_balance() -> nat64:
+    """
+    The caller's prepaid balance.
+    """
+    return escrow.balance_of(ic.caller().to_str())
+
+
+@query
+def get_metrics() -> Metrics:
+    """
+    Per-stage latency and instruction percentiles (from fixed-size histograms) and
+    every named counter.
+    """
+    return {
+        "stages": [stage_summary(stage) for stage in METRIC_STAGES],
+        "counters": [{"name": name, "value": value} for name, value in list_counters()],
+    }
+
+
+@query
+def get_settlement_stats() -> SettlementStats:
+    """
+    Accrued and pending owner/fee payouts and the settlement transfer counters.
+    """
+    return settlement.get_stats()
+
+
 @update
 def execute_task(args: str) -> Async[ReturnType]:
     """
     Execute a agentic task.
     Example args : `[{"name":"prompt","value":"How was the weather and air quality today in Jakarta ?"},{"name":"connected_agent_list","value":["weather-agent","airquality-agent"]}]`
+    An optional `idempotency_key` param makes retries return the first execution's result.
+    """
+
+    prepared = __prepare_task(args)
+
+    if prepared.get("Err") is not None:
+        return prepared
+
+    parameters = prepared.get("Ok")
+    idempotency_key = parameters.get("idempotency_key")
+
+    if idempotency_key is None:
+        result = yield __coalesced_orchestrate(parameters)
+    else:
+        record_key = idempotency.record_key(parameters.get("caller"), str(idempotency_key))
+
+        if idempotency.claim(record_key):
+            result = yield __coalesced_orchestrate(parameters)
+            idempotency.complete(record_key, result)
+        else:
+            ic.print(f"[ClientAgent] Replaying idempotency key {idempotency_key}")
+            result = yield idempotency.wait_result(record_key)
+
+    return result
+
+
+@update
+def execute_tasks(args_list: Vec[str]) -> Async[Vec[ReturnType]]:
+    """
+    Execute many agentic tasks in one call and return one result per args item, in
+    order. Registry lookups and tool discovery run once for the union of connected
+    agents, identical prompts and identical agent calls run once, and at most
+    `BATCH_MAX_CONCURRENCY` orchestrations run at a time. An item's `idempotency_key`
+    works as in `execute_task`: a retried item returns its first execution's result.
+    """
+
+    if len(args_list) > BATCH_MAX_ITEMS:
+        return [{"Err": f"Batch exceeds {BATCH_MAX_ITEMS} items"} for _ in args_list]
+
+    prepared = [__prepare_task(args) for args in args_list]
+    valid = [item.get("Ok") for item in prepared if item.get("Err") is None]
+
+    agent_names = sorted(
+        {name for parameters in valid for name in parameters.get("connected_agent_list", [])}
+    )
+
+    if len(agent_names) > 0:
+        # Warm the resolution and schema caches once for the whole batch
+        yield resolve_canister_ids(agent_names)
+        yield __discover_tools(agent_names)
+
+    context = {"calls": {}}
+    task_index = {}
+    item_tasks = []
+    tasks = []
+    charged_agents = []
+    duplicates = []
+    claimed = []
+    replayed = []
+
+    for item in prepared:
+        if item.get("Err") is not None:
+            item_tasks.append(None)
+            continue
+
+        parameters = item.get("Ok")
+        idempotency_key = parameters.get("idempotency_key")
+
+        if idempotency_key is not None:
+            record_key = idempotency.record_key(parameters.get("caller"), str(idempotency_key))
+
+            if not idempotency.claim(record_key):
+                replayed.append((len(item_tasks), record_key))
+                item_tasks.append(None)
+                continue
+
+            claimed.append((len(item_tasks), record_key))
+
+        key = __flight_key(parameters)
+
+        if key not in task_index:
+            task_index[key] = len(tasks)
+            charged_agents.append([])
+            tasks.append(__orchestration_task(parameters, context, charged_agents[-1]))
+        elif PAYMENTS_ENABLED:
+            duplicates.append((len(item_tasks), task_index[key], parameters))
+
+        item_tasks.append(task_index[key])
+
+    ic.print(f"[ClientAgent] Batch of {len(args_list)} items, {len(tasks)} unique orchestrations")
+
+    results = yield gather_bounded(tasks, BATCH_MAX_CONCURRENCY)
+
+    responses = [
+        item if index is None else results[index]
+        for item, index in zip(prepared, item_tasks)
+    ]
+
+    # Duplicate items share the first one's run but pay for their answer all the same
+    for position, index, parameters in duplicates:
+        if responses[position].get("Ok") is not None:
+            payment = yield __charge_shared_result(charged_agents[index], parameters)
+            if payment.get("Err") is not None:
+                responses[position] = payment
+
+    for position, record_key in claimed:
+        idempotency.complete(record_key, responses[position])
+
+    # Replayed last: an earlier item of this batch may hold the same key
+    for position, record_key in replayed:
+        ic.print(f"[ClientAgent] Replaying idempotency key of batch item {position}")
+        responses[position] = yield idempotency.wait_result(record_key)
+
+    return responses
+
+
+@update
+def submit_task(args: str) -> ReturnType:
     """
+    Start `execute_task` in the background and return its job id right away.
+    Poll `get_job` for progress, per-agent partial results and the final answer.
+    """
+
+    prepared = __prepare_task(args)
+
+    if prepared.get("Err") is not None:
+        return prepared
+
+    parameters = prepared.get("Ok")
+    job_id = jobs.create(parameters.get("caller"))
+
+    ic.set_timer(0, __job_runner(job_id, parameters))
+
+    ic.print(f"[ClientAgent] Submitted job {job_id}")
+
+    return {"Ok": job_id}
+
+
+@query
+def get_job(job_id: str, user: Opt[str]) -> Opt[Job]:
+    """
+    Progress and results of a job submitted by the caller, or by the `user` the trusted
+    backend proxy polls for.
+    """
+
+    job = jobs.get(job_id)
+
+    if job is None or job["caller"] != __billed_account({"user": user}):
+        return None
+
+    return job
+
+
+# ===================================== ROUTER MAIN ====================================
+
+
+# ===================================== HELPER FUNC ====================================
+def __prepare_task(args: str) -> dict:
+    """Decode and validate `execute_task` args into the parameters dict."""
 
     try:
         params: List[dict] = json.loads(args)
-        params = json.loads( """[{"name": "prompt", "value": "How was the weather and air quality today in Jakarta ?"}, {"name": "connected_agent_list", "value": ["weather-agent"]}, {"name": "user", "value": "wxxjc-dwc4f-6dfub-3cwql-bujz2-sa53s-xyqa6-wr6uu-xfg7v-akwid-jqe"}]""" )
 
         if not is_all_required_params_present(params):
             return {"Err": "Missing required parameters"}
@@ -55,8 +465,109 @@ def execute_task(args: str) -> Async[ReturnType]:
 
         parameters = __transform_params(params)
 
+        parameters["caller"] = __billed_account(parameters)
+
         ic.print(f"[ClientAgent] Transformed parameters: {parameters}")
 
+        return {"Ok": parameters}
+
+    except Exception as e:
+        return {"Err": json.dumps({"error": str(e)})}
+
+
+def __orchestrate(
+    parameters: dict, context: Optional[dict] = None, charged_agents: Optional[list] = None
+) -> Async[ReturnType]:
+    """
+    Plan, invoke the agents and refine their answers into the final response. The
+    optional `context` carries a background `job_id` (each agent result is recorded on
+    that job as it arrives) and/or a batch-wide `calls` map that deduplicates identical
+    agent calls. Charges taken on the way are settled once an answer is produced and
+    refunded to the caller on every error; the agents finally paid for are appended to
+    `charged_agents`, for callers sharing the answer. Every orchestration, whether from
+    `execute_task`, `execute_tasks` or a background job, is timed as the `execute_task`
+    stage.
+    """
+
+    started = start_stage()
+
+    charges = []
+    result = yield __run_orchestration(parameters, context, charges)
+
+    for charge in charges:
+        if result.get("Err") is None:
+            __settle_charge(charge)
+            if charged_agents is not None:
+                charged_agents.extend(charge["agents"])
+        else:
+            __refund_charge(charge)
+
+    observe_stage("execute_task", started)
+
+    return result
+
+
+def __run_orchestration(parameters: dict, context: Optional[dict], charges: list) -> Async[ReturnType]:
+    """`__orchestrate` itself; every charge taken is appended to `charges`."""
+
+    try:
+        response_key = __response_key(parameters)
+        cached_response = response_cache.get(response_key)
+
+        if cached_response is not None:
+            ic.print("[ClientAgent] Response cache hit")
+
+            if PAYMENTS_ENABLED:
+                # The cached answer is paid for the agents its run was charged for
+                started = start_stage()
+                payment = yield __charge_agents(
+                    response_cache.charged_agents(response_key) or [], parameters.get("caller")
+                )
+                observe_stage("payment", started)
+                if payment.get("Err") is not None:
+                    return payment
+                charges.append(payment.get("Ok"))
+
+            return {"Ok": cached_response}
+
+        connected_agents = parameters.get("connected_agent_list", [])
+
+        fast_path = False
+
+        if SINGLE_AGENT_FAST_PATH and len(connected_agents) == 1:
+            fast_path = yield __takes_prompt_only(connected_agents[0])
+
+        if fast_path:
+            if PAYMENTS_ENABLED:
+                started = start_stage()
+                payment = yield __charge_agents(connected_agents, parameters.get("caller"))
+                observe_stage("payment", started)
+                if payment.get("Err") is not None:
+                    return payment
+                charges.append(payment.get("Ok"))
+
+            resp = yield __single_agent_fast_path(
+                connected_agents[0], parameters.get("prompt"), context
+            )
+
+            if resp.get("Ok") is not None:
+                response_cache.put(response_key, resp.get("Ok"), connected_agents)
+
+            return resp
+
+        speculative = None
+
+        if SPECULATIVE_EXECUTION_ENABLED and 1 < len(connected_agents) <= TOOL_SHORTLIST_SIZE:
+            # Only speculate for callers who could pay for every connected agent
+            affordable = True
+            if PAYMENTS_ENABLED:
+                affordable = yield __can_afford(connected_agents, parameters.get("caller"))
+
+            if affordable:
+                speculative = speculation.start(
+                    parameters.get("prompt"), connected_agents, __agent_call_task
+                )
+
         agent_call_list_stream = yield __parse_parameter(parameters)
         agent_call_list_raw = match(
             agent_call_list_stream,
@@ -67,33 +578,46 @@ def execute_task(args: str) -> Async[ReturnType]:
             ic.print(
                 f"[ClientAgent] Error parsing agent call list: {agent_call_list_raw.get('Err')}"
             )
+            if speculative is not None:
+                speculation.abandon(speculative)
             return {"Err": "Failed to parse agent call list"}
 
         agent_call_list = json.loads(agent_call_list_raw.get("Ok"))
-        agent_call_list = [{'id': 'call_UZnH1FyuiOUxvUewV8rxXlwU', 'function': {'name': 'weather-agent', 'arguments': [{'value': 'Provide weather and air quality conditions in Jakarta today', 'name': 'prompt'}]}}]
+        unavailable = agent_call_list_stream.get("unavailable") or []
 
         ic.print(f"[ClientAgent] Agent call list: {agent_call_list}")
 
-        resp = ""
+        if context is not None and context.get("job_id") is not None:
+            jobs.set_planned_calls(context.get("job_id"), len(agent_call_list))
 
-        caller = parameters["user"]
+        resp = ""
 
-        for agent in agent_call_list:
-            agent_name = agent["function"]["name"]
-            agent_args = agent["function"]["arguments"]
+        if PAYMENTS_ENABLED:
+            started = start_stage()
+            payment = yield __charge_agents(
+                [agent["function"]["name"] for agent in agent_call_list],
+                parameters.get("caller"),
+            )
+            observe_stage("payment", started)
 
-            ic.print(f"[ClientAgent] Invoking agent: {agent_name} with args: {agent_args}")
+            if payment.get("Err") is not None:
+                if speculative is not None:
+                    speculation.abandon(speculative)
+                return payment
 
-            # # Ensure payment (pricing lookup + charging) before invocation
-            # payment_variant = yield __ensure_payment(agent_name, caller)
+            charges.append(payment.get("Ok"))
 
-            # ic.print(f"[ClientAgent] Payment variant: {payment_variant}")
+        # Now invoke downstream agents
+        if speculative is not None:
+            agent_results = yield __invoke_agents_speculatively(
+                speculative, agent_call_list, context
+            )
+        else:
+            agent_results = yield __invoke_agents(agent_call_list, context)
 
-            # if payment_variant.get("Err") is not None:
-            #     return payment_variant
+        answers = []
 
-            # Now invoke downstream agent
-            curr_stream_resp = yield __agent_call(agent_name, agent_args)
+        for agent_name, curr_stream_resp in agent_results:
             curr_stream_raw = match(
                 curr_stream_resp,
                 {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}},
@@ -105,64 +629,183 @@ def execute_task(args: str) -> Async[ReturnType]:
                 )
                 return {"Err": f"Failed to call agent '{agent_name}'"}
 
-            curr_stream = curr_stream_raw.get("Ok")
-            curr_stream = curr_stream.split(".")[0]
-            resp += f"`{agent_name}`: {curr_stream}\n"
+            answers.append((agent_name, curr_stream_raw.get("Ok")))
+
+        answers = compaction.compact(answers, parameters.get("prompt"), REFINEMENT_TOKEN_BUDGET)
+
+        for agent_name, answer in answers:
+            resp += f"`{agent_name}`: {answer}\n"
 
+        started = start_stage()
         resp = yield __result_refinement(resp)
+        observe_stage("refinement", started)
 
         if resp.get("Err") is not None:
             return resp
 
         final_result = resp.get("Ok").get("message", {}).get("content", "")
 
+        if len(unavailable) > 0:
+            # Answered without some agents: say so, and do not cache the degraded answer
+            names = ", ".join(f"'{name}'" for name in unavailable)
+            return {"Ok": f"{final_result}\n\n(Unavailable agents, not consulted: {names})"}
+
+        response_cache.put(
+            response_key, final_result, [agent["function"]["name"] for agent in agent_call_list]
+        )
+
         return {"Ok": final_result}
 
     except Exception as e:
         return {"Err": json.dumps({"error": str(e)})}
 
 
-# ===================================== ROUTER MAIN ====================================
+def __coalesced_orchestrate(
+    parameters: dict, context: Optional[dict] = None, charged_agents: Optional[list] = None
+) -> Async[ReturnType]:
+    """
+    `__orchestrate` with single-flight coalescing: an identical request (same prompt
+    and connected agents, and same billed account when payments are on) arriving while
+    one is running waits for that run's result instead of starting its own. A follower
+    pays for exactly the agents the run it joined paid for.
+    """
 
+    key = __flight_key(parameters)
+    ran = False
+
+    def run() -> Async[dict]:
+        nonlocal ran
+        ran = True
+        charged = []
+        result = yield __orchestrate(parameters, context, charged)
+        return {"result": result, "charged_agents": charged}
+
+    outcome = yield coalesce.call(
+        _in_flight,
+        key,
+        run,
+        forget=True,
+        max_age_seconds=IN_FLIGHT_MAX_AGE_SECONDS,
+        name="single_flight",
+    )
 
-# ===================================== HELPER FUNC ====================================
-def __transform_params(params: List[dict]) -> dict:
-    return {p["name"]: p["value"] for p in params if p.get("value") is not None}
+    # A follower that gave up waiting gets a bare Err instead of the run's outcome
+    result = outcome.get("result", outcome)
+    charged = outcome.get("charged_agents") or []
 
+    if PAYMENTS_ENABLED and not ran and result.get("Ok") is not None:
+        # A follower is served the leader's answer, so it pays what the leader paid
+        payment = yield __charge_shared_result(charged, parameters)
+        if payment.get("Err") is not None:
+            return payment
 
-def __get_agent_metadata(agent_name: str) -> Async[dict]:
+    if charged_agents is not None:
+        charged_agents.extend(charged)
+
+    return result
+
+
+def __response_key(parameters: dict) -> str:
+    return response_cache.cache_key(
+        parameters.get("prompt"), parameters.get("connected_agent_list", [])
+    )
+
+
+def __flight_key(parameters: dict) -> str:
+    """
+    Key under which identical requests share one run. With payments on it includes the
+    billed account: a run's payment failure (e.g. an insufficient balance) belongs to
+    its own account and must not be handed to another account's request.
+    """
+
+    key = __response_key(parameters)
+
+    if PAYMENTS_ENABLED:
+        key = f"{parameters.get('caller')}|{key}"
+
+    return key
+
+
+def __orchestration_task(
+    parameters: dict, context: Optional[dict] = None, charged_agents: Optional[list] = None
+):
+    return lambda: __coalesced_orchestrate(parameters, context, charged_agents)
+
+
+def __job_runner(job_id: str, parameters: dict):
+
+    def runner() -> Async[None]:
+        result = yield __orchestrate(parameters, {"job_id": job_id})
+        jobs.finish(job_id, result)
+
+        ic.print(f"[ClientAgent] Job {job_id} finished")
+
+    return runner
+
+
+def __start_timers():
+    ic.set_timer(0, __publish_metadata)
+    ic.set_timer_interval(REGISTRY_SYNC_INTERVAL_SECONDS, sync_registry_changes)
+    ic.set_timer_interval(JOB_GC_INTERVAL_SECONDS, jobs.collect_garbage)
+    ic.set_timer_interval(SETTLEMENT_INTERVAL_SECONDS, settlement.flush)
+    ic.set_timer_interval(PRICING_REFRESH_INTERVAL_SECONDS, pricing_cache.refresh)
+
+
+def __publish_metadata() -> Async[None]:
+    """Push METADATA to the agent registry's tool catalog."""
 
     agent_registry = AgentRegistryInterface(
         Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
     )
-    resp_stream = yield agent_registry.get_agent_by_name(agent_name)
+    resp_stream = yield agent_registry.publish_tool_metadata(
+        METADATA["function"]["name"], json.dumps(METADATA)
+    )
     resp = match(resp_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
 
-    if resp.get("Err") is not None:
-        ic.print(f"[ClientAgent] Error getting agent metadata: {resp.get('Err')}")
-        return None
+    ic.print(f"[ClientAgent] Publish metadata: {resp}")
+
+
+def __billed_account(parameters: dict) -> str:
+    """
+    The account billed (and owning idempotency keys) for a request: the authenticated
+    caller, or the `user` the trusted backend proxy forwards the request for. A `user`
+    param from any other caller is ignored.
+    """
+
+    caller = ic.caller().to_str()
+    user = parameters.get("user")
+
+    if caller == TRUSTED_PROXY_CANISTER_ID and user is not None:
+        return Principal.from_str(user).to_str()
+
+    return caller
+
+
+def __transform_params(params: List[dict]) -> dict:
+    return {p["name"]: p["value"] for p in params if p.get("value") is not None}
+
+
+def __get_agent_metadata(agent_name: str) -> Async[dict]:
+    """Fetch an agent's metadata and refresh its entry in the tool schema cache."""
 
-    agent_mapper = json.loads(resp.get("Ok"))
+    resolved = yield resolve_canister_id(agent_name)
 
-    agent = AgentInterface(Principal.from_str(agent_mapper.get("canister_id")))
+    if resolved.get("Err") is not None:
+        ic.print(f"[ClientAgent] Error getting agent metadata: {resolved.get('Err')}")
+        return {"Err": resolved.get("Err")}
+
+    agent = AgentInterface(Principal.from_str(resolved.get("Ok")))
     resp_stream = yield agent.get_metadata()
 
     resp = match(resp_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
 
     if resp.get("Err") is not None:
         ic.print(f"[ClientAgent] Error getting agent metadata: {resp.get('Err')}")
-        return None
-
-    agent_metadata = json.loads(resp.get("Ok"))
+        return {"Err": resp.get("Err")}
 
-    for i in range(len(agent_metadata["function"]["parameters"]["properties"])):
-        if (
-            agent_metadata["function"]["parameters"]["properties"][i]["name"]
-            == "connected_agent_list"
-        ):
-            agent_metadata["function"]["parameters"]["properties"].pop(i)
+    agent_metadata = schema_cache.store(agent_name, resp.get("Ok"))
 
-    return agent_metadata
+    return {"Ok": agent_metadata}
 
 
 # -------------------------------------------------------------------------------------
@@ -175,147 +818,187 @@ def _compute_fee(amount: int) -> int:
     return (amount * FEE_NUM) // FEE_DEN
 
 
-def __get_agent_pricing(agent_name: str) -> Async[dict]:
+def __quote_agents(agent_names: List[str]) -> Async[dict]:
+    """Price and owner quotes of every agent call, `{"Ok": quotes}` or `{"Err": msg}`."""
 
-    agent_registry = AgentRegistryInterface(
-        Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
-    )
+    quotes = []
 
-    resp_stream = yield agent_registry.get_agent_by_name(agent_name)
-    resp = match(resp_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
+    for agent_name in agent_names:
+        pricing_resp = yield pricing_cache.get_pricing(agent_name)
 
-    if resp.get("Err") is not None:
-        return {"Err": resp.get("Err")}
+        if pricing_resp.get("Err") is not None:
+            ic.print(
+                f"[ClientAgent] Pricing fetch failed for '{agent_name}': {pricing_resp.get('Err')}"
+            )
+            return {"Err": f"Failed to retrieve pricing for '{agent_name}'"}
 
-    agent_mapper = json.loads(resp)
-    canister_id = agent_mapper.get("canister_id")
+        quotes.append(pricing_resp.get("Ok"))
 
-    if canister_id is None:
-        return {"Err": "Missing canister id"}
+    return {"Ok": quotes}
 
-    pricing_iface = AgentInterface(Principal.from_str(canister_id))
-    price_stream = yield pricing_iface.get_price()
-    owner_stream = yield pricing_iface.get_owner()
-    price = price_stream  # price is raw int query response
-    owner = owner_stream
 
-    return {"Ok": {"price": price, "owner": owner}}
+def __can_afford(agent_names: List[str], caller: str) -> Async[bool]:
+    """Whether the caller's prepaid balance covers a call to every one of the agents."""
 
+    quoted = yield __quote_agents(agent_names)
 
-def __process_payment(
-    from_user: Principal, agent_price: int, agent_owner: Principal
-) -> Async[ReturnType]:
+    if quoted.get("Err") is not None:
+        return False
 
-    if LEDGER_CANISTER_ID == "":
-        return {"Err": "ICP ledger not configured"}
+    return escrow.balance_of(caller) >= sum(quote["price"] for quote in quoted.get("Ok"))
 
-    ledger = Ledger(Principal.from_str(LEDGER_CANISTER_ID))
-    APP_WALLET = Principal.from_str(APP_WALLET_TEXT)
-
-    to_client_agent = ic.id()
-    admin_fee = _compute_fee(agent_price)
-    to_owner_amt = agent_price - admin_fee
-
-    tf_args = TransferFromArgs(
-        spender_subaccount=None,
-        from_=Account(owner=from_user, subaccount=None),
-        to=Account(owner=to_client_agent, subaccount=None),
-        amount=agent_price,
-        fee=None,
-        memo=None,
-        created_at_time=None,
-    )
 
-    charge_stream = yield ledger.icrc2_transfer_from(tf_args)
-    # We don't pattern match fully on variants (kybra returns dict-like) so inspect keys
-    if getattr(charge_stream, "Err", None) is not None:
-        # Derive user friendly error
-        err_variant = charge_stream.Err
-        # Simplified checks
-        if getattr(err_variant, "InsufficientAllowance", None) is not None:
-            return {"Err": "ICP allowance insufficient"}
-        if getattr(err_variant, "InsufficientFunds", None) is not None:
-            return {"Err": "ICP balance insufficient"}
-        return {"Err": "error: payment failed"}
-
-    # Payout owner (best effort)
-    pay_owner = TransferArg(
-        from_subaccount=None,
-        to=Account(owner=agent_owner, subaccount=None),
-        amount=to_owner_amt,
-        fee=None,
-        memo=None,
-        created_at_time=None,
-    )
-    owner_payout_res = yield ledger.icrc1_transfer(pay_owner)
-
-    if getattr(owner_payout_res, "Err", None) is not None:
-        ic.print(f"[ClientAgent] Owner payout failed: {owner_payout_res.Err}")
-        return {"Err": "Owner payout failed"}
-
-    ic.print(f"[ClientAgent] Owner payout success: {to_owner_amt}")
-
-    # Payout app wallet (best effort)
-    pay_fee = TransferArg(
-        from_subaccount=None,
-        to=Account(owner=APP_WALLET, subaccount=None),
-        amount=admin_fee,
-        fee=None,
-        memo=None,
-        created_at_time=None,
-    )
+def __charge_shared_result(agent_names: List[str], parameters: dict) -> Async[ReturnType]:
+    """
+    Charge a caller served an answer another run produced (single-flight follower,
+    duplicate batch item) for the agents that run was charged for, and nothing else.
+    """
+
+    started = start_stage()
+    payment = yield __charge_agents(agent_names, parameters.get("caller"))
+    observe_stage("payment", started)
 
-    fee_payout_res = yield ledger.icrc1_transfer(pay_fee)
+    if payment.get("Err") is not None:
+        return payment
 
-    if getattr(fee_payout_res, "Err", None) is not None:
-        ic.print(f"[ClientAgent] App fee payout failed: {fee_payout_res.Err}")
-        return {"Err": "App fee payout failed"}
+    # The answer already exists, so the charge is final right away
+    __settle_charge(payment.get("Ok"))
 
-    ic.print(f"[ClientAgent] App fee payout success: {admin_fee}")
+    return {"Ok": "paid"}
 
-    return {"Ok": None}
 
+def __charge_agents(agent_names: List[str], caller: str) -> Async[dict]:
+    """
+    Debit the price of every agent call from the caller's prepaid balance, all or
+    nothing. Returns `{"Ok": charge}`; the charge is then either settled (its payouts
+    accrued) or refunded, depending on whether the caller got an answer.
+    """
 
-def __ensure_payment(agent_name: str, caller: Principal) -> Async[ReturnType]:
-    """Lookup price/owner and charge caller. Does NOT invoke the agent."""
+    quoted = yield __quote_agents(agent_names)
 
-    pricing_resp = yield __get_agent_pricing(agent_name)
+    if quoted.get("Err") is not None:
+        return quoted
 
-    if pricing_resp.get("Err") is not None:
-        ic.print(
-            f"[ClientAgent] Pricing fetch failed for '{agent_name}': {pricing_resp.get('Err')}"
-        )
-        return {"Err": f"Failed to retrieve pricing for '{agent_name}'"}
+    quotes = quoted.get("Ok")
+    total = sum(quote["price"] for quote in quotes)
 
-    agent_price = pricing_resp.get("Ok").get("price")
-    agent_owner = pricing_resp.get("Ok").get("owner")
+    if not escrow.debit(caller, total):
+        return {"Err": "Insufficient prepaid balance"}
 
-    payment_res = yield __process_payment(caller, agent_price, agent_owner)
+    ic.print(f"[ClientAgent] Charged {total} to {caller} for {agent_names}")
 
-    if payment_res.get("Err") is not None:
-        return payment_res
+    return {"Ok": {"caller": caller, "total": total, "agents": agent_names, "quotes": quotes}}
 
-    return {"Ok": "paid"}
+
+def __settle_charge(charge: dict):
+    """Accrue the owner and fee payouts of a charge for the next settlement."""
+
+    for quote in charge["quotes"]:
+        admin_fee = _compute_fee(quote["price"])
+        settlement.accrue(quote["owner"].to_str(), quote["price"] - admin_fee)
+        settlement.accrue(APP_WALLET_TEXT, admin_fee)
+
+
+def __refund_charge(charge: dict):
+    """Give a charge back to the caller whose request failed."""
+
+    if charge["total"] == 0:
+        return
+
+    escrow.credit(charge["caller"], charge["total"])
+    incr_counter("payments.refunded", charge["total"])
+
+    ic.print(f"[ClientAgent] Refunded {charge['total']} to {charge['caller']}")
+
+
+def __takes_prompt_only(agent_name: str) -> Async[bool]:
+    """Whether the agent's tool requires no argument besides the prompt."""
+
+    discovery = yield __discover_tools([agent_name])
+
+    if len(discovery.get("tools")) == 0:
+        return False
+
+    parameters = discovery.get("tools")[0]["function"].get("parameters") or {}
+
+    return all(name == "prompt" for name in parameters.get("required") or ["prompt"])
+
+
+def __single_agent_fast_path(
+    agent_name: str, prompt: str, context: Optional[dict] = None
+) -> Async[ReturnType]:
+    """
+    With a single connected agent that only requires a prompt there is nothing to route
+    or combine: forward the prompt as-is and return the agent's answer untouched,
+    skipping both the planner and the refinement LLM calls.
+    """
+
+    ic.print(f"[ClientAgent] Single agent fast path: {agent_name}")
+
+    result = yield __tracked_agent_call(
+        agent_name, [{"name": "prompt", "value": prompt}], context
+    )
+
+    if result.get("Err") is not None:
+        ic.print(f"[ClientAgent] Error calling agent '{agent_name}': {result.get('Err')}")
+        return {"Err": f"Failed to call agent '{agent_name}'"}
+
+    return {"Ok": result.get("Ok")}
 
 
 def __parse_parameter(parameters: dict) -> Async[dict]:
+    """
+    Plan the agent calls for the prompt: `{"Ok": tool calls json}`, with the connected
+    agents whose tools could not be discovered (and were left out of the plan) under
+    `"unavailable"`.
+    """
 
     llm_service = LLMServiceV1(Principal.from_str(LLM_CANISTER_ID))
 
-    tools = []
+    prompt = parameters.get("prompt")
+    agent_names = parameters.get("connected_agent_list", [])
+
+    cached_plan = plan_cache.lookup(prompt, agent_names)
+    if cached_plan is not None:
+        ic.print(f"[ClientAgent] Plan cache hit: {cached_plan}")
+        return {"Ok": json.dumps(cached_plan)}
+
+    connected_agents = agent_names
+
+    if len(agent_names) > TOOL_SHORTLIST_SIZE:
+        agent_names = yield __shortlist_agents(prompt, agent_names)
+
+    started = start_stage()
+    discovery = yield __discover_tools(agent_names)
+    observe_stage("metadata_fetch", started)
+
+    failed_agents = discovery.get("failed")
+    tools = discovery.get("tools")
+
+    if len(failed_agents) > 0:
+        ic.print(f"[ClientAgent] Tool discovery failed for agents: {failed_agents}")
+
+        if not DISCOVERY_ALLOW_PARTIAL or len(tools) == 0:
+            names = ", ".join(f"'{name}'" for name in failed_agents)
+            return {"Err": f"Agent {names} not found"}
+
+        incr_counter("discovery.partial_failures")
 
-    for agent_name in parameters.get("connected_agent_list", []):
-        agent_metadata = yield __get_agent_metadata(agent_name)
-        if agent_metadata is None:
-            return {"Err": f"Agent '{agent_name}' not found"}
-        tools.append(agent_metadata)
+    if ROUTER_ENABLED and len(tools) > 0:
+        routed_plan = router.route(prompt, tools)
+        if routed_plan is not None:
+            ic.print(f"[ClientAgent] Routed without planner: {routed_plan}")
+            return {"Ok": json.dumps(routed_plan), "unavailable": failed_agents}
 
-    tools = tools if len(tools) > 0 else None
+    tools = [schema_cache.planner_tool(tool) for tool in tools] if len(tools) > 0 else None
 
     # Create messages
     messages = [
-        create_system_message("You are a helpful assistant."),
-        create_user_message(parameters.get("prompt")),
+        create_system_message(
+            "You are a helpful assistant. When a tool needs the output of another tool, "
+            "write {{tool-name}} in its arguments where that output belongs."
+        ),
+        create_user_message(prompt),
     ]
 
     # Create request using ChatRequestV1 type
@@ -324,7 +1007,9 @@ def __parse_parameter(parameters: dict) -> Async[dict]:
     ic.print(f"[ClientAgent] Parsing parameters with request: {request}")
 
     # Call service
+    started = start_stage()
     response_steam = yield llm_service.v1_chat(request)
+    observe_stage("planner_llm", started)
 
     response_raw = match(
         response_steam, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}}
@@ -336,31 +1021,134 @@ def __parse_parameter(parameters: dict) -> Async[dict]:
     response = response_raw.get("Ok")
     list_agent_call = response.get("message", {}).get("tool_calls", [])
 
-    return {"Ok": json.dumps(list_agent_call)}
+    if len(failed_agents) == 0 and agent_names == connected_agents:
+        # A plan made without some agents must not outlive their recovery
+        plan_cache.store(prompt, connected_agents, list_agent_call)
 
+    return {"Ok": json.dumps(list_agent_call), "unavailable": failed_agents}
 
-def __agent_call(agent_name: str, parameters: List[dict]) -> Async[dict]:
+
+def __shortlist_agents(prompt: str, agent_names: List[str]) -> Async[List[str]]:
+    """
+    Keep only the connected agents the registry's capability search ranks highest for
+    the prompt. Falls back to the full list when the search fails or matches nothing.
+    """
 
     agent_registry = AgentRegistryInterface(
         Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
     )
-    resp_stream = yield agent_registry.get_agent_by_name(agent_name)
-    resp = match(resp_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
+    resp_stream = yield agent_registry.search_agents(prompt, TOOL_SHORTLIST_SIZE, agent_names)
+    resp = match(resp_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
+
+    if resp.get("Err") is not None or len(resp.get("Ok")) == 0:
+        ic.print(f"[ClientAgent] Agent shortlist unavailable, offering all {len(agent_names)} agents")
+        return agent_names
+
+    shortlist = [hit["agent"]["agent_name"] for hit in resp.get("Ok")]
+
+    ic.print(f"[ClientAgent] Shortlisted agents: {shortlist}")
+
+    return shortlist
+
+
+def __discover_tools(agent_names: List[str]) -> Async[dict]:
+    """
+    Collect the tool schema of every connected agent: schema cache first, then the
+    registry's tool catalog in one call, and only then each remaining agent's own
+    `get_metadata` (concurrently when fan-out is enabled). Returns
+    `{"tools": [...], "failed": [...]}` keeping the input order.
+    """
+
+    results = {}
+
+    for agent_name in agent_names:
+        cached_tool = schema_cache.get_tool(agent_name)
+        if cached_tool is not None:
+            results[agent_name] = {"Ok": cached_tool}
+
+    missing = [name for name in agent_names if name not in results]
+
+    if len(missing) > 0:
+        catalog_tools = yield __get_catalog_tools(missing)
+        results.update(catalog_tools)
+        missing = [name for name in missing if name not in results]
+
+    if len(missing) > 1:
+        # Warm the resolution cache with one batch lookup before fanning out
+        yield resolve_canister_ids(missing)
+
+    if AGENT_FANOUT_ENABLED and len(missing) > 1:
+        fetched = yield gather([__agent_metadata_task(name) for name in missing])
+        results.update(zip(missing, fetched))
+    else:
+        for agent_name in missing:
+            results[agent_name] = yield __get_agent_metadata(agent_name)
+
+    tools = []
+    failed = []
+
+    for agent_name in agent_names:
+        result = results[agent_name]
+        if result.get("Err") is not None:
+            failed.append(agent_name)
+        else:
+            tools.append(result.get("Ok"))
+
+    return {"tools": tools, "failed": failed}
+
+
+def __get_catalog_tools(agent_names: List[str]) -> Async[dict]:
+    """Fetch published tool schemas from the registry catalog; missing names are omitted."""
+
+    agent_registry = AgentRegistryInterface(
+        Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
+    )
+    resp_stream = yield agent_registry.get_tool_catalog(agent_names)
+    resp = match(resp_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
 
     if resp.get("Err") is not None:
-        ic.print(f"[ClientAgent] Error getting agent metadata: {resp.get('Err')}")
-        return None
+        ic.print(f"[ClientAgent] Tool catalog unavailable: {resp.get('Err')}")
+        return {}
+
+    tools = {}
+
+    for lookup in resp.get("Ok"):
+        if not lookup["found"] or lookup["metadata"] is None:
+            continue
+
+        agent_name = lookup["agent_name"]
+        tools[agent_name] = {
+            "Ok": schema_cache.store(
+                agent_name, lookup["metadata"], f"catalog-{lookup['version']}"
+            )
+        }
+
+    return tools
+
 
-    agent_mapper = json.loads(resp.get("Ok"))
+def __agent_metadata_task(agent_name: str):
+    return lambda: __get_agent_metadata(agent_name)
 
-    agent = AgentInterface(Principal.from_str(agent_mapper.get("canister_id")))
+
+def __agent_call(agent_name: str, parameters: List[dict]) -> Async[dict]:
+
+    resolved = yield resolve_canister_id(agent_name)
+
+    if resolved.get("Err") is not None:
+        ic.print(f"[ClientAgent] Error getting agent metadata: {resolved.get('Err')}")
+        return {"Err": resolved.get("Err")}
+
+    agent = AgentInterface(Principal.from_str(resolved.get("Ok")))
+
+    started = start_stage()
     resp_stream = yield agent.execute_task(json.dumps(parameters))
+    observe_stage("agent_call", started)
 
     resp = match(resp_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": err}})
 
     if resp.get("Err") is not None:
         ic.print(f"[ClientAgent] Error getting agent metadata: {resp.get('Err')}")
-        return None
+        return {"Err": resp.get("Err")}
 
     agent_response = resp.get("Ok")
 
@@ -369,6 +1157,129 @@ def __agent_call(agent_name: str, parameters: List[dict]) -> Async[dict]:
     return {"Ok": agent_response}
 
 
+def __invoke_agents(agent_call_list: List[dict], context: Optional[dict] = None) -> Async[list]:
+    """
+    Invoke every agent of the plan and return `(agent_name, result)` pairs in plan order.
+    With fan-out enabled the calls are issued all at once, so the latency tracks the
+    slowest agent instead of the sum; otherwise they run one after another and stop at
+    the first failure. Plans with dependencies between calls are scheduled as a DAG.
+    """
+
+    if dag.has_dependencies(agent_call_list):
+        ic.print(f"[ClientAgent] Scheduling {len(agent_call_list)} agent calls by dependency")
+
+        yield resolve_canister_ids([agent["function"]["name"] for agent in agent_call_list])
+
+        agent_results = yield dag.execute(
+            agent_call_list, lambda name, args: __agent_call_task(name, args, context)
+        )
+        return agent_results
+
+    if AGENT_FANOUT_ENABLED and len(agent_call_list) > 1:
+        ic.print(f"[ClientAgent] Fanning out {len(agent_call_list)} agent calls")
+
+        yield resolve_canister_ids([agent["function"]["name"] for agent in agent_call_list])
+
+        tasks = [
+            __agent_call_task(agent["function"]["name"], agent["function"]["arguments"], context)
+            for agent in agent_call_list
+        ]
+        results = yield gather(tasks)
+
+        return [
+            (agent["function"]["name"], result)
+            for agent, result in zip(agent_call_list, results)
+        ]
+
+    agent_results = []
+
+    for agent in agent_call_list:
+        agent_name = agent["function"]["name"]
+        agent_args = agent["function"]["arguments"]
+
+        ic.print(f"[ClientAgent] Invoking agent: {agent_name} with args: {agent_args}")
+
+        result = yield __tracked_agent_call(agent_name, agent_args, context)
+        agent_results.append((agent_name, result))
+
+        if result.get("Err") is not None:
+            break
+
+    return agent_results
+
+
+def __invoke_agents_speculatively(
+    speculative: dict, agent_call_list: List[dict], context: Optional[dict] = None
+) -> Async[list]:
+    """
+    Like `__invoke_agents`, but reuses the speculative calls the plan confirms and only
+    invokes the rest.
+    """
+
+    if dag.has_dependencies(agent_call_list):
+        # Dependent calls take rewritten prompts, no speculative result can stand in
+        speculation.abandon(speculative)
+        agent_results = yield __invoke_agents(agent_call_list, context)
+        return agent_results
+
+    collected = yield speculation.collect(speculative, agent_call_list)
+    confirmed = collected["results"]
+
+    ic.print(f"[ClientAgent] Speculation confirmed {len(confirmed)} of {len(agent_call_list)} agent calls")
+
+    if context is not None and context.get("job_id") is not None:
+        for position, result in confirmed.items():
+            jobs.record_section(
+                context.get("job_id"), agent_call_list[position]["function"]["name"], result
+            )
+
+    remaining_results = yield __invoke_agents(collected["remaining"], context)
+    remaining_results = iter(remaining_results)
+
+    agent_results = []
+
+    for position, agent in enumerate(agent_call_list):
+        if position in confirmed:
+            agent_results.append((agent["function"]["name"], confirmed[position]))
+            continue
+
+        remaining = next(remaining_results, None)
+        if remaining is None:
+            # Sequential invocation stopped at a failure
+            break
+        agent_results.append(remaining)
+
+    return agent_results
+
+
+def __agent_call_task(agent_name: str, parameters: List[dict], context: Optional[dict] = None):
+    return lambda: __tracked_agent_call(agent_name, parameters, context)
+
+
+def __tracked_agent_call(
+    agent_name: str, parameters: List[dict], context: Optional[dict] = None
+) -> Async[dict]:
+    """
+    `__agent_call` that shares identical calls within a batch and records the result
+    on a background job.
+    """
+
+    context = context if context is not None else {}
+
+    if context.get("calls") is not None:
+        key = f"{agent_name}|{json.dumps(parameters, sort_keys=True)}"
+        result = yield coalesce.call(
+            context.get("calls"), key, lambda: __agent_call(agent_name, parameters)
+        )
+    else:
+        result = yield __agent_call(agent_name, parameters)
+
+    if context.get("job_id") is not None:
+        jobs.record_section(context.get("job_id"), agent_name, result)
+
+    return result
+
+
 def __result_refinement(results: str) -> Async[ReturnType]:
 
     ic.print(f"[ClientAgent] Result Refinement - {results}")
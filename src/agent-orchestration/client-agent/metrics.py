@@ -0,0 +1,105 @@
+from typing import List, Tuple
+
+from kybra import ic, nat64
+
+from constants import INSTRUCTION_BUCKETS, LATENCY_BUCKETS_MS
+from storage import counters
+
+# ====================================== METRICS =======================================
+# Named counters in stable memory, plus fixed-size per-stage histograms built on them:
+# every observation increments one latency bucket and one instruction bucket of its
+# stage ("hist.<stage>.<ms|instructions>.<bucket>"), so the memory per stage is fixed
+# and percentiles are read back as bucket upper bounds.
+
+_NANOS_PER_MILLI = 1_000_000
+_CALL_CONTEXT_COUNTER = 1  # instructions of the whole call context, across awaits
+
+_HISTOGRAM_PREFIX = "hist."
+
+
+def incr_counter(name: str, amount: int = 1) -> nat64:
+    value = (counters.get(name) or 0) + amount
+    counters.insert(name, value)
+    return value
+
+
+def set_counter(name: str, value: int):
+    counters.insert(name, value)
+
+
+def get_counter(name: str) -> nat64:
+    return counters.get(name) or 0
+
+
+def list_counters() -> List[Tuple[str, int]]:
+    return [(name, value) for name, value in counters.items() if not name.startswith(_HISTOGRAM_PREFIX)]
+
+
+def start_stage() -> Tuple[int, int]:
+    """Mark the start of a stage; pass the result to `observe_stage`."""
+
+    return (ic.time(), ic.performance_counter(_CALL_CONTEXT_COUNTER))
+
+
+def stage_cost(started: Tuple[int, int]) -> Tuple[int, int]:
+    """Latency (ms) and instructions since `start_stage`."""
+
+    started_at, started_instructions = started
+
+    latency_ms = (ic.time() - started_at) // _NANOS_PER_MILLI
+    instructions = max(ic.performance_counter(_CALL_CONTEXT_COUNTER) - started_instructions, 0)
+
+    return latency_ms, instructions
+
+
+def observe_stage(stage: str, started: Tuple[int, int]):
+    latency_ms, instructions = stage_cost(started)
+
+    incr_counter(f"{_HISTOGRAM_PREFIX}{stage}.count")
+    incr_counter(f"{_HISTOGRAM_PREFIX}{stage}.ms.{_bucket(LATENCY_BUCKETS_MS, latency_ms)}")
+    incr_counter(
+        f"{_HISTOGRAM_PREFIX}{stage}.instructions.{_bucket(INSTRUCTION_BUCKETS, instructions)}"
+    )
+
+
+def stage_summary(stage: str) -> dict:
+    count = get_counter(f"{_HISTOGRAM_PREFIX}{stage}.count")
+
+    return {
+        "stage": stage,
+        "count": count,
+        "p50_ms": _percentile(stage, "ms", LATENCY_BUCKETS_MS, count, 0.50),
+        "p99_ms": _percentile(stage, "ms", LATENCY_BUCKETS_MS, count, 0.99),
+        "p50_instructions": _percentile(stage, "instructions", INSTRUCTION_BUCKETS, count, 0.50),
+        "p99_instructions": _percentile(stage, "instructions", INSTRUCTION_BUCKETS, count, 0.99),
+    }
+
+
+def _bucket(bounds: List[int], value: int) -> int:
+    """Index of the first bucket whose upper bound holds `value` (last one overflows)."""
+
+    for index, bound in enumerate(bounds):
+        if value <= bound:
+            return index
+
+    return len(bounds)
+
+
+def _percentile(stage: str, unit: str, bounds: List[int], count: int, quantile: float) -> nat64:
+    """Upper bound of the bucket holding the quantile; overflow reports twice the last
+    bound."""
+
+    if count == 0:
+        return 0
+
+    target = quantile * count
+    seen = 0
+
+    for index in range(len(bounds) + 1):
+        seen += get_counter(f"{_HISTOGRAM_PREFIX}{stage}.{unit}.{index}")
+        if seen >= target:
+            return bounds[index] if index < len(bounds) else bounds[-1] * 2
+
+    return bounds[-1] * 2
+
+# ====================================== METRICS =======================================
@@ -1,6 +1,6 @@
 
 from kybra import (
-    Service, service_update, service_query, Opt, Variant, Record, Principal, null, blob
+    Service, service_update, service_query, Opt, Variant, Record, Principal, Vec, null, blob, nat64, float64
 )
 
 from typing import List, Optional
@@ -25,6 +25,115 @@ class AgentInterface(Service):
     @service_query
     def get_owner(self) -> Principal: ...
 
+# ---------------- Cache Models ----------------
+class WeightedReplica(Record):
+    canister_id: str
+    weight: float64
+
+class RegistryCacheEntry(Record):
+    canister_id: str
+    cached_at: nat64
+    replicas: Opt[Vec[WeightedReplica]]
+
+class ToolSchemaEntry(Record):
+    version: str
+    tool: str
+    cached_at: nat64
+
+class ResponseCacheEntry(Record):
+    response: str
+    created_at: nat64
+    access_tick: nat64
+    agents: Opt[Vec[str]]  # agents the producing run was charged for
+
+class RouterStats(Record):
+    resolved: nat64
+    fallbacks: nat64
+    hit_rate: float64
+
+class SpeculationStats(Record):
+    launched: nat64
+    confirmed: nat64
+    wasted: nat64
+    waste_ratio: float64
+    wasted_ms: nat64
+    wasted_instructions: nat64
+
+class StageMetrics(Record):
+    stage: str
+    count: nat64
+    p50_ms: nat64
+    p99_ms: nat64
+    p50_instructions: nat64
+    p99_instructions: nat64
+
+class CounterValue(Record):
+    name: str
+    value: nat64
+
+class Metrics(Record):
+    stages: Vec[StageMetrics]
+    counters: Vec[CounterValue]
+
+class IdempotencyRecord(Record):
+    result: Opt[str]  # None while the first execution is still running
+    created_at: nat64
+    order_tick: nat64
+
+class PricingEntry(Record):
+    price: nat64
+    owner: Principal
+    cached_at: nat64
+
+class PendingPayout(Record):
+    payee: str
+    amount: nat64
+    memo: blob
+    created_at_time: nat64
+    attempts: nat64
+
+class SettlementStats(Record):
+    accrued_total: nat64
+    accrued_payees: nat64
+    pending_payouts: nat64
+    transfers: nat64
+    failures: nat64
+    settled_total: nat64
+
+class SingleFlightStats(Record):
+    runs: nat64
+    joined: nat64
+    in_flight: nat64
+
+class JobSection(Record):
+    agent_name: str
+    ok: bool
+    content: str
+    finished_at: nat64
+
+class Job(Record):
+    job_id: str
+    status: str  # "running" | "done" | "failed"
+    caller: str
+    created_at: nat64
+    finished_at: Opt[nat64]
+    planned_calls: Opt[nat64]
+    sections: Vec[JobSection]
+    result: Opt[str]
+    error: Opt[str]
+
+class PlanCacheEntry(Record):
+    template: str
+    plan: str
+    created_at: nat64
+    access_tick: nat64
+
+class CacheStats(Record):
+    hits: nat64
+    misses: nat64
+    entries: nat64
+    ttl_seconds: nat64
+
 # ---------------- Ledger / Payment Models ----------------
 class Account(Record):
     owner: Principal
@@ -105,12 +214,64 @@ class Ledger(Service):
     @service_update
     def icrc2_transfer_from(self, arg: TransferFromArgs) -> TransferFromResult: ...
 
+class AgentMetadata(Record):
+    agent_name: str
+    canister_id: str
+
+class AgentLookup(Record):
+    agent_name: str
+    found: bool
+    agent: Opt[AgentMetadata]
+    replicas: Opt[Vec[WeightedReplica]]
+
+class ToolCatalogLookup(Record):
+    agent_name: str
+    found: bool
+    version: Opt[nat64]
+    metadata: Opt[str]
+
+class ChangeRecord(Record):
+    version: nat64
+    agent_name: str
+    kind: str
+    changed_at: nat64
+
+class ChangeFeed(Record):
+    current_version: nat64
+    changes: Vec[ChangeRecord]
+    truncated: bool
+    has_more: bool
+
+class AgentSearchHit(Record):
+    agent: AgentMetadata
+    score: float64
+
 # Management Canister Service
 class AgentRegistryInterface(Service):
 
     @service_query
     def get_agent_by_name(self, agent_name: str) -> ReturnType:
         ...
+
+    @service_query
+    def get_agents_by_names(self, agent_names: Vec[str]) -> Vec[AgentLookup]:
+        ...
+
+    @service_query
+    def get_tool_catalog(self, agent_names: Vec[str]) -> Vec[ToolCatalogLookup]:
+        ...
+
+    @service_update
+    def publish_tool_metadata(self, agent_name: str, metadata: str) -> ReturnType:
+        ...
+
+    @service_query
+    def changes_since(self, version: nat64, limit: Opt[nat64]) -> ChangeFeed:
+        ...
+
+    @service_query
+    def search_agents(self, search_query: str, k: Opt[nat64], candidates: Opt[Vec[str]]) -> Vec[AgentSearchHit]:
+        ...
     
     @service_update
     def get_list_agents(self) -> ReturnType:
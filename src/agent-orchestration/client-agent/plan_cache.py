@@ -0,0 +1,194 @@
+import hashlib
+import json
+import re
+from typing import Callable, List, Optional, Tuple
+
+from kybra import ic
+
+from constants import PLAN_CACHE_CAPACITY, PLAN_CACHE_TTL_SECONDS
+from lru import LruIndex
+from metrics import get_counter, incr_counter
+from model import CacheStats
+from response_cache import normalize_prompt
+from stable import checked_insert
+from storage import plan_cache, plan_cache_lru
+
+# ==================================== PLAN CACHE ======================================
+# Planner tool calls keyed by the prompt's *shape*: dates and place names are masked
+# into slots ("how is the weather {date0} in {place0}?"), and the same slots are masked
+# in the stored tool call arguments. A later prompt with the same template reuses the
+# plan with its own entities filled back in, skipping discovery and the planner LLM.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+_MONTHS = (
+    "january|february|march|april|may|june|july|august|september|october|november|"
+    "december|jan|feb|mar|apr|jun|jul|aug|sept|sep|oct|nov|dec"
+)
+_WEEKDAYS = "monday|tuesday|wednesday|thursday|friday|saturday|sunday"
+
+_DATE_PATTERNS = [
+    re.compile(r"\b\d{4}-\d{1,2}-\d{1,2}\b"),
+    re.compile(r"\b\d{1,2}[/.]\d{1,2}[/.]\d{2,4}\b"),
+    re.compile(rf"\b\d{{1,2}}(?:st|nd|rd|th)?\s+(?:{_MONTHS})(?:\s+\d{{4}})?\b", re.IGNORECASE),
+    re.compile(rf"\b(?:{_MONTHS})\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?\b", re.IGNORECASE),
+    re.compile(
+        rf"\b(?:(?:next|last|this)\s+(?:week|weekend|month|{_WEEKDAYS})"
+        rf"|this\s+(?:morning|afternoon|evening)|today|tonight|tomorrow|yesterday|{_WEEKDAYS})\b",
+        re.IGNORECASE,
+    ),
+]
+
+# Capitalised word runs after a locative preposition: "in Jakarta", "for New York"
+_PLACE_PATTERN = re.compile(
+    r"\b(?:in|at|for|near|around|of|from|to)\s+([A-Z][\w'-]*(?:\s+[A-Z][\w'-]*)*)"
+)
+
+_lru = LruIndex("plan_cache", plan_cache_lru)
+
+
+def mask_entities(prompt: str) -> Tuple[str, List[Tuple[str, str]]]:
+    """Return the prompt template and its `(slot, entity)` pairs in slot order."""
+
+    entities = []
+
+    def slot_for(kind: str, entity: str) -> str:
+        slot = f"{{{kind}{sum(1 for s, _ in entities if s.startswith('{' + kind))}}}"
+        entities.append((slot, entity))
+        return slot
+
+    for pattern in _DATE_PATTERNS:
+        prompt = pattern.sub(lambda m: slot_for("date", m.group(0)), prompt)
+
+    prompt = _PLACE_PATTERN.sub(
+        lambda m: m.group(0)[: m.start(1) - m.start(0)] + slot_for("place", m.group(1)),
+        prompt,
+    )
+
+    return normalize_prompt(prompt), entities
+
+
+def lookup(prompt: str, agent_names: List[str]) -> Optional[List[dict]]:
+    """Cached plan for a prompt of the same shape, with this prompt's entities filled in."""
+
+    template, entities = mask_entities(prompt)
+    key = _cache_key(template, agent_names)
+    entry = plan_cache.get(key)
+
+    if entry is None or _is_expired(entry["created_at"]):
+        if entry is not None:
+            plan_cache.remove(key)
+            _lru.forget(entry["access_tick"])
+        incr_counter("plan_cache.misses")
+        return None
+
+    incr_counter("plan_cache.hits")
+
+    entry["access_tick"] = _lru.touch(key, entry["access_tick"])
+    plan_cache.insert(key, entry)
+
+    def fill(value: str) -> str:
+        for slot, entity in entities:
+            value = value.replace(slot, entity)
+        return value
+
+    return _map_values(json.loads(entry["plan"]), fill)
+
+
+def store(prompt: str, agent_names: List[str], plan: List[dict]):
+    """Cache a plan when every masked entity can be traced into its arguments."""
+
+    if len(plan) == 0:
+        return
+
+    template, entities = mask_entities(prompt)
+
+    for slot, entity in entities:
+        # Whole-word matches inside argument values only, never in names or other words
+        pattern = re.compile(rf"(?<!\w){re.escape(entity)}(?!\w)", re.IGNORECASE)
+        found = 0
+
+        def mask(value: str) -> str:
+            nonlocal found
+            value, count = pattern.subn(slot, value)
+            found += count
+            return value
+
+        plan = _map_values(plan, mask)
+        if found == 0:
+            # The planner rewrote or dropped this entity, the plan cannot be re-filled
+            return
+
+    plan_json = json.dumps(plan)
+
+    key = _cache_key(template, agent_names)
+    entry = plan_cache.get(key)
+    previous_tick = entry["access_tick"] if entry is not None else None
+    tick = _lru.touch(key, previous_tick)
+
+    stored = checked_insert(
+        plan_cache,
+        key,
+        {"template": template, "plan": plan_json, "created_at": ic.time(), "access_tick": tick},
+    )
+
+    if not stored:
+        # Too large to cache; drop any older plan rather than keep reusing it
+        _lru.forget(tick)
+        plan_cache.remove(key)
+        return
+
+    while plan_cache.len() > PLAN_CACHE_CAPACITY:
+        oldest = _lru.pop_oldest()
+        if oldest is None:
+            break
+        plan_cache.remove(oldest)
+
+
+def invalidate() -> int:
+    removed = 0
+
+    for key, entry in plan_cache.items():
+        plan_cache.remove(key)
+        _lru.forget(entry["access_tick"])
+        removed += 1
+
+    return removed
+
+
+def get_stats() -> CacheStats:
+    return {
+        "hits": get_counter("plan_cache.hits"),
+        "misses": get_counter("plan_cache.misses"),
+        "entries": plan_cache.len(),
+        "ttl_seconds": PLAN_CACHE_TTL_SECONDS,
+    }
+
+
+def _cache_key(template: str, agent_names: List[str]) -> str:
+    raw = template + "|" + ",".join(sorted(set(agent_names)))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _map_values(plan: List[dict], transform: Callable[[str], str]) -> List[dict]:
+    """Copy of the plan with `transform` applied to every string argument value."""
+
+    return [
+        {
+            **call,
+            "function": {
+                **call["function"],
+                "arguments": [
+                    {**arg, "value": transform(arg["value"])} if isinstance(arg.get("value"), str) else arg
+                    for arg in call["function"]["arguments"]
+                ],
+            },
+        }
+        for call in plan
+    ]
+
+
+def _is_expired(created_at: int) -> bool:
+    return ic.time() - created_at > PLAN_CACHE_TTL_SECONDS * _NANOS_PER_SECOND
+
+# ==================================== PLAN CACHE ======================================
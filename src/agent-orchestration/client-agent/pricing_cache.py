@@ -0,0 +1,115 @@
+from kybra import Async, Opt, Principal, ic, match
+
+from constants import AGENT_FANOUT_ENABLED, PRICING_CACHE_TTL_SECONDS
+from fanout import gather
+from metrics import get_counter, incr_counter
+from model import AgentInterface, CacheStats
+from registry_cache import resolve_canister_id
+from storage import agent_pricing
+
+# =================================== PRICING CACHE ====================================
+# Price and owner quoted by each agent. A background timer re-quotes the agents used
+# since its previous run well within the TTL, so paid calls to agents in active use
+# normally find a fresh entry and skip the registry lookup and both agent queries.
+# Entries nobody used are left to expire and dropped, so refresh traffic follows current
+# use. The registry change feed drops entries of agents that changed. An expired entry
+# is never used, it is re-quoted inline instead.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+# agents quoted since the last refresh (heap only: after an upgrade entries just expire)
+_used: set = set()
+
+
+def get_pricing(agent_name: str) -> Async[dict]:
+    """`{"Ok": {"price", "owner"}}` from the cache, or freshly quoted by the agent."""
+
+    _used.add(agent_name)
+    entry = agent_pricing.get(agent_name)
+
+    if entry is not None and not _is_expired(entry["cached_at"]):
+        incr_counter("pricing_cache.hits")
+        return {"Ok": {"price": entry["price"], "owner": entry["owner"]}}
+
+    incr_counter("pricing_cache.misses")
+
+    quote = yield _fetch(agent_name)
+
+    return quote
+
+
+def refresh() -> Async[None]:
+    """Re-quote the cached agents used since the last refresh; drop expired unused ones."""
+
+    agent_names = []
+
+    for agent_name, entry in agent_pricing.items():
+        if agent_name in _used:
+            agent_names.append(agent_name)
+        elif _is_expired(entry["cached_at"]):
+            agent_pricing.remove(agent_name)
+
+    _used.clear()
+
+    if len(agent_names) == 0:
+        return
+
+    if AGENT_FANOUT_ENABLED and len(agent_names) > 1:
+        yield gather([_fetch_task(name) for name in agent_names])
+    else:
+        for agent_name in agent_names:
+            yield _fetch(agent_name)
+
+
+def invalidate(agent_name: Opt[str] = None) -> int:
+    """Drop one cached quote, or every quote when no name is given."""
+
+    names = [agent_name] if agent_name is not None else agent_pricing.keys()
+
+    return sum(1 for name in names if agent_pricing.remove(name) is not None)
+
+
+def get_stats() -> CacheStats:
+    return {
+        "hits": get_counter("pricing_cache.hits"),
+        "misses": get_counter("pricing_cache.misses"),
+        "entries": agent_pricing.len(),
+        "ttl_seconds": PRICING_CACHE_TTL_SECONDS,
+    }
+
+
+def _fetch(agent_name: str) -> Async[dict]:
+
+    resolved = yield resolve_canister_id(agent_name)
+
+    if resolved.get("Err") is not None:
+        return {"Err": resolved.get("Err")}
+
+    agent = AgentInterface(Principal.from_str(resolved.get("Ok")))
+    price_stream = yield agent.get_price()
+    owner_stream = yield agent.get_owner()
+
+    price = match(price_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
+    owner = match(owner_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
+
+    if price.get("Err") is not None or owner.get("Err") is not None:
+        # An agent that cannot quote must not keep being billed at its old price
+        agent_pricing.remove(agent_name)
+        return {"Err": price.get("Err") or owner.get("Err")}
+
+    agent_pricing.insert(
+        agent_name,
+        {"price": price.get("Ok"), "owner": owner.get("Ok"), "cached_at": ic.time()},
+    )
+
+    return {"Ok": {"price": price.get("Ok"), "owner": owner.get("Ok")}}
+
+
+def _fetch_task(agent_name: str):
+    return lambda: _fetch(agent_name)
+
+
+def _is_expired(cached_at: int) -> bool:
+    return ic.time() - cached_at > PRICING_CACHE_TTL_SECONDS * _NANOS_PER_SECOND
+
+# =================================== PRICING CACHE ====================================
@@ -0,0 +1,140 @@
+from typing import List, Optional
+
+from kybra import Async, Opt, Principal, ic, match
+
+from constants import (
+    AGENT_REGISTRY_CANISTER_ID, REGISTRY_CACHE_TTL_SECONDS, REPLICA_CACHE_TTL_SECONDS
+)
+from metrics import get_counter, incr_counter, observe_stage, start_stage
+from model import AgentRegistryInterface, CacheStats, RegistryCacheEntry
+from stable import checked_insert
+from storage import resolved_agents
+
+# ================================== REGISTRY CACHE ====================================
+# Agent name -> canister id resolution, cached in stable memory so it survives
+# upgrades. Entries expire after `REGISTRY_CACHE_TTL_SECONDS` (or
+# `REPLICA_CACHE_TTL_SECONDS` for replicated agents) and can be dropped explicitly with
+# `invalidate`. When an agent has replicas, every resolution picks one of them with
+# smooth weighted round-robin over the registry-provided weights.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+# agent name -> {canister id: current round-robin weight}
+_round_robin: dict = {}
+
+
+def resolve_canister_id(agent_name: str) -> Async[dict]:
+    """Resolve an agent name to a canister id, hitting the registry only on a miss."""
+
+    resolved = yield resolve_canister_ids([agent_name])
+
+    return resolved[agent_name]
+
+
+def resolve_canister_ids(agent_names: List[str]) -> Async[dict]:
+    """
+    Resolve several agent names at once. Cache misses are fetched with a single
+    `get_agents_by_names` call; returns `{agent_name: {"Ok": id} | {"Err": msg}}`.
+    """
+
+    resolved = {}
+    missing = []
+
+    for agent_name in agent_names:
+        entry = resolved_agents.get(agent_name)
+
+        if entry is not None and not _is_expired(entry):
+            incr_counter("registry_cache.hits")
+            resolved[agent_name] = {"Ok": _pick_replica(agent_name, entry)}
+        elif agent_name not in missing:
+            incr_counter("registry_cache.misses")
+            missing.append(agent_name)
+
+    if len(missing) == 0:
+        return resolved
+
+    agent_registry = AgentRegistryInterface(
+        Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
+    )
+    started = start_stage()
+    resp_stream = yield agent_registry.get_agents_by_names(missing)
+    observe_stage("registry_lookup", started)
+    resp = match(resp_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
+
+    if resp.get("Err") is not None:
+        ic.print(f"[ClientAgent] Error resolving agents {missing}: {resp.get('Err')}")
+        for agent_name in missing:
+            resolved[agent_name] = {"Err": resp.get("Err")}
+        return resolved
+
+    for lookup in resp.get("Ok"):
+        agent_name = lookup["agent_name"]
+
+        if not lookup["found"] or lookup["agent"] is None:
+            resolved[agent_name] = {"Err": f"Agent {agent_name} not found"}
+            continue
+
+        entry = {
+            "canister_id": lookup["agent"]["canister_id"],
+            "cached_at": ic.time(),
+            "replicas": lookup.get("replicas"),
+        }
+        if checked_insert(resolved_agents, agent_name, entry):
+            _round_robin.pop(agent_name, None)
+
+        resolved[agent_name] = {"Ok": _pick_replica(agent_name, entry)}
+
+    return resolved
+
+
+def invalidate(agent_name: Opt[str] = None) -> int:
+    """Drop one cached entry, or the whole cache when no name is given."""
+
+    names = [agent_name] if agent_name is not None else resolved_agents.keys()
+
+    removed = 0
+    for name in names:
+        _round_robin.pop(name, None)
+        if resolved_agents.remove(name) is not None:
+            removed += 1
+
+    return removed
+
+
+def get_stats() -> CacheStats:
+    return {
+        "hits": get_counter("registry_cache.hits"),
+        "misses": get_counter("registry_cache.misses"),
+        "entries": resolved_agents.len(),
+        "ttl_seconds": REGISTRY_CACHE_TTL_SECONDS,
+    }
+
+
+def _pick_replica(agent_name: str, entry: RegistryCacheEntry) -> str:
+    replicas = entry.get("replicas") or []
+
+    if len(replicas) <= 1:
+        return entry["canister_id"]
+
+    current = _round_robin.setdefault(agent_name, {})
+    best: Optional[str] = None
+
+    for replica in replicas:
+        canister_id = replica["canister_id"]
+        current[canister_id] = current.get(canister_id, 0.0) + replica["weight"]
+
+        if best is None or current[canister_id] > current[best]:
+            best = canister_id
+
+    current[best] -= sum(replica["weight"] for replica in replicas)
+
+    return best
+
+
+def _is_expired(entry: RegistryCacheEntry) -> bool:
+    replicated = len(entry.get("replicas") or []) > 1
+    ttl = REPLICA_CACHE_TTL_SECONDS if replicated else REGISTRY_CACHE_TTL_SECONDS
+
+    return ic.time() - entry["cached_at"] > ttl * _NANOS_PER_SECOND
+
+# ================================== REGISTRY CACHE ====================================
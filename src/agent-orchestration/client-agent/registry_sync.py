@@ -0,0 +1,59 @@
+from kybra import Async, Principal, ic, match
+
+from constants import AGENT_REGISTRY_CANISTER_ID
+from metrics import get_counter, set_counter
+from model import AgentRegistryInterface
+import pricing_cache
+import registry_cache
+import schema_cache
+
+# =================================== REGISTRY SYNC ====================================
+# Replays the registry change feed from a timer and drops every cached entry of the
+# agents that changed, so caches are revalidated by registry version instead of TTL
+# alone. The last version seen is kept with the other counters in stable memory.
+
+_VERSION_SEEN = "registry.version_seen"
+
+
+def sync_registry_changes() -> Async[None]:
+
+    agent_registry = AgentRegistryInterface(
+        Principal.from_str(AGENT_REGISTRY_CANISTER_ID)
+    )
+
+    has_more = True
+
+    while has_more:
+        since = get_counter(_VERSION_SEEN)
+
+        resp_stream = yield agent_registry.changes_since(since, None)
+        resp = match(resp_stream, {"Ok": lambda ok: {"Ok": ok}, "Err": lambda err: {"Err": err}})
+
+        if resp.get("Err") is not None:
+            ic.print(f"[ClientAgent] Registry sync failed: {resp.get('Err')}")
+            return
+
+        feed = resp.get("Ok")
+
+        if feed["truncated"] or feed["current_version"] < since:
+            # Log no longer reaches back far enough, or the registry was reinstalled
+            ic.print("[ClientAgent] Registry change feed reset, dropping all cached agents")
+            invalidate_agent(None)
+        else:
+            for agent_name in {change["agent_name"] for change in feed["changes"]}:
+                invalidate_agent(agent_name)
+
+        last_version = feed["changes"][-1]["version"] if len(feed["changes"]) > 0 else feed["current_version"]
+        set_counter(_VERSION_SEEN, last_version)
+
+        has_more = feed["has_more"]
+
+
+def invalidate_agent(agent_name):
+    """Drop everything cached about an agent (or about every agent when None)."""
+
+    registry_cache.invalidate(agent_name)
+    schema_cache.invalidate(agent_name)
+    pricing_cache.invalidate(agent_name)
+
+# =================================== REGISTRY SYNC ====================================
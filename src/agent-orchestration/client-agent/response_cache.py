@@ -0,0 +1,112 @@
+import hashlib
+import re
+from typing import List, Optional
+
+from kybra import ic
+
+from constants import RESPONSE_CACHE_CAPACITY, RESPONSE_CACHE_TTL_SECONDS
+from lru import LruIndex
+from metrics import get_counter, incr_counter
+from model import CacheStats
+from stable import checked_insert
+from storage import response_cache, response_cache_lru
+
+# ================================== RESPONSE CACHE ====================================
+# Final answers keyed by the normalised prompt and the sorted connected agents. Entries
+# expire after `RESPONSE_CACHE_TTL_SECONDS`; beyond `RESPONSE_CACHE_CAPACITY` the least
+# recently used entry is evicted. Each entry remembers the agents its run was charged
+# for, so a caller served the cached answer pays the same price.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+_lru = LruIndex("response_cache", response_cache_lru)
+
+
+def normalize_prompt(prompt: str) -> str:
+    prompt = re.sub(r"\s+", " ", prompt.strip().lower())
+    return re.sub(r"\s+([?.!,;:])", r"\1", prompt)
+
+
+def cache_key(prompt: str, agent_names: List[str]) -> str:
+    raw = normalize_prompt(prompt) + "|" + ",".join(sorted(set(agent_names)))
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def get(key: str) -> Optional[str]:
+    entry = response_cache.get(key)
+
+    if entry is None or _is_expired(entry["created_at"]):
+        if entry is not None:
+            _remove(key, entry)
+        incr_counter("response_cache.misses")
+        return None
+
+    incr_counter("response_cache.hits")
+
+    entry["access_tick"] = _lru.touch(key, entry["access_tick"])
+    response_cache.insert(key, entry)
+
+    return entry["response"]
+
+
+def charged_agents(key: str) -> Optional[List[str]]:
+    """Agents the run behind a cached answer was charged for, without counting a hit."""
+
+    entry = response_cache.get(key)
+
+    return entry.get("agents") if entry is not None else None
+
+
+def put(key: str, response: str, agents: List[str]):
+    entry = response_cache.get(key)
+    previous_tick = entry["access_tick"] if entry is not None else None
+    tick = _lru.touch(key, previous_tick)
+
+    stored = checked_insert(
+        response_cache,
+        key,
+        {"response": response, "created_at": ic.time(), "access_tick": tick, "agents": agents},
+    )
+
+    if not stored:
+        # Too large to cache; drop any older answer rather than keep serving it
+        _lru.forget(tick)
+        response_cache.remove(key)
+        return
+
+    while response_cache.len() > RESPONSE_CACHE_CAPACITY:
+        oldest = _lru.pop_oldest()
+        if oldest is None:
+            break
+        response_cache.remove(oldest)
+        incr_counter("response_cache.evictions")
+
+
+def invalidate() -> int:
+    removed = 0
+
+    for key, entry in response_cache.items():
+        _remove(key, entry)
+        removed += 1
+
+    return removed
+
+
+def get_stats() -> CacheStats:
+    return {
+        "hits": get_counter("response_cache.hits"),
+        "misses": get_counter("response_cache.misses"),
+        "entries": response_cache.len(),
+        "ttl_seconds": RESPONSE_CACHE_TTL_SECONDS,
+    }
+
+
+def _remove(key: str, entry):
+    response_cache.remove(key)
+    _lru.forget(entry["access_tick"])
+
+
+def _is_expired(created_at: int) -> bool:
+    return ic.time() - created_at > RESPONSE_CACHE_TTL_SECONDS * _NANOS_PER_SECOND
+
+# ================================== RESPONSE CACHE ====================================
@@ -0,0 +1,161 @@
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+from metrics import get_counter, incr_counter
+from model import RouterStats
+from plan_cache import mask_entities
+
+# ======================================= ROUTER =======================================
+# Deterministic routing ahead of the planner LLM. Keywords are the phrases each agent
+# publishes under `keywords` in its METADATA (discovered with its tool schema) plus its
+# full name ("weather agent"), compiled into a token trie whenever they change. Single
+# words of tool descriptions are deliberately not keywords: "quality" or "air" alone
+# say nothing about air quality. A prompt is routed locally only when every matched
+# keyword points at a single connected agent and all of its required arguments can be
+# extracted, and only when every connected agent published keywords: an agent without
+# any could be the one the prompt is meant for. Anything else is left to the planner.
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:\.[a-z0-9]+)*")
+
+# Slot kinds of `plan_cache.mask_entities` that can fill an argument of a given name
+_ENTITY_ARGUMENTS = {
+    "city": "place",
+    "location": "place",
+    "place": "place",
+    "date": "date",
+    "day": "date",
+}
+
+# agent name -> (published keywords, keyword phrases)
+_keywords: Dict[str, Tuple[Tuple[str, ...], List[Tuple[str, ...]]]] = {}
+
+# token -> child node; the `None` key holds the agents a phrase ends at
+_trie: dict = {}
+
+
+def route(prompt: str, tools: List[dict]) -> Optional[List[dict]]:
+    """Tool calls for a confidently routed prompt, or None to fall back to the planner."""
+
+    _compile(tools)
+
+    connected = {tool["function"]["name"]: tool for tool in tools}
+
+    if any(len(_keywords[agent_name][0]) == 0 for agent_name in connected):
+        incr_counter("router.fallbacks")
+        return None
+
+    matched = _match(_tokenize(prompt), set(connected))
+
+    if matched is None or len(matched) == 0:
+        incr_counter("router.fallbacks")
+        return None
+
+    _, entities = mask_entities(prompt)
+
+    tool_calls = []
+    for agent_name in [name for name in connected if name in matched]:
+        arguments = _extract_arguments(connected[agent_name], prompt, entities)
+        if arguments is None:
+            incr_counter("router.fallbacks")
+            return None
+        tool_calls.append({"function": {"name": agent_name, "arguments": arguments}})
+
+    incr_counter("router.resolved")
+
+    return tool_calls
+
+
+def get_stats() -> RouterStats:
+    resolved = get_counter("router.resolved")
+    fallbacks = get_counter("router.fallbacks")
+    total = resolved + fallbacks
+
+    return {
+        "resolved": resolved,
+        "fallbacks": fallbacks,
+        "hit_rate": resolved / total if total > 0 else 0.0,
+    }
+
+
+def _compile(tools: List[dict]):
+    changed = False
+
+    for tool in tools:
+        agent_name = tool["function"]["name"]
+        keywords = tuple(tool.get("keywords") or [])
+
+        cached = _keywords.get(agent_name)
+        if cached is not None and cached[0] == keywords:
+            continue
+
+        phrases = {tuple(_tokenize(keyword)) for keyword in keywords}
+        name_phrase = tuple(_tokenize(agent_name))
+        if len(name_phrase) > 1:
+            phrases.add(name_phrase)
+
+        _keywords[agent_name] = (keywords, [phrase for phrase in phrases if len(phrase) > 0])
+        changed = True
+
+    if changed:
+        _trie.clear()
+        for agent_name, (_, phrases) in _keywords.items():
+            for phrase in phrases:
+                node = _trie
+                for token in phrase:
+                    node = node.setdefault(token, {})
+                node.setdefault(None, set()).add(agent_name)
+
+
+def _match(tokens: List[str], connected: Set[str]) -> Optional[Set[str]]:
+    """Agents hit by the prompt's keywords, or None when a keyword is ambiguous."""
+
+    matched = set()
+
+    for start in range(len(tokens)):
+        node = _trie
+        agents = None
+
+        # Longest phrase starting here wins
+        for token in tokens[start:]:
+            node = node.get(token)
+            if node is None:
+                break
+            if None in node:
+                agents = node[None] & connected
+
+        if agents is None or len(agents) == 0:
+            continue
+        if len(agents) > 1:
+            return None
+
+        matched.update(agents)
+
+    return matched
+
+
+def _extract_arguments(tool: dict, prompt: str, entities: List[Tuple[str, str]]) -> Optional[List[dict]]:
+    parameters = tool["function"].get("parameters") or {}
+
+    arguments = []
+
+    for name in parameters.get("required") or ["prompt"]:
+        if name == "prompt":
+            arguments.append({"name": name, "value": prompt})
+            continue
+
+        kind = _ENTITY_ARGUMENTS.get(name)
+        values = [entity for slot, entity in entities if kind is not None and slot.startswith("{" + kind)]
+
+        if len(values) != 1:
+            # Missing or more than one candidate, let the planner decide
+            return None
+
+        arguments.append({"name": name, "value": values[0]})
+
+    return arguments
+
+
+def _tokenize(text: str) -> List[str]:
+    return _TOKEN_PATTERN.findall(text.lower())
+
+# ======================================= ROUTER =======================================
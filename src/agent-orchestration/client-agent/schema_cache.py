@@ -0,0 +1,124 @@
+import hashlib
+import json
+from typing import Optional
+
+from kybra import Opt, ic
+
+from constants import SCHEMA_CACHE_TTL_SECONDS
+from metrics import get_counter, incr_counter
+from model import CacheStats, ToolSchemaEntry
+from stable import checked_insert
+from storage import tool_schemas
+
+# ================================== SCHEMA CACHE ======================================
+# Processed tool schemas per agent, versioned by a hash of the raw metadata. The
+# stable map survives upgrades; `_parsed` mirrors it on the heap so a hit is a plain
+# dictionary lookup instead of a JSON decode.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+# agent name -> (version, tool dict)
+_parsed: dict = {}
+
+
+def get_tool(agent_name: str) -> Optional[dict]:
+    """Return the cached tool of an agent, or None when missing or stale."""
+
+    entry = tool_schemas.get(agent_name)
+
+    if entry is None or _is_expired(entry["cached_at"]):
+        incr_counter("schema_cache.misses")
+        return None
+
+    incr_counter("schema_cache.hits")
+
+    return _load(agent_name, entry)
+
+
+def store(agent_name: str, metadata_json: str, version: Opt[str] = None) -> dict:
+    """Process and cache raw agent metadata; unchanged versions are only refreshed."""
+
+    version = version if version is not None else metadata_version(metadata_json)
+    entry = tool_schemas.get(agent_name)
+
+    if entry is not None and entry["version"] == version:
+        entry["cached_at"] = ic.time()
+        checked_insert(tool_schemas, agent_name, entry)
+        return _load(agent_name, entry)
+
+    tool = to_tool(json.loads(metadata_json))
+    checked_insert(
+        tool_schemas,
+        agent_name,
+        {"version": version, "tool": json.dumps(tool), "cached_at": ic.time()},
+    )
+    _parsed[agent_name] = (version, tool)
+
+    return tool
+
+
+def to_tool(agent_metadata: dict) -> dict:
+    """
+    Strip orchestration-only parameters so the agent can be offered to the planner.
+    The agent's router `keywords` stay on the tool; `planner_tool` drops them.
+    """
+
+    parameters = agent_metadata["function"].get("parameters")
+
+    if parameters is not None and parameters.get("properties") is not None:
+        parameters["properties"] = [
+            prop
+            for prop in parameters["properties"]
+            if prop["name"] != "connected_agent_list"
+        ]
+
+    return agent_metadata
+
+
+def planner_tool(tool: dict) -> dict:
+    """The tool as the planner LLM's `Tool` variant expects it, without router keywords."""
+
+    return {"function": tool["function"]}
+
+
+def metadata_version(metadata_json: str) -> str:
+    return hashlib.sha256(metadata_json.encode()).hexdigest()[:16]
+
+
+def invalidate(agent_name: Opt[str] = None) -> int:
+    """Drop one cached schema, or every schema when no name is given."""
+
+    names = [agent_name] if agent_name is not None else tool_schemas.keys()
+
+    removed = 0
+    for name in names:
+        _parsed.pop(name, None)
+        if tool_schemas.remove(name) is not None:
+            removed += 1
+
+    return removed
+
+
+def get_stats() -> CacheStats:
+    return {
+        "hits": get_counter("schema_cache.hits"),
+        "misses": get_counter("schema_cache.misses"),
+        "entries": tool_schemas.len(),
+        "ttl_seconds": SCHEMA_CACHE_TTL_SECONDS,
+    }
+
+
+def _load(agent_name: str, entry: ToolSchemaEntry) -> dict:
+    cached = _parsed.get(agent_name)
+
+    if cached is None or cached[0] != entry["version"]:
+        cached = (entry["version"], json.loads(entry["tool"]))
+        _parsed[agent_name] = cached
+
+    return cached[1]
+
+
+def _is_expired(cached_at: int) -> bool:
+    return ic.time() - cached_at > SCHEMA_CACHE_TTL_SECONDS * _NANOS_PER_SECOND
+
+# ================================== SCHEMA CACHE ======================================
@@ -0,0 +1,127 @@
+import hashlib
+
+from kybra import Async, Principal, ic, match
+
+from constants import (
+    LEDGER_CANISTER_ID,
+    LEDGER_DEDUP_WINDOW_SECONDS,
+    LEDGER_TRANSFER_FEE,
+    SETTLEMENT_INTERVAL_SECONDS,
+    SETTLEMENT_MIN_PAYOUT,
+)
+from metrics import get_counter, incr_counter
+from model import Ledger, SettlementStats
+from storage import accruals, pending_payouts
+
+# ===================================== SETTLEMENT =====================================
+# Deferred owner and app-fee payouts. Paid calls only accrue amounts per payee; a timer
+# flushes them once per window with one ledger transfer per payee. Every payout is
+# parked in `pending_payouts` with a memo and `created_at_time` derived from the window
+# before the transfer is sent, so a retry of the same payout (or an overlapping flush)
+# is recognised by the ledger as a duplicate instead of paying twice. The ledger fee
+# comes out of each payout, so the escrow never pays out more than was accrued.
+
+_NANOS_PER_SECOND = 1_000_000_000
+
+
+def accrue(payee: str, amount: int):
+    if amount == 0:
+        return
+
+    accruals.insert(payee, (accruals.get(payee) or 0) + amount)
+
+
+def flush() -> Async[None]:
+    """Move due accruals into pending payouts, then send every pending payout."""
+
+    window = incr_counter("settlement.window")
+    now = ic.time()
+
+    for payee, amount in accruals.items():
+        if amount < SETTLEMENT_MIN_PAYOUT:
+            continue
+
+        key = f"{window}:{payee}"
+        accruals.remove(payee)
+        pending_payouts.insert(
+            key,
+            {
+                "payee": payee,
+                "amount": amount,
+                "memo": hashlib.sha256(key.encode()).digest(),
+                "created_at_time": now,
+                "attempts": 0,
+            },
+        )
+
+    for key in pending_payouts.keys():
+        yield _send(key)
+
+
+def get_stats() -> SettlementStats:
+    amounts = accruals.values()
+
+    return {
+        "accrued_total": sum(amounts),
+        "accrued_payees": len(amounts),
+        "pending_payouts": pending_payouts.len(),
+        "transfers": get_counter("settlement.transfers"),
+        "failures": get_counter("settlement.failures"),
+        "settled_total": get_counter("settlement.settled_total"),
+    }
+
+
+def _send(key: str) -> Async[None]:
+    # Re-read: an overlapping flush may have settled this payout while we waited
+    payout = pending_payouts.get(key)
+
+    if payout is None:
+        return
+
+    age = ic.time() - payout["created_at_time"]
+
+    if age > (LEDGER_DEDUP_WINDOW_SECONDS - SETTLEMENT_INTERVAL_SECONDS) * _NANOS_PER_SECOND:
+        # About to leave the ledger's deduplication window. Every earlier attempt was
+        # retried inside the window without a success or duplicate, so none of them
+        # landed and a fresh timestamp cannot double pay.
+        payout["created_at_time"] = ic.time()
+
+    payout["attempts"] += 1
+    pending_payouts.insert(key, payout)
+
+    ledger = Ledger(Principal.from_str(LEDGER_CANISTER_ID))
+
+    transfer_stream = yield ledger.icrc1_transfer(
+        {
+            "from_subaccount": None,
+            "to": {"owner": Principal.from_str(payout["payee"]), "subaccount": None},
+            "amount": payout["amount"] - LEDGER_TRANSFER_FEE,
+            "fee": LEDGER_TRANSFER_FEE,
+            "memo": payout["memo"],
+            "created_at_time": payout["created_at_time"],
+        }
+    )
+
+    transfer = match(
+        transfer_stream, {"Ok": lambda ok: ok, "Err": lambda err: {"Err": {"CallFailed": err}}}
+    )
+    err = transfer.get("Err")
+
+    if err is not None and "Duplicate" not in err:
+        incr_counter("settlement.failures")
+        ic.print(f"[ClientAgent] Settlement of {key} rejected: {err}")
+        return
+
+    if pending_payouts.remove(key) is None:
+        # The overlapping flush already settled and counted it
+        return
+
+    incr_counter("settlement.transfers")
+    incr_counter("settlement.settled_total", payout["amount"])
+
+    ic.print(
+        f"[ClientAgent] Settled {payout['amount'] - LEDGER_TRANSFER_FEE} to {payout['payee']} "
+        f"({key}, ledger fee {LEDGER_TRANSFER_FEE})"
+    )
+
+# ===================================== SETTLEMENT =====================================
@@ -0,0 +1,120 @@
+from typing import Callable, List
+
+from kybra import Async
+
+from fanout import discard_batch, start_batch, wait_batch
+from metrics import get_counter, incr_counter, stage_cost, start_stage
+from model import SpeculationStats
+
+# ==================================== SPECULATION =====================================
+# Opt-in overlap of agent calls with the planner LLM. While the planner runs, every
+# connected agent is already called with the raw prompt. A speculative result is kept
+# when the plan calls that agent with nothing but a prompt (every agent extracts its
+# own details from it); agents the plan skips, or calls with other arguments, are
+# wasted work. Besides their number, the latency and instructions those discarded calls
+# took are added up ("speculation.wasted_ms" / "speculation.wasted_instructions"), as
+# soon as a call is both discarded and finished.
+
+
+def start(prompt: str, agent_names: List[str], make_task: Callable) -> dict:
+    """Launch `make_task(agent_name, arguments)` for every agent without waiting."""
+
+    arguments = [{"name": "prompt", "value": prompt}]
+    speculation = {"agents": list(agent_names), "costs": [None] * len(agent_names), "wasted": set()}
+
+    speculation["batch_id"] = start_batch(
+        [
+            _measured(speculation, index, make_task(name, arguments))
+            for index, name in enumerate(agent_names)
+        ]
+    )
+
+    incr_counter("speculation.launched", len(agent_names))
+
+    return speculation
+
+
+def collect(speculation: dict, agent_call_list: List[dict]) -> Async[dict]:
+    """Results of the speculative calls the plan confirms, keyed by plan position,
+    plus the plan calls that still have to be made."""
+
+    agents = speculation["agents"]
+    confirmed = {}
+
+    for position, agent in enumerate(agent_call_list):
+        agent_name = agent["function"]["name"]
+        argument_names = [arg["name"] for arg in agent["function"]["arguments"]]
+
+        if (
+            agent_name in agents
+            and argument_names == ["prompt"]
+            and agents.index(agent_name) not in confirmed.values()
+        ):
+            confirmed[position] = agents.index(agent_name)
+
+    results = yield wait_batch(speculation["batch_id"], list(confirmed.values()))
+
+    incr_counter("speculation.confirmed", len(confirmed))
+    _waste(speculation, [index for index in range(len(agents)) if index not in confirmed.values()])
+
+    return {
+        "results": dict(zip(confirmed.keys(), results)),
+        "remaining": [
+            agent for position, agent in enumerate(agent_call_list) if position not in confirmed
+        ],
+    }
+
+
+def abandon(speculation: dict):
+    """Drop a speculation whose plan never materialised."""
+
+    discard_batch(speculation["batch_id"])
+    _waste(speculation, list(range(len(speculation["agents"]))))
+
+
+def get_stats() -> SpeculationStats:
+    launched = get_counter("speculation.launched")
+    wasted = get_counter("speculation.wasted")
+
+    return {
+        "launched": launched,
+        "confirmed": get_counter("speculation.confirmed"),
+        "wasted": wasted,
+        "waste_ratio": wasted / launched if launched > 0 else 0.0,
+        "wasted_ms": get_counter("speculation.wasted_ms"),
+        "wasted_instructions": get_counter("speculation.wasted_instructions"),
+    }
+
+
+def _measured(speculation: dict, index: int, task: Callable) -> Callable:
+    """`task` that records its cost on the speculation, and as waste once discarded."""
+
+    def measured() -> Async[dict]:
+        started = start_stage()
+        result = yield task()
+
+        speculation["costs"][index] = stage_cost(started)
+        if index in speculation["wasted"]:
+            _record_waste(speculation["costs"][index])
+
+        return result
+
+    return measured
+
+
+def _waste(speculation: dict, indices: List[int]):
+    incr_counter("speculation.wasted", len(indices))
+
+    for index in indices:
+        speculation["wasted"].add(index)
+        if speculation["costs"][index] is not None:
+            _record_waste(speculation["costs"][index])
+
+
+def _record_waste(cost):
+    latency_ms, instructions = cost
+
+    incr_counter("speculation.wasted_ms", latency_ms)
+    incr_counter("speculation.wasted_instructions", instructions)
+
+# ==================================== SPECULATION =====================================
@@ -0,0 +1,29 @@
+from kybra import StableBTreeMap, ic
+
+from metrics import incr_counter
+
+# ======================================= STABLE =======================================
+
+
+def checked_insert(stable_map: StableBTreeMap, key, value) -> bool:
+    """`StableBTreeMap.insert` that reports key/value size errors instead of dropping
+    them silently; failures are logged and counted under `stable.insert_failures`."""
+
+    result = stable_map.insert(key, value)
+    err = result.get("Err") if isinstance(result, dict) else getattr(result, "Err", None)
+
+    if err is not None:
+        incr_counter("stable.insert_failures")
+        ic.print(f"[ClientAgent] Stable insert of '{key}' failed: {err}")
+        return False
+
+    return True
+
+
+def truncate_utf8(text: str, max_bytes: int) -> str:
+    """`text` cut to at most `max_bytes` of UTF-8, never splitting a character (map
+    limits are in bytes, and e.g. "°C" takes three of them)."""
+
+    return text.encode()[:max_bytes].decode("utf-8", "ignore")
+
+# ======================================= STABLE =======================================
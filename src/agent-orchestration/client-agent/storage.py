@@ -0,0 +1,80 @@
+from kybra import StableBTreeMap, nat64
+
+from model import *
+
+# ====================================== STORAGE =======================================
+# Every stable structure of the client agent lives here so memory ids stay unique.
+
+# agent name -> resolved canister id
+# (sized for the registry's MAX_REPLICAS = 32 replicas at ~36 bytes each)
+resolved_agents = StableBTreeMap[str, RegistryCacheEntry](
+    memory_id=0, max_key_size=128, max_value_size=2_048
+)
+
+# metric name -> counter value
+counters = StableBTreeMap[str, nat64](
+    memory_id=1, max_key_size=128, max_value_size=16
+)
+
+# agent name -> processed tool schema, ready for ChatRequestV1.tools
+# (sized for the registry catalog's 32_768-byte metadata plus the entry's own fields)
+tool_schemas = StableBTreeMap[str, ToolSchemaEntry](
+    memory_id=2, max_key_size=128, max_value_size=33_792
+)
+
+# normalised request key -> final orchestration response
+response_cache = StableBTreeMap[str, ResponseCacheEntry](
+    memory_id=3, max_key_size=128, max_value_size=32_768
+)
+
+# access tick -> response cache key (least recently used first)
+response_cache_lru = StableBTreeMap[nat64, str](
+    memory_id=4, max_key_size=16, max_value_size=128
+)
+
+# prompt template + agents -> masked planner tool calls
+plan_cache = StableBTreeMap[str, PlanCacheEntry](
+    memory_id=5, max_key_size=128, max_value_size=16_384
+)
+
+# access tick -> plan cache key (least recently used first)
+plan_cache_lru = StableBTreeMap[nat64, str](
+    memory_id=6, max_key_size=16, max_value_size=128
+)
+
+# job id -> background orchestration state and partial results
+jobs = StableBTreeMap[str, Job](
+    memory_id=7, max_key_size=64, max_value_size=65_536
+)
+
+# caller principal -> prepaid balance (ledger base units)
+balances = StableBTreeMap[str, nat64](
+    memory_id=8, max_key_size=128, max_value_size=16
+)
+
+# payee principal -> payouts accrued since the last settlement
+accruals = StableBTreeMap[str, nat64](
+    memory_id=9, max_key_size=128, max_value_size=16
+)
+
+# "<window>:<payee>" -> payout taken out of accruals but not yet confirmed by the ledger
+pending_payouts = StableBTreeMap[str, PendingPayout](
+    memory_id=10, max_key_size=160, max_value_size=256
+)
+
+# agent name -> quoted price and owner
+agent_pricing = StableBTreeMap[str, PricingEntry](
+    memory_id=11, max_key_size=128, max_value_size=256
+)
+
+# caller + idempotency key -> outcome (or in-progress marker) of the first execution
+idempotency_records = StableBTreeMap[str, IdempotencyRecord](
+    memory_id=12, max_key_size=128, max_value_size=32_768
+)
+
+# insertion tick -> idempotency record key (oldest first)
+idempotency_order = StableBTreeMap[nat64, str](
+    memory_id=13, max_key_size=16, max_value_size=128
+)
+
+# ====================================== STORAGE =======================================
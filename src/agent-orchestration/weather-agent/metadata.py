@@ -26,6 +26,10 @@ METADATA = create_function_tool(
     }
 )
 
+# Phrases the client agent's keyword router matches in prompts to pick this agent
+METADATA["keywords"] = ["weather", "temperature", "forecast", "rain", "humidity", "wind"]
+
+
 def is_all_required_params_present(params: List[dict]) -> bool:
 
     for param in METADATA['function']['parameters']['required'] or []:
@@ -0,0 +1,42 @@
+"""Import a canister's flat modules (`constants`, `model`, `storage`, ...) for a test.
+
+Every canister under src/agent-orchestration uses the same top-level module names, so
+loading one drops the modules another canister left in `sys.modules` first."""
+
+import importlib
+import sys
+from pathlib import Path
+
+CANISTERS = Path(__file__).resolve().parents[2] / "src" / "agent-orchestration"
+STUBS = Path(__file__).resolve().parent / "stubs"
+
+if str(STUBS) not in sys.path:
+    sys.path.insert(0, str(STUBS))
+
+
+def load(canister: str, module: str):
+    canister_dir = CANISTERS / canister
+
+    for name, loaded in list(sys.modules.items()):
+        path = Path(getattr(loaded, "__file__", None) or "/")
+        if CANISTERS in path.parents and canister_dir not in path.parents:
+            del sys.modules[name]
+
+    sys.path[:] = [entry for entry in sys.path if CANISTERS not in Path(entry).parents]
+    sys.path.insert(0, str(canister_dir))
+
+    return importlib.import_module(module)
+
+
+def run(generator):
+    """Drive a kybra-style `Async` generator to completion, resolving nested ones."""
+
+    value = None
+
+    while True:
+        try:
+            yielded = generator.send(value)
+        except StopIteration as stop:
+            return stop.value
+
+        value = run(yielded) if hasattr(yielded, "send") else yielded
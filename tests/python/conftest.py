@@ -0,0 +1,11 @@
+import pytest
+
+import canister  # noqa: F401  (puts the kybra stub on sys.path)
+import kybra
+
+
+@pytest.fixture(autouse=True)
+def stable_memory():
+    kybra.reset()
+    yield
+    kybra.reset()
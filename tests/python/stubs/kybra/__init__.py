@@ -0,0 +1,176 @@
+"""Minimal in-process stand-in for the kybra CDK, enough to import the canisters' pure
+logic modules under pytest. Stable maps are plain dicts and `ic` is a fake clock."""
+
+from typing import TypedDict
+
+nat64 = int
+float64 = float
+blob = bytes
+null = None
+GuardResult = dict
+
+Record = TypedDict
+Variant = TypedDict
+
+
+class _Generic:
+    def __class_getitem__(cls, item):
+        return cls
+
+
+class Opt(_Generic):
+    pass
+
+
+class Vec(_Generic):
+    pass
+
+
+class Async(_Generic):
+    pass
+
+
+class Principal:
+
+    def __init__(self, text: str):
+        self.text = text
+
+    @staticmethod
+    def from_str(text: str) -> "Principal":
+        return Principal(text)
+
+    def to_str(self) -> str:
+        return self.text
+
+    def __eq__(self, other):
+        return isinstance(other, Principal) and other.text == self.text
+
+    def __hash__(self):
+        return hash(self.text)
+
+    def __repr__(self):
+        return f"Principal({self.text!r})"
+
+
+class Service:
+
+    def __init__(self, principal: Principal):
+        self.principal = principal
+
+
+def _decorator(function=None, **options):
+    """Canister method decorators; the method keeps its `guard` for tests to inspect."""
+
+    def decorate(decorated):
+        decorated.guard = options.get("guard")
+        return decorated
+
+    return decorate if function is None else decorate(function)
+
+
+update = query = init = post_upgrade = pre_upgrade = heartbeat = _decorator
+service_query = service_update = _decorator
+
+
+def match(result: dict, handlers: dict):
+    if result.get("Err") is not None:
+        return handlers["Err"](result["Err"])
+    return handlers["Ok"](result.get("Ok"))
+
+
+_stable_maps = []
+
+
+class StableBTreeMap:
+
+    def __class_getitem__(cls, item):
+        return cls
+
+    def __init__(self, memory_id: int, max_key_size: int, max_value_size: int):
+        self.memory_id = memory_id
+        self.max_key_size = max_key_size
+        self.max_value_size = max_value_size
+        self.entries = {}
+        _stable_maps.append(self)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def insert(self, key, value):
+        # Sizes approximated by the repr, enough to exercise the map limits
+        for kind, item, max_size in (("Key", key, self.max_key_size), ("Value", value, self.max_value_size)):
+            given = len(repr(item).encode())
+            if given > max_size:
+                return {"Err": {f"{kind}TooLarge": {"given": given, "max": max_size}}}
+
+        previous = self.entries.get(key)
+        self.entries[key] = value
+        return previous
+
+    def remove(self, key):
+        return self.entries.pop(key, None)
+
+    def contains_key(self, key) -> bool:
+        return key in self.entries
+
+    def is_empty(self) -> bool:
+        return len(self.entries) == 0
+
+    def len(self) -> int:
+        return len(self.entries)
+
+    def keys(self):
+        return sorted(self.entries)
+
+    def values(self):
+        return [self.entries[key] for key in sorted(self.entries)]
+
+    def items(self):
+        return [(key, self.entries[key]) for key in sorted(self.entries)]
+
+
+class _IC:
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.now = 1_700_000_000 * 1_000_000_000
+        self.caller_text = "2vxsx-fae"
+        self.id_text = "aaaaa-aa"
+        self.controller_texts = set()
+
+    def time(self) -> int:
+        return self.now
+
+    def caller(self) -> Principal:
+        return Principal(self.caller_text)
+
+    def id(self) -> Principal:
+        return Principal(self.id_text)
+
+    def is_controller(self, principal: Principal) -> bool:
+        return principal.text in self.controller_texts
+
+    def print(self, *_args):
+        pass
+
+    def performance_counter(self, _counter_type: int) -> int:
+        return 0
+
+    def set_timer(self, _delay, _callback):
+        return 0
+
+    def set_timer_interval(self, _interval, _callback):
+        return 0
+
+
+ic = _IC()
+
+
+def reset():
+    """Empty every stable map and rewind the clock (between tests)."""
+
+    for stable_map in _stable_maps:
+        stable_map.entries.clear()
+    ic.reset()
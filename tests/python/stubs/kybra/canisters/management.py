@@ -0,0 +1,7 @@
+class _ManagementCanister:
+
+    def raw_rand(self):
+        return {"Ok": bytes(32)}
+
+
+management_canister = _ManagementCanister()
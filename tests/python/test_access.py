@@ -0,0 +1,24 @@
+from canister import load
+
+access = load("client-agent", "access")
+ic = access.ic
+
+
+def test_non_controllers_are_rejected():
+    assert access.controller_only() == {"Err": "Only controllers can call this method"}
+
+
+def test_the_canister_itself_is_allowed():
+    ic.caller_text = ic.id_text
+
+    assert access.controller_only() == {"Ok": None}
+
+
+def test_controller_changes_apply_to_the_next_call():
+    ic.controller_texts.add(ic.caller_text)
+
+    assert access.controller_only() == {"Ok": None}
+
+    ic.controller_texts.clear()
+
+    assert access.controller_only().get("Err") is not None
@@ -0,0 +1,50 @@
+import pytest
+
+from canister import load
+
+changes = load("agent-registry", "changes")
+
+
+@pytest.fixture(autouse=True)
+def small_log(monkeypatch):
+    monkeypatch.setattr(changes, "CHANGE_LOG_CAPACITY", 5)
+
+
+def test_versions_increase_and_feed_pages_oldest_first():
+    for name in ("a", "b", "c"):
+        changes.record_change(name, changes.REGISTERED)
+
+    feed = changes.changes_since(0, 2)
+
+    assert feed["current_version"] == 3
+    assert [change["agent_name"] for change in feed["changes"]] == ["a", "b"]
+    assert feed["has_more"]
+    assert not feed["truncated"]
+
+    feed = changes.changes_since(2, 2)
+
+    assert [change["version"] for change in feed["changes"]] == [3]
+    assert not feed["has_more"]
+
+
+def test_feed_is_truncated_once_the_log_no_longer_reaches_back():
+    for index in range(8):
+        changes.record_change(f"agent-{index}", changes.UPDATED)
+
+    feed = changes.changes_since(1, 10)
+
+    assert feed["truncated"]
+    assert [change["version"] for change in feed["changes"]] == [4, 5, 6, 7, 8]
+
+    feed = changes.changes_since(3, 10)
+
+    assert not feed["truncated"]
+    assert len(changes.change_log.keys()) == 5
+
+
+def test_changes_stamp_the_agent_version():
+    changes.agent_registry.insert("weather-agent", {"agent_name": "weather-agent", "version": None})
+
+    version = changes.record_change("weather-agent", changes.REPLICAS)
+
+    assert changes.agent_registry.get("weather-agent")["version"] == version
@@ -0,0 +1,80 @@
+from canister import load, run
+
+coalesce = load("client-agent", "coalesce")
+metrics = load("client-agent", "metrics")
+
+
+def _task():
+    """A task suspended on one awaited call; send it the call's answer to finish it."""
+
+    answer = yield "awaited call"
+    return answer
+
+
+def _done(result: dict):
+    return result
+    yield
+
+
+def _start_leader(flights: dict):
+    """Start a leader up to its task's awaited call; returns (leader, task)."""
+
+    leader = coalesce.call(flights, "key", _task, forget=True, name="flight")
+    task = leader.send(None)
+    assert task.send(None) == "awaited call"
+    return leader, task
+
+
+def _finish(generator, value):
+    try:
+        generator.send(value)
+    except StopIteration as stop:
+        return stop.value
+    raise AssertionError("generator did not finish")
+
+
+def test_follower_gets_the_leaders_result():
+    flights = {}
+    leader, task = _start_leader(flights)
+
+    follower = coalesce.call(flights, "key", _task, forget=True, name="flight")
+    follower.send(None)  # waiting on a tick
+
+    result = _finish(task, {"Ok": "answer"})
+
+    assert _finish(leader, result) == {"Ok": "answer"}
+    assert _finish(follower, {"Ok": b""}) == {"Ok": "answer"}
+    assert metrics.get_counter("flight.runs") == 1
+    assert metrics.get_counter("flight.joined") == 1
+
+
+def test_leader_error_reaches_followers_but_is_not_kept():
+    flights = {}
+    leader, task = _start_leader(flights)
+
+    follower = coalesce.call(flights, "key", _task, forget=True)
+    follower.send(None)
+
+    _finish(leader, _finish(task, {"Err": "agent trapped"}))
+
+    assert _finish(follower, {"Ok": b""}) == {"Err": "agent trapped"}
+    assert flights == {}
+
+    # The next caller runs the task again instead of reusing the error
+    assert run(coalesce.call(flights, "key", lambda: _done({"Ok": "retried"}), forget=True)) == {"Ok": "retried"}
+
+
+def test_flight_is_released_after_the_run():
+    flights = {}
+
+    assert run(coalesce.call(flights, "key", lambda: _done({"Ok": "answer"}), forget=True)) == {"Ok": "answer"}
+    assert flights == {}
+
+
+def test_flight_of_a_trapped_runner_is_replaced_once_too_old():
+    flights = {"key": {"result": None, "started_at": coalesce.ic.time()}}
+    coalesce.ic.now += 61 * 1_000_000_000
+
+    result = run(coalesce.call(flights, "key", lambda: _done({"Ok": "fresh"}), max_age_seconds=60))
+
+    assert result == {"Ok": "fresh"}
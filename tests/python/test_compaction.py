@@ -0,0 +1,37 @@
+from canister import load
+
+compaction = load("client-agent", "compaction")
+
+
+def test_budget_split_gives_short_answers_their_need_and_shares_the_rest():
+    assert compaction._allocate([10, 500, 300], 400) == [10, 195, 195]
+
+
+def test_budget_split_never_exceeds_need_or_budget():
+    allowances = compaction._allocate([50, 60, 70], 1_000)
+
+    assert allowances == [50, 60, 70]
+
+    allowances = compaction._allocate([900, 900, 900, 5], 300)
+
+    assert allowances[3] == 5
+    assert sum(allowances) <= 300
+
+
+def test_compact_keeps_answers_that_fit_untouched():
+    answers = [("weather-agent", "Sunny."), ("airquality-agent", "AQI is 42.")]
+
+    assert compaction.compact(answers, "weather and air quality", 100) == answers
+
+
+def test_compact_keeps_salient_sentences_in_original_order():
+    filler = "The agent has been running for a while and enjoys its work very much. "
+    answer = filler * 6 + "Tomorrow in Paris it will be 21 degrees and sunny. " + filler * 6
+
+    [(agent_name, compacted)] = compaction.compact(
+        [("weather-agent", answer)], "weather tomorrow in Paris", 40
+    )
+
+    assert agent_name == "weather-agent"
+    assert "Tomorrow in Paris it will be 21 degrees and sunny." in compacted
+    assert compaction.estimate_tokens(compacted) <= 40
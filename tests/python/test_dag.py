@@ -0,0 +1,113 @@
+import pytest
+
+from canister import load, run
+
+dag = load("client-agent", "dag")
+fanout = load("client-agent", "fanout")
+
+
+def _call(name: str, call_id: str = None, **arguments) -> dict:
+    call = {"function": {"name": name, "arguments": [{"name": key, "value": value} for key, value in arguments.items()]}}
+    if call_id is not None:
+        call["id"] = call_id
+    return call
+
+
+def _done(result: dict):
+    return result
+    yield
+
+
+@pytest.fixture
+def sequential(monkeypatch):
+    monkeypatch.setattr(dag, "AGENT_FANOUT_ENABLED", False)
+
+
+def _execute(plan: list, answers: dict) -> tuple:
+    calls = []
+
+    def make_task(agent_name: str, arguments: list):
+        calls.append((agent_name, {arg["name"]: arg["value"] for arg in arguments}))
+        return lambda: _done(answers[agent_name])
+
+    return run(dag.execute(plan, make_task)), calls
+
+
+def test_independent_calls_have_no_dependencies():
+    plan = [_call("weather-agent", prompt="weather"), _call("airquality-agent", prompt="aqi")]
+
+    assert not dag.has_dependencies(plan)
+    assert dag._dependencies(plan) == [[], []]
+
+
+def test_references_and_depends_on_are_dependencies():
+    plan = [
+        _call("summary-agent", prompt="sum up {{ weather }} and {{airquality-agent}}"),
+        _call("weather-agent", call_id="weather", prompt="weather"),
+        _call("airquality-agent", prompt="aqi"),
+        _call("report-agent", prompt="report", depends_on="summary-agent, weather"),
+    ]
+
+    assert dag.has_dependencies(plan)
+    assert dag._dependencies(plan) == [[1, 2], [], [], [0, 1]]
+
+
+def test_cycles_are_rejected(sequential):
+    plan = [
+        _call("weather-agent", prompt="use {{airquality-agent}}"),
+        _call("airquality-agent", prompt="use {{weather-agent}}"),
+    ]
+
+    assert dag._dependencies(plan) is None
+    assert dag.has_dependencies(plan)
+
+    results, calls = _execute(plan, {})
+
+    assert calls == []
+    assert results == [
+        ("weather-agent", {"Err": "Plan has cyclic dependencies"}),
+        ("airquality-agent", {"Err": "Plan has cyclic dependencies"}),
+    ]
+
+
+def test_calls_run_after_their_dependencies_with_outputs_substituted(sequential):
+    plan = [
+        _call("summary-agent", prompt="sum up {{weather-agent}}"),
+        _call("weather-agent", prompt="weather in Paris"),
+    ]
+
+    results, calls = _execute(
+        plan, {"weather-agent": {"Ok": "sunny, 21C"}, "summary-agent": {"Ok": "nice day"}}
+    )
+
+    assert calls == [
+        ("weather-agent", {"prompt": "weather in Paris"}),
+        ("summary-agent", {"prompt": "sum up sunny, 21C"}),
+    ]
+    # Results come back in plan order, not execution order
+    assert results == [("summary-agent", {"Ok": "nice day"}), ("weather-agent", {"Ok": "sunny, 21C"})]
+
+
+def test_failed_dependency_fails_its_dependents_without_running_them(sequential):
+    plan = [
+        _call("weather-agent", prompt="weather"),
+        _call("report-agent", prompt="report", depends_on="weather-agent"),
+    ]
+
+    results, calls = _execute(plan, {"weather-agent": {"Err": "down"}})
+
+    assert [name for name, _ in calls] == ["weather-agent"]
+    assert results[1] == ("report-agent", {"Err": "Dependency 'weather-agent' failed"})
+
+
+def test_wait_limit_counts_idle_ticks_not_plan_depth(monkeypatch):
+    monkeypatch.setattr(dag, "FANOUT_MAX_WAIT_TICKS", 2)
+    monkeypatch.setattr(fanout.ic, "set_timer", lambda _delay, callback: run(callback()))
+    plan = [_call("step-0", prompt="start")] + [
+        _call(f"step-{level}", prompt=f"after {{{{step-{level - 1}}}}}") for level in range(1, 5)
+    ]
+
+    results, calls = _execute(plan, {f"step-{level}": {"Ok": f"out-{level}"} for level in range(5)})
+
+    assert [result for _, result in results] == [{"Ok": f"out-{level}"} for level in range(5)]
+    assert calls[-1] == ("step-4", {"prompt": "after out-3"})
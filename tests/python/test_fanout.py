@@ -0,0 +1,93 @@
+import pytest
+
+from canister import load, run
+from kybra.canisters.management import management_canister
+
+fanout = load("client-agent", "fanout")
+
+
+@pytest.fixture
+def eager_timers(monkeypatch):
+    """Timer callbacks run as soon as they are scheduled."""
+
+    monkeypatch.setattr(fanout.ic, "set_timer", lambda _delay, callback: run(callback()))
+
+
+def _task(value):
+    def task():
+        result = yield {"Ok": value}
+        return result
+
+    return task
+
+
+def test_gather_returns_results_in_task_order(eager_timers):
+    results = run(fanout.gather([_task("a"), _task("b"), _task("c")]))
+
+    assert results == [{"Ok": "a"}, {"Ok": "b"}, {"Ok": "c"}]
+    assert fanout._batches == {}
+
+
+def test_wait_batch_returns_only_the_requested_tasks(eager_timers):
+    batch_id = fanout.start_batch([_task("a"), _task("b"), _task("c")])
+
+    assert run(fanout.wait_batch(batch_id, [2, 0])) == [{"Ok": "c"}, {"Ok": "a"}]
+    assert batch_id not in fanout._batches
+
+
+def test_unfinished_tasks_time_out_and_the_batch_is_collected(monkeypatch):
+    monkeypatch.setattr(fanout, "FANOUT_MAX_WAIT_TICKS", 3)
+
+    results = run(fanout.gather([_task("a")]))
+
+    assert results == [{"Err": "Timed out waiting for task"}]
+    assert fanout._batches == {}
+
+
+def test_batch_is_collected_when_waiting_fails(monkeypatch):
+    def failing_tick():
+        raise RuntimeError("raw_rand rejected")
+
+    monkeypatch.setattr(management_canister, "raw_rand", failing_tick)
+
+    with pytest.raises(RuntimeError):
+        run(fanout.gather([_task("a")]))
+
+    assert fanout._batches == {}
+
+
+def test_abandoned_batches_are_dropped_when_old_enough():
+    abandoned = fanout.start_batch([_task("a")])
+
+    fanout.ic.now += (fanout.FANOUT_BATCH_MAX_AGE_SECONDS + 1) * 1_000_000_000
+    current = fanout.start_batch([_task("b")])
+
+    assert abandoned not in fanout._batches
+    assert current in fanout._batches
+
+    fanout.discard_batch(current)
+
+
+def test_gather_bounded_keeps_at_most_limit_tasks_running(monkeypatch):
+    scheduled = []
+    monkeypatch.setattr(fanout.ic, "set_timer", lambda _delay, callback: scheduled.append(callback))
+
+    gathering = fanout.gather_bounded([_task(value) for value in "abcde"], 2)
+    most_running = 0
+    tick = None
+
+    while True:
+        try:
+            tick = gathering.send(tick)
+        except StopIteration as stop:
+            results = stop.value
+            break
+
+        most_running = max(most_running, len(scheduled))
+        # One running task finishes per tick
+        if len(scheduled) > 0:
+            run(scheduled.pop(0)())
+
+    assert most_running == 2
+    assert results == [{"Ok": value} for value in "abcde"]
+    assert fanout._batches == {}
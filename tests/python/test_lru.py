@@ -0,0 +1,24 @@
+from canister import load
+
+storage = load("client-agent", "storage")
+lru = load("client-agent", "lru")
+
+
+def test_pop_oldest_follows_access_order():
+    index = lru.LruIndex("test", storage.response_cache_lru)
+
+    ticks = {key: index.touch(key) for key in ("a", "b", "c")}
+    ticks["a"] = index.touch("a", ticks["a"])
+
+    assert [index.pop_oldest() for _ in range(4)] == ["b", "c", "a", None]
+
+
+def test_forgotten_keys_are_skipped():
+    index = lru.LruIndex("test", storage.response_cache_lru)
+
+    first = index.touch("a")
+    index.touch("b")
+    index.forget(first)
+
+    assert index.pop_oldest() == "b"
+    assert index.pop_oldest() is None
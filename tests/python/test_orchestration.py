@@ -0,0 +1,325 @@
+"""client-agent's orchestration in main.py, with the registry, agents, ledger and LLM
+canisters replaced by monkeypatched fakes. Async helpers may return plain values: the
+`run` driver hands anything that is not a generator straight back to the caller."""
+
+import json
+
+import pytest
+
+from canister import load, run
+
+main = load("client-agent", "main")
+escrow = load("client-agent", "escrow")
+plan_cache = load("client-agent", "plan_cache")
+
+AGENTS = ["weather-agent", "airquality-agent"]
+
+
+def _tool(name: str, required: list = None) -> dict:
+    return {
+        "function": {
+            "name": name,
+            "description": f"{name} tasks",
+            "parameters": {"type": "object", "properties": [], "required": required or ["prompt"]},
+        },
+    }
+
+
+def _plan(*agent_names: str) -> list:
+    return [
+        {"function": {"name": name, "arguments": [{"name": "prompt", "value": "weather in Jakarta"}]}}
+        for name in agent_names
+    ]
+
+
+class FakeLLM:
+    """`LLMServiceV1` answering every chat with the same tool calls."""
+
+    requests = []
+    tool_calls = []
+
+    def __init__(self, _principal):
+        pass
+
+    def v1_chat(self, request: dict) -> dict:
+        FakeLLM.requests.append(request)
+        return {"Ok": {"message": {"content": "combined answer", "tool_calls": FakeLLM.tool_calls}}}
+
+
+@pytest.fixture(autouse=True)
+def fake_llm(monkeypatch):
+    FakeLLM.requests = []
+    FakeLLM.tool_calls = _plan(*AGENTS)
+    monkeypatch.setattr(main, "LLMServiceV1", FakeLLM)
+    monkeypatch.setattr(main, "ROUTER_ENABLED", False)
+    plan_cache.invalidate()
+
+
+def _discovery(monkeypatch, failed: list, required: list = None):
+    monkeypatch.setattr(
+        main,
+        "__discover_tools",
+        lambda names: {
+            "tools": [_tool(name, required) for name in names if name not in failed],
+            "failed": [name for name in names if name in failed],
+        },
+    )
+
+
+@pytest.fixture
+def agent_calls(monkeypatch):
+    """Every downstream agent call made, as `(agent_name, arguments)`."""
+
+    calls = []
+
+    def agent_call(agent_name, arguments):
+        calls.append((agent_name, arguments))
+        return {"Ok": f"{agent_name} answer"}
+
+    monkeypatch.setattr(main, "__agent_call", agent_call)
+    monkeypatch.setattr(main, "resolve_canister_ids", lambda names: None)
+
+    return calls
+
+
+@pytest.fixture
+def payments(monkeypatch):
+    """Payments on, every agent quoted at 100."""
+
+    monkeypatch.setattr(main, "PAYMENTS_ENABLED", True)
+    monkeypatch.setattr(
+        main.pricing_cache,
+        "get_pricing",
+        lambda name: {"Ok": {"price": 100, "owner": main.Principal(f"owner-{name}")}},
+    )
+    monkeypatch.setattr(main, "_in_flight", {})
+
+
+def _parameters(prompt: str, agent_names: list, caller: str = "user-a") -> dict:
+    return {"prompt": prompt, "connected_agent_list": agent_names, "caller": caller}
+
+
+def _orchestrate(prompt: str, agent_names: list) -> dict:
+    orchestrate = getattr(main, "__orchestrate")
+    return run(orchestrate({"prompt": prompt, "connected_agent_list": agent_names, "caller": "user-a"}))
+
+
+def _parse(prompt: str, agent_names: list) -> dict:
+    parse_parameter = getattr(main, "__parse_parameter")
+    return run(parse_parameter({"prompt": prompt, "connected_agent_list": agent_names}))
+
+
+def test_complete_discovery_caches_the_plan(monkeypatch):
+    _discovery(monkeypatch, failed=[])
+
+    _parse("Weather in Jakarta", AGENTS)
+    _parse("Weather in Jakarta", AGENTS)
+
+    assert len(FakeLLM.requests) == 1
+
+
+def test_plan_from_partial_discovery_is_not_cached(monkeypatch):
+    _discovery(monkeypatch, failed=["airquality-agent"])
+
+    first = _parse("Weather in Jakarta", AGENTS)
+    _parse("Weather in Jakarta", AGENTS)
+
+    assert first["unavailable"] == ["airquality-agent"]
+    assert len(FakeLLM.requests) == 2
+
+
+def test_answer_names_agents_left_out_by_partial_discovery(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=["airquality-agent"])
+    FakeLLM.tool_calls = _plan("weather-agent")
+
+    result = _orchestrate("Weather and air quality in Jakarta", AGENTS)
+
+    assert result == {"Ok": "combined answer\n\n(Unavailable agents, not consulted: 'airquality-agent')"}
+    assert main.get_counter("discovery.partial_failures") == 1
+    assert main.response_cache.get(main.response_cache.cache_key("Weather and air quality in Jakarta", AGENTS)) is None
+
+
+def test_single_prompt_only_agent_skips_both_llm_calls(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[])
+
+    result = _orchestrate("Weather in Jakarta", ["weather-agent"])
+
+    assert result == {"Ok": "weather-agent answer"}
+    assert agent_calls == [("weather-agent", [{"name": "prompt", "value": "Weather in Jakarta"}])]
+    assert FakeLLM.requests == []
+
+
+def test_single_agent_with_other_required_arguments_is_planned(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[], required=["city_name"])
+    FakeLLM.tool_calls = [
+        {"function": {"name": "weather-agent", "arguments": [{"name": "city_name", "value": "Jakarta"}]}}
+    ]
+
+    result = _orchestrate("Weather in Jakarta", ["weather-agent"])
+
+    assert result == {"Ok": "combined answer"}
+    assert agent_calls == [("weather-agent", [{"name": "city_name", "value": "Jakarta"}])]
+    assert len(FakeLLM.requests) == 2
+
+
+def test_followers_do_not_inherit_another_accounts_payment_failure(monkeypatch, payments, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    escrow.credit("user-b", 1_000)
+
+    # user-a's identical request is in flight and failed to pay
+    flight_key = getattr(main, "__flight_key")
+    main._in_flight[flight_key(_parameters("Weather in Jakarta", ["weather-agent"]))] = {
+        "result": {"Err": "Insufficient prepaid balance"},
+        "started_at": main.ic.time(),
+    }
+    coalesced_orchestrate = getattr(main, "__coalesced_orchestrate")
+
+    result_a = run(coalesced_orchestrate(_parameters("Weather in Jakarta", ["weather-agent"])))
+    result_b = run(coalesced_orchestrate(_parameters("Weather in Jakarta", ["weather-agent"], "user-b")))
+
+    assert result_a == {"Err": "Insufficient prepaid balance"}
+    assert result_b == {"Ok": "weather-agent answer"}
+    assert escrow.balance_of("user-b") == 900
+
+
+def test_failed_orchestration_refunds_the_charge(monkeypatch, payments):
+    _discovery(monkeypatch, failed=[])
+    monkeypatch.setattr(main, "__agent_call", lambda name, arguments: {"Err": "agent trapped"})
+    escrow.credit("user-a", 1_000)
+
+    result = _orchestrate("Weather in Jakarta", ["weather-agent"])
+
+    assert result.get("Err") is not None
+    assert escrow.balance_of("user-a") == 1_000
+    assert main.get_counter("payments.refunded") == 100
+
+
+def test_refunding_a_free_call_leaves_no_balance_entry(monkeypatch, payments):
+    _discovery(monkeypatch, failed=[])
+    monkeypatch.setattr(main, "__agent_call", lambda name, arguments: {"Err": "agent trapped"})
+    monkeypatch.setattr(
+        main.pricing_cache,
+        "get_pricing",
+        lambda name: {"Ok": {"price": 0, "owner": main.Principal(f"owner-{name}")}},
+    )
+
+    result = _orchestrate("Weather in Jakarta", ["weather-agent"])
+
+    assert result.get("Err") is not None
+    assert not escrow.balances.contains_key("user-a")
+
+
+def _args(prompt: str, agent_names: list = AGENTS, **params) -> str:
+    items = [{"name": "prompt", "value": prompt}, {"name": "connected_agent_list", "value": agent_names}]
+    return json.dumps(items + [{"name": name, "value": value} for name, value in params.items()])
+
+
+def test_jobs_forwarded_by_the_proxy_belong_to_the_forwarded_user(monkeypatch):
+    monkeypatch.setattr(main.ic, "caller_text", main.TRUSTED_PROXY_CANISTER_ID)
+
+    job_id = main.submit_task(_args("Weather in Jakarta", user="user-a")).get("Ok")
+
+    assert main.get_job(job_id, "user-a")["job_id"] == job_id
+    assert main.get_job(job_id, "user-b") is None
+    assert main.get_job(job_id, None) is None
+
+
+def test_batch_and_background_orchestrations_are_timed(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    # Timer callbacks (fan-out tasks, job runners) run right away
+    monkeypatch.setattr(main.ic, "set_timer", lambda _delay, callback: run(callback()))
+
+    run(main.execute_tasks([_args("Weather in Jakarta"), _args("Weather in Bandung")]))
+    main.submit_task(_args("Weather in Surabaya"))
+
+    assert main.stage_summary("execute_task")["count"] == 3
+
+
+def test_retry_with_the_same_idempotency_key_replays_the_result(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    args = _args("Weather in Jakarta", ["weather-agent"], idempotency_key="retry-1")
+
+    first = run(main.execute_task(args))
+    main.response_cache.invalidate()
+    retry = run(main.execute_task(args))
+
+    assert first == retry == {"Ok": "weather-agent answer"}
+    assert len(agent_calls) == 1
+
+
+def test_failed_execution_frees_its_idempotency_key(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    args = _args("Weather in Jakarta", ["weather-agent"], idempotency_key="retry-1")
+    monkeypatch.setattr(main, "__agent_call", lambda name, arguments: {"Err": "agent trapped"})
+
+    assert run(main.execute_task(args)).get("Err") is not None
+
+    monkeypatch.setattr(main, "__agent_call", lambda name, arguments: {"Ok": "recovered"})
+
+    assert run(main.execute_task(args)) == {"Ok": "recovered"}
+
+
+def _price_available_agents(monkeypatch, unavailable: list):
+    monkeypatch.setattr(
+        main.pricing_cache,
+        "get_pricing",
+        lambda name: {"Err": "unreachable"}
+        if name in unavailable
+        else {"Ok": {"price": 100, "owner": main.Principal(f"owner-{name}")}},
+    )
+
+
+def test_batch_duplicates_of_an_uncached_answer_pay_what_the_run_paid(monkeypatch, payments, agent_calls):
+    _discovery(monkeypatch, failed=["airquality-agent"])
+    _price_available_agents(monkeypatch, ["airquality-agent"])
+    monkeypatch.setattr(main.ic, "set_timer", lambda _delay, callback: run(callback()))
+    FakeLLM.tool_calls = _plan("weather-agent")
+    escrow.credit("2vxsx-fae", 1_000)
+
+    results = run(main.execute_tasks([_args("Weather in Jakarta"), _args("Weather in Jakarta")]))
+
+    assert [result.get("Ok") is not None for result in results] == [True, True]
+    assert len(agent_calls) == 1
+    assert escrow.balance_of("2vxsx-fae") == 800
+
+
+def test_follower_pays_only_for_the_agents_the_leader_called(monkeypatch, payments):
+    _price_available_agents(monkeypatch, ["airquality-agent"])
+    escrow.credit("user-a", 1_000)
+
+    parameters = _parameters("Weather in Jakarta", AGENTS)
+    flight_key = getattr(main, "__flight_key")
+    main._in_flight[flight_key(parameters)] = {
+        "result": {"result": {"Ok": "degraded answer"}, "charged_agents": ["weather-agent"]},
+        "started_at": main.ic.time(),
+    }
+    coalesced_orchestrate = getattr(main, "__coalesced_orchestrate")
+
+    assert run(coalesced_orchestrate(parameters)) == {"Ok": "degraded answer"}
+    assert escrow.balance_of("user-a") == 900
+
+
+def test_batch_runs_identical_prompts_once(monkeypatch, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    monkeypatch.setattr(main.ic, "set_timer", lambda _delay, callback: run(callback()))
+    jakarta = _args("Weather in Jakarta", ["weather-agent"])
+
+    results = run(main.execute_tasks([jakarta, _args("Weather in Bandung", ["weather-agent"]), jakarta]))
+
+    assert results == [{"Ok": "weather-agent answer"}] * 3
+    assert [arguments[0]["value"] for _, arguments in agent_calls] == ["Weather in Jakarta", "Weather in Bandung"]
+
+
+def test_batch_items_with_an_idempotency_key_are_not_run_or_charged_again(monkeypatch, payments, agent_calls):
+    _discovery(monkeypatch, failed=[])
+    monkeypatch.setattr(main.ic, "set_timer", lambda _delay, callback: run(callback()))
+    escrow.credit("2vxsx-fae", 1_000)
+    batch = [_args("Weather in Jakarta", ["weather-agent"], idempotency_key="item-1")]
+
+    first = run(main.execute_tasks(batch))
+    main.response_cache.invalidate()
+    retry = run(main.execute_tasks(batch))
+
+    assert first == retry == [{"Ok": "weather-agent answer"}]
+    assert len(agent_calls) == 1
+    assert escrow.balance_of("2vxsx-fae") == 900
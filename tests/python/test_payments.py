@@ -0,0 +1,131 @@
+"""client-agent's prepaid balances: deposit, withdraw and per-call debits against a
+stubbed ledger."""
+
+import pytest
+
+from canister import load, run
+
+main = load("client-agent", "main")
+escrow = load("client-agent", "escrow")
+
+CALLER = "2vxsx-fae"
+
+
+class FakeLedger:
+    """`Ledger` recording transfers and answering with the queued transfer results (Ok by
+    default), wrapped in a successful call result."""
+
+    transfers = []
+    responses = []
+
+    def __init__(self, _principal):
+        pass
+
+    def _answer(self, transfer: dict) -> dict:
+        FakeLedger.transfers.append(transfer)
+        response = FakeLedger.responses.pop(0) if FakeLedger.responses else {"Ok": len(FakeLedger.transfers)}
+        return {"Ok": response}
+
+    def icrc2_transfer_from(self, transfer: dict) -> dict:
+        return self._answer(transfer)
+
+    def icrc1_transfer(self, transfer: dict) -> dict:
+        return self._answer(transfer)
+
+
+@pytest.fixture(autouse=True)
+def fake_ledger(monkeypatch):
+    FakeLedger.transfers = []
+    FakeLedger.responses = []
+    monkeypatch.setattr(main, "Ledger", FakeLedger)
+    monkeypatch.setattr(
+        main.pricing_cache,
+        "get_pricing",
+        lambda name: {"Ok": {"price": 100, "owner": main.Principal(f"owner-{name}")}},
+    )
+
+
+def test_deposit_credits_the_caller():
+    assert run(main.deposit(500)) == {"Ok": "500"}
+    assert run(main.deposit(250)) == {"Ok": "750"}
+    assert main.get_balance() == 750
+    assert FakeLedger.transfers[0]["from_"]["owner"] == main.Principal(CALLER)
+
+
+def test_rejected_deposits_credit_nothing():
+    FakeLedger.responses = [{"Err": {"InsufficientAllowance": {"allowance": 0}}}]
+
+    assert run(main.deposit(0)) == {"Err": "Deposit amount must be positive"}
+    assert run(main.deposit(500)) == {"Err": "ICP allowance insufficient"}
+    assert main.get_balance() == 0
+
+
+def test_withdraw_pays_out_less_the_ledger_fee():
+    escrow.credit(CALLER, 100_000)
+
+    assert run(main.withdraw(60_000)) == {"Ok": "40000"}
+    assert FakeLedger.transfers[0]["amount"] == 60_000 - main.LEDGER_TRANSFER_FEE
+
+
+def test_withdraw_rejects_overdrafts_and_amounts_within_the_fee():
+    escrow.credit(CALLER, 100_000)
+
+    assert run(main.withdraw(main.LEDGER_TRANSFER_FEE)).get("Err") is not None
+    assert run(main.withdraw(200_000)) == {"Err": "Insufficient prepaid balance"}
+    assert FakeLedger.transfers == []
+    assert main.get_balance() == 100_000
+
+
+def test_failed_withdrawal_is_credited_back():
+    escrow.credit(CALLER, 100_000)
+    FakeLedger.responses = [{"Err": {"TemporarilyUnavailable": None}}]
+
+    assert run(main.withdraw(60_000)) == {"Err": "error: withdrawal failed"}
+    assert main.get_balance() == 100_000
+
+
+def test_charge_debits_all_agents_or_nothing():
+    charge_agents = getattr(main, "__charge_agents")
+    escrow.credit("user-a", 150)
+
+    assert run(charge_agents(["weather-agent", "airquality-agent"], "user-a")) == {
+        "Err": "Insufficient prepaid balance"
+    }
+    assert escrow.balance_of("user-a") == 150
+
+    charge = run(charge_agents(["weather-agent"], "user-a")).get("Ok")
+
+    assert charge["total"] == 100
+    assert charge["agents"] == ["weather-agent"]
+    assert escrow.balance_of("user-a") == 50
+
+
+def test_refund_returns_the_charge():
+    charge_agents = getattr(main, "__charge_agents")
+    refund_charge = getattr(main, "__refund_charge")
+    escrow.credit("user-a", 150)
+
+    refund_charge(run(charge_agents(["weather-agent"], "user-a")).get("Ok"))
+
+    assert escrow.balance_of("user-a") == 150
+
+
+def test_can_afford_compares_the_balance_with_every_agent_price():
+    can_afford = getattr(main, "__can_afford")
+    escrow.credit("user-a", 150)
+
+    assert run(can_afford(["weather-agent"], "user-a"))
+    assert not run(can_afford(["weather-agent", "airquality-agent"], "user-a"))
+    assert not run(can_afford(["weather-agent"], "user-b"))
+
+
+def test_only_the_trusted_proxy_may_bill_a_forwarded_user(monkeypatch):
+    billed_account = getattr(main, "__billed_account")
+
+    assert billed_account({"user": "user-a"}) == CALLER
+    assert billed_account({}) == CALLER
+
+    monkeypatch.setattr(main.ic, "caller_text", main.TRUSTED_PROXY_CANISTER_ID)
+
+    assert billed_account({"user": "user-a"}) == "user-a"
+    assert billed_account({}) == main.TRUSTED_PROXY_CANISTER_ID
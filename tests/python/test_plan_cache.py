@@ -0,0 +1,55 @@
+from canister import load
+
+plan_cache = load("client-agent", "plan_cache")
+
+AGENTS = ["weather-agent", "airquality-agent"]
+
+
+def _plan(prompt_value: str, call_id: str = "call-1") -> list:
+    return [
+        {
+            "id": call_id,
+            "function": {
+                "name": "weather-agent",
+                "arguments": [{"name": "prompt", "value": prompt_value}],
+            },
+        }
+    ]
+
+
+def test_mask_entities_slots_dates_and_places():
+    template, entities = plan_cache.mask_entities("How is the weather tomorrow in New York?")
+
+    assert template == "how is the weather {date0} in {place0}?"
+    assert entities == [("{date0}", "tomorrow"), ("{place0}", "New York")]
+
+
+def test_same_template_reuses_plan_with_new_entities():
+    plan_cache.store("Weather tomorrow in Paris", AGENTS, _plan("forecast for Paris tomorrow"))
+
+    plan = plan_cache.lookup("Weather today in Rome", AGENTS)
+
+    assert plan == _plan("forecast for Rome today")
+
+
+def test_masking_leaves_ids_and_other_words_alone():
+    stored = _plan("comparison of Paris and paris-adjacent towns", call_id="comparison")
+    plan_cache.store("Weather in Paris", AGENTS, stored)
+
+    plan = plan_cache.lookup("Weather in Rome", AGENTS)
+
+    assert plan[0]["id"] == "comparison"
+    assert plan[0]["function"]["name"] == "weather-agent"
+    assert plan[0]["function"]["arguments"][0]["value"] == "comparison of Rome and Rome-adjacent towns"
+
+
+def test_plan_without_the_entity_is_not_cached():
+    plan_cache.store("Weather in Paris", AGENTS, _plan("weather in the French capital"))
+
+    assert plan_cache.lookup("Weather in Paris", AGENTS) is None
+
+
+def test_lookup_is_keyed_by_connected_agents():
+    plan_cache.store("Weather in Paris", AGENTS, _plan("weather in Paris"))
+
+    assert plan_cache.lookup("Weather in Rome", ["weather-agent"]) is None
@@ -0,0 +1,104 @@
+import pytest
+
+from canister import load, run
+
+main = load("agent-registry", "main")
+
+OWNER = "owner-a"
+
+
+@pytest.fixture(autouse=True)
+def no_metadata_calls(monkeypatch):
+    def index_agent_metadata(_agent_name, _canister_id):
+        return True
+        yield
+
+    monkeypatch.setattr(main, "__index_agent_metadata", index_agent_metadata)
+
+
+def _register(agent_name: str, tags=None, owner=None, caller: str = OWNER) -> dict:
+    main.ic.caller_text = caller
+    main.ic.now += 1_000_000_000
+    return run(main.register_agent(agent_name, f"{agent_name}-canister", tags, owner))
+
+
+def _names(page: dict) -> list:
+    return [agent["agent_name"] for agent in page["agents"]]
+
+
+def test_pages_follow_registration_order_and_the_cursor_continues():
+    for name in ("a", "b", "c", "d", "e"):
+        _register(name)
+
+    page = main.list_agents(None, None, 2)
+    assert _names(page) == ["a", "b"]
+
+    page = main.list_agents(None, page["next_cursor"], 2)
+    assert _names(page) == ["c", "d"]
+
+    page = main.list_agents(None, page["next_cursor"], 2)
+    assert _names(page) == ["e"]
+    assert page["next_cursor"] is None
+
+
+def test_filter_by_owner_pages_through_that_owners_agents():
+    _register("a", owner="owner-b")
+    _register("b")
+    _register("c", owner="owner-b")
+    _register("d", owner="owner-b")
+
+    page = main.list_agents({"owner": "owner-b"}, None, 2)
+    assert _names(page) == ["a", "c"]
+
+    page = main.list_agents({"owner": "owner-b"}, page["next_cursor"], 2)
+    assert _names(page) == ["d"]
+    assert page["next_cursor"] is None
+
+
+def test_filter_by_tag_is_case_insensitive_and_follows_retagging():
+    _register("a", tags=["Weather"])
+    _register("b", tags=["air"])
+    _register("c", tags=[" weather "])
+    _register("a", tags=["air"])
+
+    assert _names(main.list_agents({"tag": "WEATHER"}, None, None)) == ["c"]
+    assert _names(main.list_agents({"tag": "air"}, None, None)) == ["b", "a"]
+
+
+def test_filter_by_registration_time_skips_older_agents():
+    _register("a")
+    _register("b")
+    since = main.ic.time()
+    _register("c")
+    _register("d")
+
+    page = main.list_agents({"registered_since": since}, None, 1)
+    assert _names(page) == ["b"]
+
+    page = main.list_agents({"registered_since": since}, page["next_cursor"], 5)
+    assert _names(page) == ["c", "d"]
+
+
+def test_only_the_owner_may_re_register_an_agent():
+    _register("a", tags=["weather"])
+
+    assert _register("a", tags=["air"], caller="intruder") == {
+        "Err": "Only the owner of agent a can re-register it"
+    }
+    assert main.agent_registry.get("a")["tags"] == ["weather"]
+
+    assert _register("a", owner="owner-b").get("Ok") is not None
+    assert _register("a", caller=OWNER).get("Err") is not None
+    assert _names(main.list_agents({"owner": "owner-b"}, None, None)) == ["a"]
+    assert _names(main.list_agents({"owner": OWNER}, None, None)) == []
+
+
+def test_ownerless_agent_is_managed_by_its_own_canister():
+    main.agent_registry.insert(
+        "legacy",
+        {"agent_name": "legacy", "canister_id": "legacy-canister", "owner": None, "tags": None,
+         "registered_at": 0, "version": None},
+    )
+
+    assert _register("legacy", caller=OWNER).get("Err") is not None
+    assert _register("legacy", caller="legacy-canister").get("Ok") is not None
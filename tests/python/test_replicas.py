@@ -0,0 +1,90 @@
+import pytest
+
+from canister import load
+
+NANOS_PER_SECOND = 1_000_000_000
+
+
+@pytest.fixture
+def replicas():
+    return load("agent-registry", "replicas")
+
+
+@pytest.fixture
+def registry_cache():
+    module = load("client-agent", "registry_cache")
+    module._round_robin.clear()
+    return module
+
+
+@pytest.fixture
+def load_report():
+    module = load("weather-agent", "load_report")
+    module._in_flight.clear()
+    return module
+
+
+AGENT = {"agent_name": "weather-agent", "canister_id": "primary"}
+
+
+def _weights(replicas) -> list:
+    return [(replica["canister_id"], round(replica["weight"], 3)) for replica in replicas.weighted_replicas(AGENT)]
+
+
+def test_replicas_are_weighted_by_load_and_latency(replicas):
+    replicas.add_replica("weather-agent", "replica-1")
+
+    # A fresh replica counts as idle with no latency, the silent primary at the default latency
+    assert _weights(replicas) == [("replica-1", 0.667), ("primary", 0.333)]
+
+    replicas.report_load(AGENT, "replica-1", 3, 0)
+
+    assert _weights(replicas) == [("primary", 0.667), ("replica-1", 0.333)]
+
+
+def test_silent_replicas_are_stale_then_down(replicas):
+    replicas.add_replica("weather-agent", "replica-1")
+
+    replicas.ic.now += (replicas.REPLICA_REPORT_TTL_SECONDS + 1) * NANOS_PER_SECOND
+
+    assert _weights(replicas) == [("primary", 0.917), ("replica-1", 0.083)]
+
+    replicas.ic.now += replicas.REPLICA_DOWN_AFTER_SECONDS * NANOS_PER_SECOND
+
+    assert _weights(replicas) == [("primary", 1.0)]
+
+
+def test_round_robin_follows_the_replica_weights(registry_cache):
+    entry = {
+        "canister_id": "primary",
+        "cached_at": 0,
+        "replicas": [{"canister_id": "primary", "weight": 0.75}, {"canister_id": "replica-1", "weight": 0.25}],
+    }
+
+    picks = [registry_cache._pick_replica("weather-agent", entry) for _ in range(8)]
+
+    assert picks[:4] == ["primary", "primary", "replica-1", "primary"]
+    assert picks.count("replica-1") == 2
+
+
+def test_single_canister_agents_resolve_to_their_canister(registry_cache):
+    entry = {"canister_id": "primary", "cached_at": 0, "replicas": None}
+
+    assert registry_cache._pick_replica("weather-agent", entry) == "primary"
+
+
+def test_finished_and_expired_tasks_stop_counting_as_load(load_report):
+    first = load_report.task_started()
+    load_report.task_started()
+
+    assert load_report.in_flight() == 2
+
+    load_report.task_finished(first)
+    load_report.task_finished(first)
+
+    assert load_report.in_flight() == 1
+
+    # The other task trapped and never finished
+    load_report.ic.now += (load_report.TASK_MAX_AGE_SECONDS + 1) * NANOS_PER_SECOND
+
+    assert load_report.in_flight() == 0
@@ -0,0 +1,58 @@
+from canister import load
+
+main = load("client-agent", "main")
+response_cache = load("client-agent", "response_cache")
+storage = load("client-agent", "storage")
+
+AGENTS = ["weather-agent", "airquality-agent"]
+KEY = response_cache.cache_key("Weather in Jakarta?", AGENTS)
+
+
+def test_key_ignores_prompt_spacing_case_and_agent_order():
+    assert response_cache.cache_key("  weather   IN jakarta ?", list(reversed(AGENTS))) == KEY
+
+
+def test_answer_expires_after_the_ttl():
+    response_cache.put(KEY, "answer", AGENTS)
+    response_cache.ic.now += response_cache.RESPONSE_CACHE_TTL_SECONDS * 1_000_000_000
+
+    assert response_cache.get(KEY) == "answer"
+
+    response_cache.ic.now += 1
+
+    assert response_cache.get(KEY) is None
+    assert response_cache.get_stats()["entries"] == 0
+    assert response_cache.get_stats()["misses"] == 1
+
+
+def test_controller_endpoint_invalidates_every_answer():
+    response_cache.put(KEY, "answer", AGENTS)
+    response_cache.put(response_cache.cache_key("Air quality in Jakarta", AGENTS), "other", AGENTS)
+
+    assert main.invalidate_response_cache.guard is main.controller_only
+    assert main.invalidate_response_cache() == {"Ok": "Invalidated 2 response cache entries"}
+    assert response_cache.get(KEY) is None
+    assert storage.response_cache_lru.len() == 0
+
+
+def test_answer_above_the_size_limit_is_not_cached():
+    response_cache.put(KEY, "answer", AGENTS)
+    response_cache.put(KEY, "x" * storage.response_cache.max_value_size, AGENTS)
+
+    assert response_cache.get(KEY) is None
+    assert storage.response_cache_lru.len() == 0
+    assert response_cache.get_counter("stable.insert_failures") == 1
+
+
+def test_least_recently_used_answer_is_evicted(monkeypatch):
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_CAPACITY", 2)
+    keys = [response_cache.cache_key(prompt, AGENTS) for prompt in ("a", "b", "c")]
+
+    response_cache.put(keys[0], "a", AGENTS)
+    response_cache.put(keys[1], "b", AGENTS)
+    response_cache.get(keys[0])
+    response_cache.put(keys[2], "c", AGENTS)
+
+    assert response_cache.get(keys[1]) is None
+    assert response_cache.get(keys[0]) == "a"
+    assert response_cache.charged_agents(keys[2]) == AGENTS
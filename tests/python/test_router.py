@@ -0,0 +1,61 @@
+from canister import load
+
+router = load("client-agent", "router")
+
+
+def _tool(name: str, description: str, keywords: list, required: list = None) -> dict:
+    return {
+        "function": {
+            "name": name,
+            "description": description,
+            "parameters": {"type": "object", "properties": [], "required": required or ["prompt"]},
+        },
+        "keywords": keywords,
+    }
+
+
+TOOLS = [
+    _tool("weather-agent", "Agentic AI for weather-related tasks", ["weather", "forecast", "rain"]),
+    _tool("airquality-agent", "Agentic AI for air quality-related tasks", ["air quality", "aqi", "pm2.5"]),
+]
+
+
+def test_published_keywords_route_to_their_agent():
+    plan = router.route("Will it rain in Jakarta?", TOOLS)
+
+    assert plan == [
+        {"function": {"name": "weather-agent", "arguments": [{"name": "prompt", "value": "Will it rain in Jakarta?"}]}}
+    ]
+
+
+def test_multi_word_keywords_and_both_agents():
+    plan = router.route("Forecast and air quality for Jakarta", TOOLS)
+
+    assert [call["function"]["name"] for call in plan] == ["weather-agent", "airquality-agent"]
+
+
+def test_single_description_words_do_not_route():
+    assert router.route("How is the quality of the hotel?", TOOLS) is None
+    assert router.route("Should I air dry my clothes?", TOOLS) is None
+
+
+def test_keywords_are_recompiled_when_metadata_changes():
+    tools = [_tool("weather-agent", "Agentic AI for weather-related tasks", ["temperature"])]
+
+    assert router.route("Temperature in Jakarta", tools) is not None
+    assert router.route("Temperature in Jakarta", TOOLS) is None
+
+
+def test_missing_required_argument_falls_back_to_the_planner():
+    tools = [_tool("weather-agent", "weather", ["weather"], required=["city"])]
+
+    assert router.route("What is the weather?", tools) is None
+    assert router.route("What is the weather in Jakarta?", tools) == [
+        {"function": {"name": "weather-agent", "arguments": [{"name": "city", "value": "Jakarta"}]}}
+    ]
+
+
+def test_agents_without_published_keywords_fall_back_to_the_planner():
+    tools = TOOLS + [_tool("news-agent", "Agentic AI for news-related tasks", [])]
+
+    assert router.route("Will it rain in Jakarta?", tools) is None
@@ -0,0 +1,59 @@
+from canister import load
+
+search = load("agent-registry", "search")
+storage = load("agent-registry", "storage")
+
+
+def _metadata(description: str, keywords: list) -> dict:
+    return {
+        "function": {
+            "name": "ignored",
+            "description": description,
+            "parameters": {"type": "object", "properties": [{"name": "prompt", "description": "User prompt"}]},
+        },
+        "keywords": keywords,
+    }
+
+
+AGENTS = {
+    "weather-agent": _metadata("Agentic AI for weather-related tasks", ["weather", "forecast", "rain"]),
+    "airquality-agent": _metadata("Agentic AI for air quality-related tasks", ["air quality", "aqi", "pollution"]),
+    "news-agent": _metadata("Agentic AI for daily news headlines", ["news", "headlines"]),
+}
+
+
+def _register_all():
+    for agent_name, metadata in AGENTS.items():
+        storage.agent_registry.insert(agent_name, {"agent_name": agent_name})
+        search.index_document(agent_name, search.metadata_terms(agent_name, metadata))
+
+
+def _ranked(query: str, k: int = 3, candidates: list = None) -> list:
+    return [hit["agent"]["agent_name"] for hit in search.search(query, k, candidates)]
+
+
+def test_best_matching_agent_ranks_first():
+    _register_all()
+
+    assert _ranked("What is the air pollution in Jakarta?")[0] == "airquality-agent"
+    assert _ranked("Will it rain tomorrow?") == ["weather-agent"]
+    assert _ranked("Today's headlines and the weather forecast", k=2) == ["weather-agent", "news-agent"]
+
+
+def test_search_is_restricted_to_candidates():
+    _register_all()
+
+    assert _ranked("weather and air quality", candidates=["airquality-agent"]) == ["airquality-agent"]
+
+
+def test_removed_and_reindexed_documents_are_not_matched():
+    _register_all()
+
+    search.remove_document("news-agent")
+    search.index_document(
+        "weather-agent", search.metadata_terms("weather-agent", _metadata("Temperatures", ["temperature"]))
+    )
+
+    assert _ranked("news headlines") == []
+    assert _ranked("rain") == []
+    assert _ranked("temperature") == ["weather-agent"]
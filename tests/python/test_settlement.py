@@ -0,0 +1,97 @@
+import pytest
+
+from canister import load, run
+
+settlement = load("client-agent", "settlement")
+
+OWNER = "owner-weather-agent"
+
+
+class FakeLedger:
+    """`Ledger` recording `icrc1_transfer` args and answering with the queued transfer
+    results (Ok by default)."""
+
+    transfers = []
+    responses = []
+
+    def __init__(self, _principal):
+        pass
+
+    def icrc1_transfer(self, transfer: dict) -> dict:
+        FakeLedger.transfers.append(transfer)
+        response = FakeLedger.responses.pop(0) if FakeLedger.responses else {"Ok": len(FakeLedger.transfers)}
+        return {"Ok": response}
+
+
+@pytest.fixture(autouse=True)
+def fake_ledger(monkeypatch):
+    FakeLedger.transfers = []
+    FakeLedger.responses = []
+    monkeypatch.setattr(settlement, "Ledger", FakeLedger)
+
+
+def test_flush_sends_one_transfer_per_payee_and_drains_the_accruals():
+    settlement.accrue(OWNER, settlement.SETTLEMENT_MIN_PAYOUT)
+    settlement.accrue(OWNER, 5_000)
+
+    run(settlement.flush())
+
+    assert len(FakeLedger.transfers) == 1
+    assert FakeLedger.transfers[0]["to"]["owner"].to_str() == OWNER
+    assert FakeLedger.transfers[0]["amount"] == settlement.SETTLEMENT_MIN_PAYOUT + 5_000 - settlement.LEDGER_TRANSFER_FEE
+    assert settlement.get_stats()["accrued_payees"] == 0
+    assert settlement.get_stats()["pending_payouts"] == 0
+    assert settlement.get_stats()["settled_total"] == settlement.SETTLEMENT_MIN_PAYOUT + 5_000
+
+
+def test_accruals_below_the_minimum_payout_wait():
+    settlement.accrue(OWNER, settlement.SETTLEMENT_MIN_PAYOUT - 1)
+
+    run(settlement.flush())
+
+    assert FakeLedger.transfers == []
+    assert settlement.get_stats()["accrued_total"] == settlement.SETTLEMENT_MIN_PAYOUT - 1
+
+
+def test_failed_transfer_is_retried_with_the_same_memo_and_timestamp():
+    settlement.accrue(OWNER, settlement.SETTLEMENT_MIN_PAYOUT)
+    FakeLedger.responses = [{"Err": {"TemporarilyUnavailable": None}}]
+
+    run(settlement.flush())
+
+    assert settlement.get_stats()["pending_payouts"] == 1
+    assert settlement.get_stats()["failures"] == 1
+
+    settlement.ic.now += settlement.SETTLEMENT_INTERVAL_SECONDS * 1_000_000_000
+    run(settlement.flush())
+
+    first, retry = FakeLedger.transfers
+    assert retry["memo"] == first["memo"]
+    assert retry["created_at_time"] == first["created_at_time"]
+    assert settlement.get_stats()["pending_payouts"] == 0
+    assert settlement.get_stats()["transfers"] == 1
+
+
+def test_duplicate_response_settles_the_payout():
+    settlement.accrue(OWNER, settlement.SETTLEMENT_MIN_PAYOUT)
+    FakeLedger.responses = [{"Err": {"Duplicate": {"duplicate_of": 7}}}]
+
+    run(settlement.flush())
+
+    assert settlement.get_stats()["pending_payouts"] == 0
+    assert settlement.get_stats()["transfers"] == 1
+    assert settlement.get_stats()["failures"] == 0
+
+
+def test_payout_leaving_the_dedup_window_gets_a_fresh_timestamp():
+    settlement.accrue(OWNER, settlement.SETTLEMENT_MIN_PAYOUT)
+    FakeLedger.responses = [{"Err": {"TemporarilyUnavailable": None}}]
+
+    run(settlement.flush())
+
+    settlement.ic.now += settlement.LEDGER_DEDUP_WINDOW_SECONDS * 1_000_000_000
+    run(settlement.flush())
+
+    first, retry = FakeLedger.transfers
+    assert retry["memo"] == first["memo"]
+    assert retry["created_at_time"] == settlement.ic.now
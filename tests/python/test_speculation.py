@@ -0,0 +1,65 @@
+import pytest
+
+from canister import load, run
+
+speculation = load("client-agent", "speculation")
+fanout = load("client-agent", "fanout")
+
+AGENTS = ["weather-agent", "airquality-agent"]
+
+
+@pytest.fixture
+def timers(monkeypatch):
+    """Timer callbacks scheduled by fan-out, run only when the test says so."""
+
+    callbacks = []
+    monkeypatch.setattr(fanout.ic, "set_timer", lambda _delay, callback: callbacks.append(callback))
+    return callbacks
+
+
+def _make_task(calls: list):
+    def make_task(agent_name: str, arguments: list):
+        def task():
+            calls.append(agent_name)
+            fanout.ic.now += 5_000_000  # each call takes 5 ms
+            result = yield {"Ok": f"{agent_name} answer"}
+            return result
+
+        return task
+
+    return make_task
+
+
+def _call(agent_name: str, **arguments) -> dict:
+    return {"function": {"name": agent_name, "arguments": [{"name": k, "value": v} for k, v in arguments.items()]}}
+
+
+def test_confirmed_calls_are_kept_and_the_rest_discarded(timers):
+    calls = []
+    speculative = speculation.start("Weather in Jakarta", AGENTS, _make_task(calls))
+    for callback in timers:
+        run(callback())
+
+    plan = [_call("weather-agent", prompt="Weather in Jakarta"), _call("airquality-agent", city="Jakarta")]
+    collected = run(speculation.collect(speculative, plan))
+
+    assert collected["results"] == {0: {"Ok": "weather-agent answer"}}
+    assert collected["remaining"] == [plan[1]]
+    assert calls == AGENTS
+    assert speculation.get_stats()["confirmed"] == 1
+    assert speculation.get_stats()["wasted"] == 1
+    assert speculation.get_stats()["wasted_ms"] == 5
+
+
+def test_abandoned_calls_are_wasted_once_they_finish(timers):
+    speculative = speculation.start("Weather in Jakarta", AGENTS, _make_task([]))
+
+    speculation.abandon(speculative)
+
+    assert speculation.get_stats()["wasted"] == 2
+    assert speculation.get_stats()["wasted_ms"] == 0
+
+    for callback in timers:
+        run(callback())
+
+    assert speculation.get_stats()["wasted_ms"] == 10